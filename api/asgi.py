@@ -0,0 +1,100 @@
+import os
+import time
+from urllib.parse import parse_qs
+from a2wsgi import WSGIMiddleware
+from main import app as flask_app
+from routes import suggestions_async
+from routes.suggestions import SUGGESTION_FIELDS, encode_suggestions
+from services.log import bind_request_id, fields, get_logger, request_id, reset_request_id
+from services.metrics import ERRORS, HTTP_REQUESTS, HTTP_SECONDS, span
+from services.resources import ASYNC_RESOURCES, WARMUP_ON_START, resources
+from services.responses import encode, parse_fields
+
+# ——————————————————————————————————————————————————————————————————
+# Async serving mode. GET /suggestions/<user_id> is handled natively on the
+# event loop (routes.suggestions_async); every other route is the existing
+# Flask app, run on a pool of ASGI_WSGI_THREADS threads.
+#
+#   SERVING_MODE=async gunicorn -c gunicorn.conf.py
+#   uvicorn asgi:app --port 8080          (local)
+# ——————————————————————————————————————————————————————————————————
+wsgi = WSGIMiddleware(flask_app, workers=int(os.environ.get("ASGI_WSGI_THREADS", "10")))
+
+log    = get_logger("asgi")
+access = get_logger("access")
+ROUTE  = "/suggestions/<user_id>"
+
+
+async def _send(send, status, out, payload):
+    out = [(k.lower().encode(), v.encode()) for k, v in out]
+    await send({
+        "type":    "http.response.start",
+        "status":  status,
+        "headers": out + [(b"x-request-id", (request_id() or "").encode())],
+    })
+    await send({"type": "http.response.body", "body": payload})
+    return status
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if WARMUP_ON_START:
+                resources.warmup(ASYNC_RESOURCES)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if "ahttp" in resources.loaded():
+                await resources.ahttp.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+def _suggestions_user(scope):
+    # "/suggestions/<user_id>" -> user_id, else None
+    if scope["type"] != "http" or scope["method"] != "GET":
+        return None
+    parts = scope["path"].split("/")
+    if len(parts) == 3 and parts[1] == "suggestions" and parts[2]:
+        return parts[2]
+    return None
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+
+    user_id = _suggestions_user(scope)
+    if user_id is None:
+        return await wsgi(scope, receive, send)
+
+    # Same request id / access log / metrics as services.log.init_app gives Flask
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    rid     = headers.get("x-request-id") or headers.get("x-cloud-trace-context", "").split("/", 1)[0]
+    token   = bind_request_id(rid or None)
+    start   = time.perf_counter()
+    try:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            wanted = parse_fields(",".join(query.get("fields", [])), SUGGESTION_FIELDS)
+        except ValueError as e:
+            wanted, response = None, encode({"error": str(e)}, 400, cacheable=False)
+        else:
+            try:
+                body, status = await suggestions_async.get_suggestions_for_user(user_id, wanted)
+            except Exception:
+                ERRORS.inc(where="suggestions_async")
+                log.exception("unhandled error in async /suggestions", extra=fields(user_id=user_id))
+                body, status = {"error": "Internal server error"}, 500
+            # Same encoding as the Flask route: projection, compression
+            if "suggestions" in body:
+                response = encode_suggestions(body["suggestions"], wanted, status,
+                                              headers.get("accept-encoding"))
+            else:
+                with span("encode"):
+                    response = encode(body, status, headers.get("accept-encoding"), cacheable=False)
+        status = await _send(send, *response)
+        elapsed = time.perf_counter() - start
+        HTTP_REQUESTS.inc(route=ROUTE, method="GET", status=status)
+        HTTP_SECONDS.observe(elapsed, route=ROUTE)
+        access.info(f"GET {scope['path']} {status}",
+                    extra=fields(route=ROUTE, status=status, latency_ms=round(elapsed * 1000, 1)))
+    finally:
+        reset_request_id(token)
@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import tempfile
+import timeit
+
+from services.catalog import Catalog
+
+# ——————————————————————————————————————————————————————————————————
+# Micro-benchmark for services.catalog: fills a catalog with synthetic
+# places around Tokyo and times radius queries, plus save/load of the file.
+#
+#   python -m bench.catalog [--places 100000] [--radius 2500]
+# ——————————————————————————————————————————————————————————————————
+CUISINES = ("italian", "japanese", "thai", "mexican", "indian", "ramen", "sushi", "korean")
+
+
+def synthetic_places(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield rng.choice(CUISINES) + "_restaurant", {
+            "id":               f"place-{i}",
+            "displayName":      {"text": f"Place {i}"},
+            "formattedAddress": f"{i} Bench Street",
+            "rating":           round(rng.uniform(3.0, 5.0), 1),
+            "userRatingCount":  rng.randint(5, 5000),
+            "priceLevel":       "PRICE_LEVEL_MODERATE",
+            "location":         {"latitude": 35.5 + rng.random() * 0.4, "longitude": 139.5 + rng.random() * 0.5},
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog radius queries")
+    parser.add_argument("--places", type=int, default=100_000)
+    parser.add_argument("--radius", type=float, default=2500.0)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    start   = timeit.default_timer()
+    for cuisine_type, place in synthetic_places(args.places):
+        catalog.add([place], cuisine_type)
+    print(f"{args.places} places indexed in {timeit.default_timer() - start:.2f}s")
+
+    rng     = random.Random(1)
+    queries = [(rng.choice(CUISINES) + "_restaurant", 35.55 + rng.random() * 0.3, 139.55 + rng.random() * 0.4)
+               for _ in range(args.queries)]
+    found   = sum(len(catalog.nearby(c, lat, lng, args.radius)) for c, lat, lng in queries)
+    elapsed = min(timeit.repeat(lambda: [catalog.nearby(c, lat, lng, args.radius) for c, lat, lng in queries],
+                                number=1, repeat=5))
+    print(f"nearby({args.radius:.0f} m): {elapsed / args.queries * 1e6:.1f} µs/query, "
+          f"{found / args.queries:.1f} places/query")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path  = os.path.join(tmp, "catalog.npz")
+        start = timeit.default_timer()
+        catalog.save(path)
+        saved = timeit.default_timer() - start
+        start = timeit.default_timer()
+        Catalog.load(path)
+        print(f"save {saved:.2f}s, load {timeit.default_timer() - start:.2f}s, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+# ——————————————————————————————————————————————————————————————————
+# Local stand-ins for the benchmark harness (bench.run):
+#   FakeUpstream  - Places API (New) searchText / details, plus a fake
+#                   send_email Cloud Function, with latency + error injection
+#   FakeFirestore - in-memory Firestore (the subset the API uses)
+# SMTP is email_service.smtp_sink.SMTPSink.
+# ——————————————————————————————————————————————————————————————————
+
+
+PRICE_LEVELS = ("PRICE_LEVEL_INEXPENSIVE", "PRICE_LEVEL_MODERATE", "PRICE_LEVEL_EXPENSIVE")
+
+def fake_places(query, n=20, center=(35.68, 139.70)):
+    # Deterministic page of places for a query and centre: same search,
+    # same ids, scattered within ~2 km of the centre
+    rng = random.Random(f"{query}@{center[0]:.3f},{center[1]:.3f}")
+    tag = f"{query.replace(' ', '-')}-{center[0]:.3f}-{center[1]:.3f}"
+    return [{
+        "id":               f"{tag}-{i}",
+        "displayName":      {"text": f"{query.title()} {i}"},
+        "formattedAddress": f"{i} Bench Street",
+        "rating":           round(rng.uniform(3.0, 5.0), 1),
+        "userRatingCount":  rng.randint(5, 5000),
+        "priceLevel":       rng.choice(PRICE_LEVELS),
+        "location":         {"latitude":  round(center[0] + rng.uniform(-0.02, 0.02), 6),
+                             "longitude": round(center[1] + rng.uniform(-0.02, 0.02), 6)},
+    } for i in range(n)]
+
+FAKE_DETAILS = {
+    "reviews":           [{"rating": 5, "text": "Great food, friendly staff."},
+                          {"rating": 3, "text": "Fine."}],
+    "priceLevel":        "PRICE_LEVEL_MODERATE",
+    "generativeSummary": {"overview": {"text": "A neighbourhood favourite."}},
+}
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _inject(self, endpoint):
+        # Sleep for the configured latency; return an error status to send, or None
+        server = self.server
+        with server.lock:
+            server.calls[endpoint] = server.calls.get(endpoint, 0) + 1
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        if server.error_rate and random.random() < server.error_rate:
+            with server.lock:
+                server.errors[endpoint] = server.errors.get(endpoint, 0) + 1
+            return server.error_status
+        return None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if not path.startswith("/places/"):
+            return self._reply(404, {"error": "not found"})
+        status = self._inject("places.details")
+        if status:
+            return self._reply(status, {"error": {"code": status, "message": "injected"}})
+        self._reply(200, FAKE_DETAILS)
+
+    def do_POST(self):
+        url    = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body   = json.loads(self.rfile.read(length) or b"{}")
+
+        if url.path.endswith("/places:searchText"):
+            status = self._inject("places.searchText")
+            if status:
+                return self._reply(status, {"error": {"code": status, "message": "injected"}})
+            center = ((body.get("locationBias") or {}).get("circle") or {}).get("center") or {}
+            return self._reply(200, {"places": fake_places(body.get("textQuery", ""),
+                                                           center=(center.get("latitude", 35.68),
+                                                                   center.get("longitude", 139.70)))})
+
+        if url.path == "/send_email":
+            # Same work as the send_email Cloud Function: fetch the user's
+            # suggestions from the API under test, render, send over SMTP.
+            from email_service.email_sender import build_email
+            from email_service.mailer import get_mailer
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with self.server.lock:
+                self.server.calls["email.send"] = self.server.calls.get("email.send", 0) + 1
+            resp = requests.get(f"{self.server.api_url}/suggestions/{params.get('user_id')}", timeout=60)
+            suggestions = resp.json().get("suggestions", []) if resp.status_code == 200 else []
+            if not suggestions:
+                return self._reply(404, {"error": "no suggestions"})
+            get_mailer().send(build_email(params.get("email"), suggestions))
+            return self._reply(200, {"message": "sent"})
+
+        self._reply(404, {"error": "not found"})
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """
+    Threaded HTTP server standing in for places.googleapis.com (and the
+    send_email function). Every upstream call waits `latency` ± `jitter`
+    seconds and fails with `error_status` with probability `error_rate`.
+    `api_url` is the API under test, called back by the fake send_email.
+    """
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, jitter=0.01,
+                 error_rate=0.0, error_status=503, api_url=None):
+        super().__init__((host, port), _UpstreamHandler)
+        self.api_url      = api_url
+        self.latency      = latency
+        self.jitter       = jitter
+        self.error_rate   = error_rate
+        self.error_status = error_status
+        self.lock         = threading.Lock()
+        self.calls        = {}
+        self.errors       = {}
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# ——————————————————————————————————————————————————————————————————
+# In-memory Firestore
+# ——————————————————————————————————————————————————————————————————
+class _Snapshot:
+
+    def __init__(self, ref, data):
+        self.reference = ref
+        self.id        = ref.id
+        self.exists    = data is not None
+        self._data     = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Collection:
+
+    def __init__(self, db, name):
+        self._db = db
+        self.id  = name
+
+    def document(self, doc_id):
+        return _DocumentRef(self._db, self, doc_id)
+
+    def order_by(self, field):
+        return _Query(self._db, self)
+
+
+class _DocumentRef:
+
+    def __init__(self, db, parent, doc_id):
+        self._db    = db
+        self.parent = parent
+        self.id     = doc_id
+
+    def get(self):
+        return self._db._read(self)
+
+    def set(self, data):
+        self._db._write([(self, data)])
+
+
+class _Query:
+
+    def __init__(self, db, collection, after=None):
+        self._db         = db
+        self._collection = collection
+        self._after      = after
+
+    def where(self, field, op, value):
+        # Only the cursor form used by preference_stream: '__name__' > ref
+        return _Query(self._db, self._collection, value.id)
+
+    def stream(self):
+        for doc_id in self._db._ids(self._collection.id):
+            if self._after is None or doc_id > self._after:
+                yield self._db._read(self._collection.document(doc_id))
+
+
+class _Batch:
+
+    def __init__(self, db):
+        self._db  = db
+        self._ops = []
+
+    def set(self, ref, data):
+        self._ops.append((ref, data))
+
+    def commit(self):
+        self._db._write(self._ops)
+
+
+class FakeFirestore:
+    """
+    Thread-safe in-memory stand-in for firestore.Client covering the calls
+    the API makes: document get/set, get_all, batch, and ordered streaming
+    with a document cursor. Each call sleeps `latency` seconds (one RPC) and
+    is counted in `rpcs`.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.rpcs    = {}
+        self._docs   = {}
+        self._lock   = threading.Lock()
+
+    def _rpc(self, name):
+        with self._lock:
+            self.rpcs[name] = self.rpcs.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, ref, rpc="get"):
+        if rpc:
+            self._rpc(rpc)
+        with self._lock:
+            data = self._docs.get((ref.parent.id, ref.id))
+        return _Snapshot(ref, data)
+
+    def _write(self, ops):
+        self._rpc("commit")
+        with self._lock:
+            for ref, data in ops:
+                self._docs[(ref.parent.id, ref.id)] = dict(data)
+
+    def _ids(self, collection):
+        self._rpc("stream")
+        with self._lock:
+            return sorted(doc_id for col, doc_id in self._docs if col == collection)
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+    def get_all(self, refs):
+        self._rpc("get_all")
+        return [self._read(ref, rpc=None) for ref in refs]
+
+    def batch(self):
+        return _Batch(self)
+
+    def seed(self, collection, docs):
+        # {doc_id: data} written directly, not counted as RPCs
+        with self._lock:
+            for doc_id, data in docs.items():
+                self._docs[(collection, doc_id)] = dict(data)
+
+    def count(self, collection):
+        with self._lock:
+            return sum(1 for col, _ in self._docs if col == collection)
+
+
+class AsyncFakeFirestore:
+    """
+    firestore.AsyncClient-shaped view over a FakeFirestore (the calls made
+    by services.store.AsyncSuggestionStore), for the async serving mode.
+    The simulated RPC latency is waited out on a thread, off the loop.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def collection(self, name):
+        return _AsyncCollection(self._db, name)
+
+    async def get_all(self, refs):
+        for snap in await asyncio.to_thread(self._db.get_all, [ref._ref for ref in refs]):
+            yield snap
+
+
+class _AsyncCollection:
+
+    def __init__(self, db, name):
+        self._col = db.collection(name)
+
+    def document(self, doc_id):
+        return _AsyncDocumentRef(self._col.document(doc_id))
+
+
+class _AsyncDocumentRef:
+
+    def __init__(self, ref):
+        self._ref = ref
+
+    async def get(self):
+        return await asyncio.to_thread(self._ref.get)
+
+    async def set(self, data):
+        await asyncio.to_thread(self._ref.set, data)
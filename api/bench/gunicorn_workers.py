@@ -0,0 +1,22 @@
+import os
+
+import numpy as np
+
+# ——————————————————————————————————————————————————————————————————
+# gunicorn config used by bench.workers: the service's gunicorn.conf.py
+# plus a post_worker_init hook that reads every page of the model and
+# scores a batch with it, so each worker is measured fully warmed, then
+# reports in by dropping its pid into BENCH_READY_DIR.
+# ——————————————————————————————————————————————————————————————————
+with open("gunicorn.conf.py") as f:
+    exec(compile(f.read(), "gunicorn.conf.py", "exec"))
+
+
+def post_worker_init(worker):
+    from services.resources import resources
+    model = resources.model
+    for name, value in vars(model).items():
+        if isinstance(value, np.ndarray) and value.size:
+            value.sum()
+    model.predict_proba(np.random.default_rng(0).random((1000, model.n_features_in_)) * 5)
+    open(os.path.join(os.environ["BENCH_READY_DIR"], str(os.getpid())), "w").close()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import random
+import timeit
+
+from services import responses
+from services.responses import compress, dumps, encode, project
+
+# ——————————————————————————————————————————————————————————————————
+# /suggestions payload benchmark: encode time (jsonify vs services.responses)
+# and bytes on the wire per encoding / fields= projection / revalidation.
+#
+#   python -m bench.responses [--places 5] [--review-chars 900]
+# ——————————————————————————————————————————————————————————————————
+# Pseudo-words with an English-like length mix, so text compresses roughly
+# like real reviews rather than like a tiny repeated vocabulary
+_rng  = random.Random(42)
+WORDS = ["".join(_rng.choice("etaoinshrdlucmfwypvbgkqjxz"[:_rng.choice((12, 18, 26))])
+                 for _ in range(_rng.choice((1, 2, 3, 3, 4, 4, 5, 5, 6, 7, 8, 9, 11))))
+         for _ in range(3000)]
+
+
+def text(rng, chars):
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words).capitalize() + "."
+
+def suggestion(rng, i, review_chars):
+    pid = f"ChIJ{rng.getrandbits(96):024x}"
+    ref = f"places/{pid}/photos/AUc7tXV{rng.getrandbits(256):064x}"
+    return {
+        "name":               f"Trattoria {i}",
+        "address":            f"{rng.randint(1, 30)}-{rng.randint(1, 20)} Jingumae, Shibuya City, Tokyo 150-0001, Japan",
+        "rating":             round(rng.uniform(3.8, 4.9), 1),
+        "total_reviews":      rng.randint(20, 4000),
+        "photo_url":          f"https://places.googleapis.com/v1/{ref}/media?maxHeightPx=400&key=AIzaSy{'x' * 33}",
+        "place_id":           pid,
+        "maps_url":           f"https://www.google.com/maps/place/?q=place_id:{pid}",
+        "save_link":          f"https://www.google.com/maps/search/?api=1&query=Google&query_place_id={pid}",
+        "price_level":        "PRICE_LEVEL_MODERATE",
+        "generative_summary": text(rng, 160),
+        "latest_review":      text(rng, review_chars),
+    }
+
+def jsonify_bytes(app, body):
+    with app.app_context():
+        return app.json.response(body).get_data()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /suggestions response encoding")
+    parser.add_argument("--places", type=int, default=5)
+    parser.add_argument("--review-chars", type=int, default=900)
+    parser.add_argument("--fields", default="name,address,rating,maps_url,photo_url")
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    from flask import Flask
+    app   = Flask(__name__)
+    rng   = random.Random(0)
+    body  = {"suggestions": [suggestion(rng, i, args.review_chars) for i in range(args.places)]}
+    small = {"suggestions": project(body["suggestions"], tuple(args.fields.split(",")))}
+
+    print(f"{'encode':34} {'µs/response':>12}")
+    cases = [
+        ("jsonify (before)",             lambda: jsonify_bytes(app, body)),
+        ("json.dumps compact",           lambda: json.dumps(body, separators=(",", ":")).encode()),
+        ("orjson" if responses.orjson else "dumps (no orjson)", lambda: dumps(body)),
+        ("dumps + gzip",                 lambda: compress(dumps(body), "gzip")),
+    ]
+    if responses.brotli is not None:
+        cases.append(("dumps + br", lambda: compress(dumps(body), "br")))
+    cases.append(("encode() full path, br/gzip",  lambda: encode(body, 200, "gzip, deflate, br", cacheable=False)))
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"{name:34} {best * 1e6:>12.1f}")
+
+    before = len(jsonify_bytes(app, body))
+    print(f"\n{'bytes on the wire':34} {'bytes':>12} {'vs before':>10}")
+    rows = [
+        ("jsonify (before)",            before),
+        ("identity",                    len(encode(body, 200, "identity")[2])),
+        ("gzip",                        len(encode(body, 200, "gzip")[2])),
+    ]
+    if responses.brotli is not None:
+        rows.append(("br", len(encode(body, 200, "br")[2])))
+    rows += [
+        (f"fields={args.fields}",       len(encode(small, 200, "identity")[2])),
+        ("  + gzip",                    len(encode(small, 200, "gzip")[2])),
+    ]
+    for name, size in rows:
+        print(f"{name:34} {size:>12} {(size - before) / before * 100:>+9.1f}%")
+
+if __name__ == '__main__':
+    main()
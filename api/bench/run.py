@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import httpx
+
+from bench.fakes import AsyncFakeFirestore, FakeFirestore, FakeUpstream
+from email_service.smtp_sink import SMTPSink
+
+# ——————————————————————————————————————————————————————————————————
+# Benchmark harness: create_app() (or asgi:app) served in-process against
+# local stand-ins — fake Places + send_email upstream with latency / error
+# injection, in-memory Firestore (or the emulator) and an SMTP sink — with
+# load-test scenarios reporting p50/p95/p99 and RPS.
+#
+#   PYTHONPATH=.. python -m bench.run          (from api/; ml/ must be importable)
+#   python -m bench.run --scenarios suggestions --mode async
+#   python -m bench.run --save bench/baselines/main.json
+#   python -m bench.run --compare bench/baselines/main.json
+#
+# With FIRESTORE_EMULATOR_HOST set and --firestore emulator, the real client
+# talks to the emulator instead of the in-memory fake.
+# ——————————————————————————————————————————————————————————————————
+SCENARIOS = ("suggestions", "preferences", "send_all")
+CUISINES  = ("italian", "japanese", "thai", "mexican", "indian")
+METRICS   = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def user_prefs(i):
+    # Users spread over 5 cuisines x 20 location cells
+    return {
+        "email":    f"user{i}@bench.local",
+        "cuisine":  CUISINES[i % len(CUISINES)],
+        "location": f"{35.60 + (i // len(CUISINES)) % 20 * 0.02:.4f},139.7000",
+    }
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _model_path():
+    for path in ("suggestion_model.npz", "../deployment/suggestion_model.npz"):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError("suggestion_model.npz not found; run from api/")
+
+
+def start_environment(args):
+    """
+    Start the stand-ins and point the API at them. Must run before the app
+    modules are imported, since they read their configuration at import.
+    """
+    port     = _free_port()
+    upstream = FakeUpstream(latency=args.places_latency_ms / 1000, jitter=args.places_jitter_ms / 1000,
+                            error_rate=args.error_rate, error_status=args.error_status,
+                            api_url=f"http://127.0.0.1:{port}").start()
+    sink     = SMTPSink().start()
+
+    os.environ.update({
+        "PLACES_BASE_URL": upstream.url,
+        "MAPS_API_KEY":    "bench",
+        "SEND_EMAIL_URL":  f"{upstream.url}/send_email",
+        "SMTP_HOST":       "127.0.0.1",
+        "SMTP_PORT":       str(sink.port),
+        "SMTP_STARTTLS":   "0",
+        "SENDER_EMAIL":    "bench@bench.local",
+    })
+    os.environ.setdefault("EMAIL_DISPATCH_RATE", "0")  # no send rate limit
+    os.environ.setdefault("LOG_LEVEL", "WARNING")      # no per-request access log
+    return upstream, sink, port
+
+def start_app(args, port):
+    from ml.inference import load_scorer
+    from services.resources import resources
+
+    db = None
+    if args.firestore == "memory":
+        db = FakeFirestore(latency=args.firestore_latency_ms / 1000)
+        db.seed("preferences", {f"user{i}": user_prefs(i) for i in range(args.users)})
+        resources.override("db", db)
+        resources.override("adb", AsyncFakeFirestore(db))
+    resources.override("model", load_scorer(_model_path()))
+
+    if args.mode == "async":
+        import uvicorn
+        from asgi import app
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                               access_log=False))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+    else:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        from main import app
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args):
+                pass
+        server = make_server("127.0.0.1", port, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    if db is None:
+        # Emulator: seed through the real client, 500 writes per batch
+        col = resources.db.collection("preferences")
+        for i in range(0, args.users, 500):
+            batch = resources.db.batch()
+            for j in range(i, min(i + 500, args.users)):
+                batch.set(col.document(f"user{j}"), user_prefs(j))
+            batch.commit()
+    return db
+
+
+# ——————————————————————————————————————————————————————————————————
+# Scenarios
+# ——————————————————————————————————————————————————————————————————
+def run_suggestions(base, args):
+    from tools.load_test import run_load
+
+    def suggestions(i):
+        return "GET", f"{base}/suggestions/user{i % args.users}", None
+    return asyncio.run(run_load(suggestions, args.concurrency, args.requests))
+
+def run_preferences(base, args):
+    from tools.load_test import run_load
+
+    def preferences(i):
+        # Alternate writes and reads
+        uid = f"user{i % args.users}"
+        if i % 2:
+            return "GET", f"{base}/preferences/{uid}", None
+        return "POST", f"{base}/preferences", {"user_id": uid, "preferences": user_prefs(i % args.users)}
+    return asyncio.run(run_load(preferences, args.concurrency, args.requests))
+
+def run_send_all(base, args):
+    """
+    One POST /send_emails_to_all over every seeded user; RPS is users per
+    second, percentiles are the per-user email.send calls.
+    """
+    start = time.perf_counter()
+    resp  = httpx.post(f"{base}/send_emails_to_all", json={}, timeout=None)
+    elapsed = time.perf_counter() - start
+    body  = resp.json()
+    sends = httpx.get(f"{base}/stats").json().get("http", {}).get("email.send", {})
+    processed = body.get("processed", 0)
+    return {
+        "url":       "send_all",
+        "requests":  processed,
+        "ok":        processed - len(body.get("errors") or []),
+        "statuses":  {resp.status_code: 1},
+        "rps":       round(processed / elapsed, 1) if elapsed else 0.0,
+        "p50_ms":    sends.get("p50_ms", 0.0),
+        "p95_ms":    sends.get("p95_ms", 0.0),
+        "p99_ms":    sends.get("p99_ms", 0.0),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+RUNNERS = {"suggestions": run_suggestions, "preferences": run_preferences, "send_all": run_send_all}
+
+
+# ——————————————————————————————————————————————————————————————————
+# Reporting
+# ——————————————————————————————————————————————————————————————————
+def report(results, baseline=None):
+    print(f"{'scenario':14} {'ok':>6}" + "".join(f"{m:>10}" for m in METRICS))
+    for name, r in results["scenarios"].items():
+        print(f"{name:14} {r['ok']:>6}" + "".join(f"{r[m]:>10}" for m in METRICS))
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            deltas = [(r[m] - base[m]) / base[m] * 100 if base[m] else 0.0 for m in METRICS]
+            print(f"{'  vs baseline':21}" + "".join(f"{d:>+9.1f}%" for d in deltas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against local stand-ins")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync",
+                        help="serve main:app (werkzeug, threaded) or asgi:app (uvicorn)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--places-latency-ms", type=float, default=50.0)
+    parser.add_argument("--places-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--firestore", choices=("memory", "emulator"), default="memory")
+    parser.add_argument("--firestore-latency-ms", type=float, default=5.0)
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    args = parser.parse_args()
+
+    upstream, sink, port = start_environment(args)
+    db   = start_app(args, port)
+    base = f"http://127.0.0.1:{port}"
+
+    config  = {k: v for k, v in vars(args).items() if k not in ("save", "compare")}
+    results = {"config": config, "scenarios": {}}
+    for name in args.scenarios.split(","):
+        print(f"⏱️ {name} ...", flush=True)
+        results["scenarios"][name] = RUNNERS[name](base, args)
+    results["upstream_calls"]  = dict(upstream.calls)
+    results["upstream_errors"] = dict(upstream.errors)
+    results["smtp_messages"]   = len(sink.messages)
+    if db is not None:
+        results["firestore_rpcs"] = dict(db.rpcs)
+    results["stats"] = httpx.get(f"{base}/stats").json()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"💾 baseline written to {args.save}", flush=True)
+
+    upstream.stop()
+    sink.stop()
+
+
+if __name__ == '__main__':
+    main()
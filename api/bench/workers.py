@@ -0,0 +1,89 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+# ——————————————————————————————————————————————————————————————————
+# Per-worker memory of the gunicorn service with and without the shared
+# model: starts gunicorn (bench.gunicorn_workers = gunicorn.conf.py + a
+# warm-up hook) with N workers for each GUNICORN_PRELOAD x MODEL_MMAP
+# setting and reads /proc/<pid>/smaps_rollup of the master and workers.
+#
+#   PYTHONPATH=.. python -m bench.workers [--workers 4] [--model path.npz]
+#
+# RSS counts shared pages in every process that maps them; PSS splits them
+# between those processes (sum of PSS ~ the container's memory); private
+# is what each extra worker costs.
+# ——————————————————————————————————————————————————————————————————
+CASES = (
+    ("before: no preload, private copy", "0", "0"),
+    ("preload",                          "1", "0"),
+    ("mmap",                             "0", "1"),
+    ("preload + mmap (default)",         "1", "1"),
+)
+
+
+def smaps(pid):
+    # {"rss", "pss", "private"} in MB from /proc/<pid>/smaps_rollup
+    kb = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                kb[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss":     kb["Rss"] / 1024,
+            "pss":     kb["Pss"] / 1024,
+            "private": (kb["Private_Clean"] + kb["Private_Dirty"]) / 1024}
+
+def build_model(path, rows):
+    # Synthetic impression log -> forest as the training pipeline fits it
+    from ml.dataset import write_synthetic
+    from ml.train_model import export_compiled
+    from ml.train_pipeline import train_streaming
+    with tempfile.TemporaryDirectory() as tmp:
+        model, _ = train_streaming([write_synthetic(os.path.join(tmp, "impressions.jsonl"), rows)])
+    return export_compiled(model, path)
+
+def measure(model, workers, preload, mmap):
+    with tempfile.TemporaryDirectory() as ready:
+        env = dict(os.environ, MODEL_PATH=model, GUNICORN_PRELOAD=preload, MODEL_MMAP=mmap,
+                   WEB_CONCURRENCY=str(workers), PORT="0", BENCH_READY_DIR=ready,
+                   POOL_REFRESH_INTERVAL="0", LOG_LEVEL="WARNING")
+        proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "python:bench.gunicorn_workers"],
+                                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 120
+            while len(os.listdir(ready)) < workers:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"gunicorn did not start {workers} workers")
+                time.sleep(0.2)
+            time.sleep(1.0)
+            return smaps(proc.pid), [smaps(int(pid)) for pid in sorted(os.listdir(ready))]
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory with and without a shared model")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model", help="compiled .npz (default: train one on --rows synthetic rows)")
+    parser.add_argument("--rows", type=int, default=300_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model or build_model(os.path.join(tmp, "suggestion_model.npz"), args.rows)
+        print(f"model {os.path.getsize(model) / 2**20:.1f} MB, {args.workers} workers\n")
+        print(f"{'':34} {'worker MB (mean)':>26} {'master':>8} {'total':>8}")
+        print(f"{'':34} {'rss':>8} {'pss':>8} {'private':>8} {'pss':>8} {'pss':>8}")
+        for name, preload, mmap in CASES:
+            master, workers = measure(os.path.abspath(model), args.workers, preload, mmap)
+            mean  = {k: sum(w[k] for w in workers) / len(workers) for k in ("rss", "pss", "private")}
+            total = master["pss"] + sum(w["pss"] for w in workers)
+            print(f"{name:34} {mean['rss']:>8.1f} {mean['pss']:>8.1f} {mean['private']:>8.1f} "
+                  f"{master['pss']:>8.1f} {total:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import gc
+import os
+
+# ——————————————————————————————————————————————————————————————————
+# gunicorn -c gunicorn.conf.py
+#
+# SERVING_MODE=sync  (default) Flask app on sync workers, as before.
+# SERVING_MODE=async asgi:app on uvicorn workers: /suggestions/<user_id>
+#                    runs on the event loop, so one worker holds hundreds
+#                    of in-flight requests instead of one.
+#
+# GUNICORN_PRELOAD=1 (default) imports the app, and loads the model, once in
+# the master before forking, so every worker shares those pages instead of
+# holding its own copy (with MODEL_MMAP=1 the forest is also a read-only
+# mapping of the file). Per-process startup (pool refresher, client warmup)
+# then runs in each worker from post_fork. Code changes need a restart, not
+# a HUP, in this mode.
+# ——————————————————————————————————————————————————————————————————
+SERVING_MODE = os.environ.get("SERVING_MODE", "sync").strip().lower()
+preload_app  = os.environ.get("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Read by services.resources / main.create_app when the master imports the app
+    os.environ["APP_PRELOAD"] = "1"
+
+# timeout 0: no worker kill, Cloud Run's request timeout applies instead.
+# /send_emails_to_all and /jobs/* run for minutes; with a non-zero timeout
+# send_emails_to_all caps its budget to fit (routes.suggestions.dispatch_budget).
+bind    = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "0"))
+
+if SERVING_MODE == "async":
+    wsgi_app     = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app     = "main:app"
+    threads      = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+
+def when_ready(server):
+    # services.metrics keeps a per-process registry: with several workers a
+    # scrape of /metrics sees one of them at random
+    if workers > 1:
+        server.log.warning(f"{workers} workers: /metrics reports one worker per scrape; "
+                           "run one worker per instance to scrape complete counters")
+
+def pre_fork(server, worker):
+    # Move everything the master has imported out of the collector's reach:
+    # otherwise each worker's first GC pass writes to (and so copies) those pages
+    if preload_app:
+        gc.freeze()
+
+def post_fork(server, worker):
+    if preload_app:
+        from main import start_worker
+        from services.resources import resources
+        start_worker(resources)
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from email_service.email_sender import build_email, render_many
+from email_service.mailer import SMTP_POOL_SIZE, get_mailer
+from routes.suggestions import (filter_and_format_results, get_pool, pools, preference_stream,
+                                record_sent, score_page, search_key, search_params, search_places,
+                                select_from_pool)
+from services.history import RecentPlaces
+from services.pipeline import Pipeline, Stage
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+from services.resources import resources
+from services.store import HistoryWriter, SuggestionStore
+
+# ——————————————————————————————————————————————————————————————————
+# Daily email batch, in one process:
+#   read preferences → group by search key → search (+ histories) → score
+#   → enrich → render (batches) → send (send_many, + history)
+# With suggestion pools enabled (services.pools) "search" reads the group's
+# pool and "enrich" only samples from it.
+# Replaces the per-user HTTP hops (send_emails_to_all → email function →
+# GET /suggestions/<user_id>) with bounded in-memory queues. Rendered
+# messages go out in batches of up to PIPELINE_SEND_BATCH over one pooled
+# SMTP session each, on as many send workers as the pool has sessions.
+# Users without an email, cuisine or location, or without any suggestion,
+# are logged and counted under "skipped".
+#
+#   python -m jobs.daily_emails [--dry-run] [--limit N]
+#   POST /jobs/daily_emails {"dry_run": true}   (background run, see routes/jobs.py)
+# ——————————————————————————————————————————————————————————————————
+GROUP_WINDOW = int(os.environ.get("PIPELINE_GROUP_WINDOW", "500"))
+IO_WORKERS   = int(os.environ.get("PIPELINE_IO_WORKERS", "8"))
+CPU_WORKERS  = int(os.environ.get("PIPELINE_CPU_WORKERS", str(os.cpu_count() or 2)))
+QUEUE_SIZE   = int(os.environ.get("PIPELINE_QUEUE_SIZE", "100"))
+SEND_BATCH   = int(os.environ.get("PIPELINE_SEND_BATCH", "25"))
+
+log = get_logger("daily_emails")
+
+
+class Skipped:
+    """Users left out of the run, counted per reason (thread-safe) and logged."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock  = threading.Lock()
+
+    def __call__(self, reason, user_id):
+        with self._lock:
+            self.counts[reason] += 1
+        log.warning(f"skipping user: {reason}", extra=fields(user_id=user_id))
+
+
+def group_by_search_key(users, window=GROUP_WINDOW, skipped=None):
+    """
+    Group a stream of (user_id, prefs) into (search params, [(user_id, email)])
+    so users sharing a query, type and location cell share one search. Groups
+    are flushed every `window` users to keep memory bounded. Users without
+    an email, cuisine or location are reported to `skipped(reason, user_id)`.
+    """
+    skipped = skipped or Skipped()
+    groups  = OrderedDict()
+    seen    = 0
+    for uid, prefs in users:
+        email  = prefs.get("email")
+        params = search_params(prefs)
+        if not email:
+            skipped("no email", uid)
+            continue
+        if params is None:
+            skipped("no cuisine or location", uid)
+            continue
+        key = search_key(*params)
+        groups.setdefault(key, (params, []))[1].append((uid, email))
+        seen += 1
+        if seen >= window:
+            yield from groups.values()
+            groups.clear()
+            seen = 0
+    yield from groups.values()
+
+
+def build_pipeline(dry_run=False, store=None, skipped=None):
+    mailer  = None if dry_run else get_mailer()
+    store   = store or SuggestionStore(resources.db)
+    skipped = skipped or Skipped()
+
+    def search(group):
+        # I/O: the group's search or pool plus every member's history, in one get_all
+        params, users = group
+        if pools.enabled:
+            pool, status = get_pool(search_key(*params))
+            places = None
+        else:
+            pool, (places, status) = None, search_places(*params)
+        if pool is None and places is None:
+            raise RuntimeError(f"Text Search failed with status {status} for {len(users)} users")
+        histories = store.load_histories([uid for uid, _ in users])
+        return [(pool, places, params[2:4], users, histories)]
+
+    def score(group):
+        # One model call per group: distance from the group's location, no per-user history
+        pool, places, origin, users, histories = group
+        scores = score_page(places, origin=origin) if pool is None else None
+        return [(uid, email, pool, places, origin, scores, histories.get(uid, {})) for uid, email in users]
+
+    def enrich(job):
+        uid, email, pool, places, origin, scores, history = job
+        recent = RecentPlaces.from_doc(history)
+        if pool is not None:
+            suggs = select_from_pool(pool, recent, user_id=uid, origin=origin)
+        else:
+            suggs = filter_and_format_results(places, user_id=uid, scores=scores,
+                                              record_history=False, history=history, store=store)
+        if not suggs:
+            skipped("no suggestions", uid)
+            return []
+        return [(uid, email, suggs, recent)]
+
+    def render(jobs):
+        # One batch in, one batch of messages out, all through the same compiled template
+        bodies = render_many(suggs for _, _, suggs, _ in jobs)
+        return [[(uid, build_email(email, suggs, html), suggs, recent)
+                 for (uid, email, suggs, recent), html in zip(jobs, bodies)]]
+
+    def send(batch):
+        # One pooled SMTP session per batch. History is recorded only for the
+        # messages that went out; a failed one leaves the user's history untouched
+        if mailer is None:
+            return [uid for uid, _, _, _ in batch]
+        sent = []
+        for (uid, _, suggs, recent), error in zip(batch, mailer.send_many(msg for _, msg, _, _ in batch)):
+            if error is not None:
+                ERRORS.inc(where="daily_emails.send")
+                log.error(f"email send failed: {error}", extra=fields(user_id=uid))
+                continue
+            record_sent(store, uid, recent, suggs)
+            sent.append(uid)
+        return sent
+
+    return Pipeline([
+        Stage("search", search, workers=IO_WORKERS),
+        Stage("score",  score,  workers=1),
+        Stage("enrich", enrich, workers=IO_WORKERS),
+        Stage("render", render, workers=CPU_WORKERS, batch=SEND_BATCH),
+        Stage("send",   send,   workers=SMTP_POOL_SIZE),
+    ], queue_size=QUEUE_SIZE)
+
+
+def run(dry_run=False, limit=None):
+    users = ((uid, doc.to_dict()) for uid, doc in preference_stream())
+    if limit:
+        users = islice(users, limit)
+    # History writes are buffered and committed in batches of up to 500
+    writer   = HistoryWriter(resources.db)
+    store    = SuggestionStore(resources.db, writer=writer)
+    skipped  = Skipped()
+    try:
+        pipeline = build_pipeline(dry_run=dry_run, store=store, skipped=skipped)
+        pipeline.run(group_by_search_key(users, skipped=skipped))
+    finally:
+        writer.flush()
+    stats = pipeline.stats()
+    # Every user enrich let through either got an email or failed on the way
+    enriched = next(s for s in pipeline.stages if s.name == "enrich").emitted
+    stats["sent"]    = pipeline.stages[-1].emitted
+    stats["failed"]  = enriched - stats["sent"]
+    stats["skipped"] = dict(skipped.counts)
+    stats["dry_run"] = dry_run
+    stats["history_commits"] = writer.commits
+    log.info("daily email pipeline finished", extra=fields(**{k: v for k, v in stats.items() if k != "stages"}))
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Send the daily suggestion emails in-process")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="run every stage but skip the SMTP send and history writes")
+    parser.add_argument("--limit", type=int, default=None, help="only process the first N users")
+    args = parser.parse_args()
+    print(json.dumps(run(dry_run=args.dry_run, limit=args.limit), indent=2))
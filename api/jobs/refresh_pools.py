@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from routes.suggestions import build_pool, catalog, preference_stream, search_key, search_params
+from services.log import fields, get_logger
+
+# ——————————————————————————————————————————————————————————————————
+# Full pool refresh: one pass over preferences collects every search key in
+# use (each query variant of each user, per cuisine type and location cell)
+# and rebuilds its pool. With POOL_BACKEND=firestore the pools are shared,
+# so the API instances and the daily email job read them instead of calling
+# Places. Places found along the way are saved to the catalog file
+# (CATALOG_PATH) at the end.
+#
+#   python -m jobs.refresh_pools [--limit N]
+#   POST /jobs/refresh_pools   (background run, see routes/jobs.py)
+# ——————————————————————————————————————————————————————————————————
+POOL_BUILD_WORKERS = int(os.environ.get("POOL_BUILD_WORKERS", "4"))
+
+log = get_logger("refresh_pools")
+
+
+def pool_keys(users):
+    """Distinct search keys for a stream of (user_id, prefs)."""
+    keys = set()
+    for _, prefs in users:
+        for variant in prefs.get("query_variants") or [None]:
+            params = search_params(dict(prefs, query_variants=[variant] if variant else []))
+            if params is not None:
+                keys.add(search_key(*params))
+    return keys
+
+def run(limit=None, workers=POOL_BUILD_WORKERS):
+    start = time.perf_counter()
+    users = ((uid, doc.to_dict()) for uid, doc in preference_stream())
+    if limit:
+        users = islice(users, limit)
+    keys = sorted(pool_keys(users))
+
+    built, failed = 0, []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for key, result in zip(keys, pool.map(_build, keys)):
+            if result:
+                built += 1
+            else:
+                failed.append("|".join(key))
+
+    catalog.save()
+    stats = {"keys": len(keys), "built": built, "failed": failed, "catalog": len(catalog.catalog),
+             "elapsed_s": round(time.perf_counter() - start, 3)}
+    log.info("pool refresh finished", extra=fields(keys=len(keys), built=built, failed=len(failed)))
+    return stats
+
+def _build(key):
+    try:
+        pool, status = build_pool(key)
+    except Exception as e:
+        log.warning(f"pool build failed: {e}", extra=fields(key="|".join(key)))
+        return False
+    if pool is None:
+        log.warning("pool build failed", extra=fields(key="|".join(key), status=status))
+    return pool is not None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild every suggestion pool in use")
+    parser.add_argument("--limit", type=int, default=None, help="only scan the first N users")
+    args = parser.parse_args()
+    print(json.dumps(run(limit=args.limit), indent=2))
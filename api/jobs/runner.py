@@ -0,0 +1,64 @@
+import threading
+import time
+import uuid
+
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+
+log = get_logger("jobs")
+
+
+class JobRunner:
+    """
+    Runs batch jobs on a background thread, so the request that starts one
+    returns at once instead of holding a worker (and its timeout) for the
+    whole run. One run per job name at a time; the latest run of each job is
+    kept, with its stats or error, for status checks.
+    """
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def start(self, name, fn, **kwargs):
+        """(run, started): a new run of `fn(**kwargs)`, or the one already in progress."""
+        with self._lock:
+            current = self._runs.get(name)
+            if current is not None and current["state"] == "running":
+                return dict(current), False
+            run = {"job": name, "id": uuid.uuid4().hex[:16], "state": "running",
+                   "started": time.time(), "args": kwargs}
+            self._runs[name] = run
+        threading.Thread(target=self._run, args=(run, fn, kwargs), name=f"job-{name}", daemon=True).start()
+        return dict(run), True
+
+    def _run(self, run, fn, kwargs):
+        try:
+            result = fn(**kwargs)
+        except Exception as e:
+            ERRORS.inc(where=f"jobs.{run['job']}")
+            log.exception(f"{run['job']} failed", extra=fields(run_id=run["id"]))
+            update = {"state": "failed", "error": str(e)}
+        else:
+            update = {"state": "finished", "result": result}
+        with self._lock:
+            run.update(update, finished=time.time())
+
+    def status(self, name):
+        with self._lock:
+            run = self._runs.get(name)
+            return dict(run) if run is not None else None
+
+    def wait(self, name, timeout=None):
+        # Tests and scripts: block until the current run of `name` is over
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            run = self.status(name)
+            if run is None or run["state"] != "running":
+                return run
+            if deadline is not None and time.monotonic() >= deadline:
+                return run
+            time.sleep(0.01)
+
+
+runner = JobRunner()
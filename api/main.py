@@ -1,25 +1,87 @@
 import os
-from flask import Flask, request
+from flask import Flask, Response, jsonify, request
 from routes.health import health_check
-from routes.suggestions import suggestions
+from routes.suggestions import (suggestions, send_all, details_cache, search_cache,
+                                details_flight, search_flight, pools, pool_refresher, catalog)
 from routes.preferences import preferences_bp
 from routes.email_trigger import email_trigger  # Blueprint for triggering emails
+from routes.jobs import jobs
+from routes import suggestions_async
+from services.log import init_app as init_logging
+from services.metrics import REGISTRY
+from services.resources import PRELOADED, WARMUP_ON_START, init_app as init_resources
+from services.store import preferences_cache
+
+def start_worker(resources):
+    """
+    Per-process startup: the pool refresher thread (shared pools only) and,
+    with WARMUP_ON_START=1, every shared resource. create_app runs it, except in
+    a preloading gunicorn master (threads and client connections do not
+    survive a fork), where gunicorn.conf.py's post_fork runs it per worker.
+    """
+    # Keep the shared suggestion pools fresh (POOL_REFRESH_INTERVAL); the
+    # per-key lease means one process rebuilds each key. Per-process pools
+    # get no refresher: every worker would rebuild the same keys.
+    if pools.enabled and pools.shared is not None:
+        pool_refresher.start()
+    if WARMUP_ON_START:
+        resources.warmup()
 
 def create_app():
     app = Flask(__name__)
     app.config.from_pyfile('config.py', silent=True)
 
+    # One lazily-built Firestore client / HTTP session / model per process
+    resources = init_resources(app)
+
+    # Request ids, JSON access log and request metrics for every route
+    init_logging(app)
+
+    if not PRELOADED:
+        start_worker(resources)
+
     # Register blueprints
     app.register_blueprint(health_check)
     app.register_blueprint(suggestions)
+    app.register_blueprint(send_all)
     app.register_blueprint(preferences_bp)
     app.register_blueprint(email_trigger)
+    app.register_blueprint(jobs)
 
     # Add an explicit health check endpoint for quick testing
     @app.route('/health')
     def health():
         return "OK", 200
 
+    # Explicit warmup hook: build every shared resource now and report how
+    # long each one took (Cloud Run startup probe or a post-deploy call).
+    @app.route('/warmup')
+    def warmup():
+        timings = resources.warmup()
+        return jsonify({"loaded": resources.loaded(),
+                        "init_ms": {k: round(v * 1000, 1) for k, v in timings.items()}}), 200
+
+    # Per-endpoint upstream latency and cache counters for this process
+    @app.route('/stats')
+    def stats():
+        loaded = resources.loaded()
+        http   = resources.http.stats() if "http" in loaded else {}
+        ahttp  = resources.ahttp.stats() if "ahttp" in loaded else {}
+        return jsonify({"http": http, "http_async": ahttp, "details_cache": details_cache.stats(),
+                        "search_cache": search_cache.stats(), "pools": pools.stats(),
+                        "catalog": catalog.stats(), "preferences_cache": preferences_cache.stats(),
+                        "singleflight": {"search": search_flight.stats(),
+                                         "details": details_flight.stats(),
+                                         "search_async": suggestions_async.search_flight.stats(),
+                                         "details_async": suggestions_async.details_flight.stats()}}), 200
+
+    # Prometheus scrape endpoint: stage timings, upstream calls, cache and
+    # error counters for this process only (one worker per instance; see
+    # services.metrics)
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
     # Optional: Diagnostic route for debugging user_id propagation
     @app.route('/whoami')
     def whoami():
@@ -0,0 +1,51 @@
+from flask import Blueprint, jsonify, request
+from jobs.runner import runner
+from services.log import fields, get_logger
+
+# Batch jobs run on a background thread of the instance that receives the
+# POST (202 with the run id; 409 while a run of the same job is going on),
+# so they are not bound by the request or worker timeout. On Cloud Run that
+# needs CPU allocated outside requests (--no-cpu-throttling); otherwise run
+# `python -m jobs.daily_emails` / `python -m jobs.refresh_pools` as a Cloud
+# Run Job instead. GET /jobs/<name> reports the latest run and its stats.
+jobs = Blueprint('jobs', __name__)
+log  = get_logger("jobs")
+
+def _start(name, fn, **kwargs):
+    run, started = runner.start(name, fn, **kwargs)
+    if started:
+        log.info(f"{name} started", extra=fields(run_id=run["id"]))
+    return jsonify(run), (202 if started else 409)
+
+@jobs.route('/jobs/daily_emails', methods=['POST'])
+def daily_emails():
+    """
+    Start the in-process daily email pipeline (see jobs/daily_emails.py).
+
+    Optional JSON body: {"dry_run": true, "limit": 100}
+    """
+    from jobs.daily_emails import run
+
+    body = request.get_json(silent=True) or {}
+    return _start("daily_emails", run, dry_run=bool(body.get("dry_run")), limit=body.get("limit"))
+
+@jobs.route('/jobs/refresh_pools', methods=['POST'])
+def refresh_pools():
+    """
+    Start a rebuild of the suggestion pool of every search key in use (see
+    jobs/refresh_pools.py); meant for Cloud Scheduler with POOL_BACKEND=firestore.
+
+    Optional JSON body: {"limit": 100}
+    """
+    from jobs.refresh_pools import run
+
+    body = request.get_json(silent=True) or {}
+    return _start("refresh_pools", run, limit=body.get("limit"))
+
+@jobs.route('/jobs/<name>', methods=['GET'])
+def job_status(name):
+    """Latest run of a job: state (running / finished / failed), stats or error."""
+    run = runner.status(name)
+    if run is None:
+        return jsonify({"error": f"No run of '{name}' on this instance."}), 404
+    return jsonify(run), 200
@@ -1,11 +1,46 @@
-from flask import Blueprint, request, jsonify
-from google.cloud import firestore
+import json
+import os
+from itertools import islice
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+from services.resources import resources
+from services.store import MAX_BATCH_WRITES
 
 # Create a blueprint for user preferences
 preferences_bp = Blueprint('preferences_bp', __name__)
 
-# Initialize Firestore client
-db = firestore.Client()
+log = get_logger("preferences")
+
+# Bulk import: documents per Firestore WriteBatch, and how many per-line
+# errors the response lists (the rest are only counted).
+PREFS_IMPORT_BATCH      = min(int(os.environ.get("PREFS_IMPORT_BATCH", "500")), MAX_BATCH_WRITES)
+PREFS_IMPORT_MAX_ERRORS = int(os.environ.get("PREFS_IMPORT_MAX_ERRORS", "100"))
+READ_BLOCK     = 64 * 1024
+MAX_LINE_BYTES = 1024 * 1024  # a Firestore document is at most 1 MiB
+
+def validate_preferences(user_id, prefs):
+    """Error message for a (user_id, preferences) record, or None when it is valid."""
+    if not user_id or not prefs:
+        return "Missing user_id or preferences"
+    if not isinstance(user_id, str) or "/" in user_id or len(user_id.encode()) > 1500:
+        return "user_id must be a string without '/' (at most 1500 bytes)"
+    if not isinstance(prefs, dict):
+        return "preferences must be an object"
+    if not prefs.get("cuisine") or not prefs.get("location"):
+        return "Preferences must include 'cuisine' and 'location'"
+    try:
+        lat, lng = map(float, str(prefs["location"]).split(","))
+    except ValueError:
+        return "location must be 'lat,lng'"
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return "location out of range"
+    variants = prefs.get("query_variants")
+    if variants is not None and (not isinstance(variants, list)
+                                 or not all(isinstance(v, str) for v in variants)):
+        return "query_variants must be a list of strings"
+    return None
 
 @preferences_bp.route('/preferences', methods=['POST'])
 def set_preferences():
@@ -26,13 +61,11 @@ def set_preferences():
     user_id = data.get("user_id")
     prefs = data.get("preferences")
 
-    if not user_id or not prefs:
-        return jsonify({"error": "Missing user_id or preferences"}), 400
-
-    if not prefs.get("cuisine") or not prefs.get("location"):
-        return jsonify({"error": "Preferences must include 'cuisine' and 'location'"}), 400
+    error = validate_preferences(user_id, prefs)
+    if error:
+        return jsonify({"error": error}), 400
 
-    db.collection("preferences").document(user_id).set(prefs)
+    resources.store.save_prefs(user_id, prefs)
     return jsonify({"message": f"Preferences for user '{user_id}' updated successfully."}), 200
 
 @preferences_bp.route('/preferences/<user_id>', methods=['GET'])
@@ -40,10 +73,105 @@ def get_preferences(user_id):
     """
     Retrieve stored preferences for a specific user.
     """
-    doc_ref = db.collection("preferences").document(user_id)
-    doc = doc_ref.get()
+    prefs = resources.store.load_prefs(user_id)
 
-    if doc.exists:
-        return jsonify(doc.to_dict()), 200
+    if prefs is not None:
+        return jsonify(prefs), 200
     else:
         return jsonify({"error": f"No preferences found for user '{user_id}'."}), 404
+
+# ——————————————————————————————————————————————————————————————————
+# Bulk: NDJSON in / out, one {"user_id": ..., "preferences": {...}} per line
+# ——————————————————————————————————————————————————————————————————
+def ndjson_lines(stream, block=READ_BLOCK):
+    # Lines of a request body read `block` bytes at a time: some WSGI inputs
+    # (chunked uploads) are unbuffered, and readline() there costs a read per byte
+    tail = b""
+    while True:
+        data = stream.read(block)
+        if not data:
+            break
+        lines = (tail + data).split(b"\n")
+        tail  = lines.pop()
+        if len(tail) > MAX_LINE_BYTES:
+            raise RequestEntityTooLarge(f"NDJSON line longer than {MAX_LINE_BYTES} bytes")
+        yield from lines
+    if tail:
+        yield tail
+
+@preferences_bp.route('/preferences/import', methods=['POST'])
+def import_preferences():
+    """
+    Store preferences for many users from an NDJSON body, read line by line
+    and committed in WriteBatches of PREFS_IMPORT_BATCH documents, so memory
+    stays flat whatever the upload size. Invalid lines are skipped and
+    reported (line number + error); a later line for the same user wins.
+    """
+    counts  = {"lines": 0, "imported": 0, "invalid": 0, "failed": 0, "batches": 0}
+    errors  = []
+    pending = {}
+
+    def error(line_no, message):
+        if len(errors) < PREFS_IMPORT_MAX_ERRORS:
+            errors.append({"line": line_no, "error": message})
+
+    def commit(first_line, last_line):
+        items = list(pending.items())
+        pending.clear()
+        try:
+            resources.store.save_prefs_batch(items)
+            counts["imported"] += len(items)
+            counts["batches"]  += 1
+        except Exception as e:
+            counts["failed"] += len(items)
+            ERRORS.inc(where="preferences.import")
+            log.error(f"preferences batch failed: {e}", extra=fields(lines=f"{first_line}-{last_line}"))
+            error(first_line, f"batch of lines {first_line}-{last_line} failed: {e}")
+
+    first_line = 1
+    for line_no, line in enumerate(ndjson_lines(request.stream), start=1):
+        counts["lines"] = line_no
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            user_id, prefs = record.get("user_id"), record.get("preferences")
+        except (ValueError, AttributeError):
+            user_id, prefs, message = None, None, "not a JSON object"
+        else:
+            message = validate_preferences(user_id, prefs)
+        if message:
+            counts["invalid"] += 1
+            error(line_no, message)
+            continue
+        pending[user_id] = prefs
+        if len(pending) >= PREFS_IMPORT_BATCH:
+            commit(first_line, line_no)
+            first_line = line_no + 1
+    if pending:
+        commit(first_line, counts["lines"])
+
+    log.info("preferences import finished", extra=fields(**counts))
+    partial = counts["invalid"] or counts["failed"]
+    status  = "partial_success" if partial else "success"
+    return jsonify(dict(counts, status=status, errors=errors)), (207 if partial else 200)
+
+@preferences_bp.route('/preferences/export', methods=['GET'])
+def export_preferences():
+    """
+    Stream every user's preferences as NDJSON in user id order (the format
+    /preferences/import takes). ?after=<user_id> resumes after a user,
+    ?limit=N stops after N lines.
+    """
+    after = request.args.get("after")
+    limit = request.args.get("limit", type=int)
+    rows  = resources.store.stream_prefs(after=after)
+    if limit:
+        rows = islice(rows, limit)
+
+    def lines():
+        for user_id, prefs in rows:
+            yield json.dumps({"user_id": user_id, "preferences": prefs},
+                             ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
@@ -1,11 +1,27 @@
+import contextvars
 import os
 import random
 import time
-import traceback
-from google.cloud import firestore
-import requests
-from flask import Blueprint, jsonify
-from ml.inference import load_model, get_prediction
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+from flask import Blueprint, Response, jsonify, request
+from ml.features import FEATURE_FIELDS
+from ml.inference import score_places
+from services.catalog import catalog_from_env
+from services.details_cache import details_cache_from_env
+from services.dispatch import Dispatcher, PermanentError
+from services.geo import geohash_center, geohash_encode
+from services.history import RecentPlaces
+from services.http_client import PLACES_BASE_URL
+from services.log import fields, get_logger
+from services.metrics import ERRORS, REGISTRY, span
+from services.pools import POOL_SIZE, Pool, PoolRefresher, pool_store_from_env
+from services.resources import resources
+from services.responses import encode, parse_fields, project
+from services.selection import weighted_top_k
+from services.singleflight import SingleFlight
+from services.store import preferences_cache
+from services.ttl_cache import MISSING, TTLCache
 
 # ——————————————————————————————————————————————————————————————————
 # Blueprints & clients
@@ -13,138 +29,298 @@ from ml.inference import load_model, get_prediction
 suggestions = Blueprint('suggestions', __name__)
 send_all    = Blueprint('send_all', __name__)
 
-db    = firestore.Client()
-model = load_model()
+log = get_logger("suggestions")
+
+# Firestore client, HTTP session and model are created lazily, once per
+# process, by the shared registry (services.resources).
+
+# Details enrichment: fan-out per request and per-call timeout (seconds).
+DETAILS_MAX_WORKERS = int(os.environ.get("DETAILS_MAX_WORKERS", "8"))
+DETAILS_TIMEOUT     = float(os.environ.get("DETAILS_TIMEOUT", "5"))
+
+# Selection: how many places a request returns (and enriches; 0, the
+# default, = every eligible place), the minimum model probability to be
+# eligible, and the weight multiplier for places already sent to the user.
+SUGGESTIONS_LIMIT     = int(os.environ.get("SUGGESTIONS_LIMIT", "0"))
+SUGGESTIONS_MIN_SCORE = float(os.environ.get("SUGGESTIONS_MIN_SCORE", "0.5"))
+HISTORY_PENALTY       = float(os.environ.get("HISTORY_PENALTY", "0.05"))
+
+NO_DETAILS = ("No review available", "", "N/A")
+
+# Keys of one suggestion (format_place), for ?fields= projections; the
+# details fields are the ones that need a Place Details lookup.
+SUGGESTION_FIELDS = ("name", "address", "rating", "total_reviews", "photo_url", "place_id", "maps_url",
+                     "save_link", "price_level", "generative_summary", "latest_review")
+DETAIL_FIELDS     = ("price_level", "generative_summary", "latest_review")
+
+# Places Details rarely change: cache them per place_id (see DETAILS_CACHE_*).
+details_cache = details_cache_from_env(lambda: resources.db)
+
+# Concurrent identical upstream calls (same search key / place_id) share
+# one in-flight request and its result.
+search_flight  = SingleFlight()
+details_flight = SingleFlight()
+
+# Text Search results are shared by every user asking for the same query and
+# type within one geohash cell (SEARCH_CELL_PRECISION 6 ≈ 1.2 km x 0.6 km).
+SEARCH_CELL_PRECISION = int(os.environ.get("SEARCH_CELL_PRECISION", "6"))
+search_cache = TTLCache(
+    maxsize = int(os.environ.get("SEARCH_CACHE_SIZE", "1024")),
+    ttl     = float(os.environ.get("SEARCH_CACHE_TTL", "900")),
+)
+
+# Every place Text Search returns, indexed locally (see services.catalog):
+# searches are answered from it while it has enough fresh places nearby,
+# and it stands in for Text Search when the upstream fails.
+catalog = catalog_from_env()
+
+# Precomputed candidate pools per search key (see services.pools), built
+# once per key across concurrent callers and kept fresh in the background.
+pools          = pool_store_from_env(lambda: resources.db)
+pool_flight    = SingleFlight()
+
+# Exported at /metrics; the async handlers add their own flights here.
+CACHES  = {"details": details_cache, "search": search_cache, "pools": pools, "catalog": catalog,
+           "preferences": preferences_cache}
+FLIGHTS = {"search": search_flight, "details": details_flight, "pools": pool_flight}
+
+@REGISTRY.collector
+def _cache_metrics():
+    events, sizes = [], []
+    for name, cache in CACHES.items():
+        stats = cache.stats()
+        sizes.append(({"cache": name}, stats["size"]))
+        for event in ("hits", "misses", "evictions", "expirations", "shared_hits", "negative_hits",
+                      "shared_errors", "builds", "fallbacks"):
+            if event in stats:
+                events.append(({"cache": name, "event": event}, stats[event]))
+    flights = [({"call": name, "result": result}, count)
+               for name, flight in FLIGHTS.items()
+               for result, count in flight.stats().items() if result != "in_flight"]
+    return [
+        ("suggester_cache_events_total", "counter", "Cache lookups and evictions by outcome.", events),
+        ("suggester_cache_entries", "gauge", "Entries held in memory per cache.", sizes),
+        ("suggester_singleflight_calls_total", "counter",
+         "Upstream calls executed vs coalesced onto an in-flight call.", flights),
+    ]
 
 # ——————————————————————————————————————————————————————————————————
-# Helper: fetch review + summary + priceLevel
+# Helper: fetch review + summary + priceLevel (cached by place_id)
 # ——————————————————————————————————————————————————————————————————
-def fetch_review_and_details(place_id):
+def details_url(place_id):
     api_key = os.environ.get("MAPS_API_KEY")
     fields  = "reviews,priceLevel,generativeSummary"
-    url     = f"https://places.googleapis.com/v1/places/{place_id}?fields={fields}&key={api_key}"
+    return f"{PLACES_BASE_URL}/places/{place_id}?fields={fields}&key={api_key}"
+
+def parse_details(data):
+    """(review, summary, price_level) from a Place Details response body."""
+    reviews     = data.get("reviews", [])
+    gen_summary = data.get("generativeSummary", {})
+    summary = gen_summary.get("description", {}).get("text",
+               gen_summary.get("overview", {}).get("text", ""))
+    price_level = data.get("priceLevel", "N/A")
+
+    filtered = [r for r in reviews if r.get("rating", 0) >= 4 and r.get("text")]
+    filtered.sort(key=lambda r: len(r["text"]), reverse=True)
+    if filtered:
+        return filtered[0]["text"], summary, price_level
+    for r in reviews:
+        if r.get("text"):
+            return r["text"], summary, price_level
+    return NO_DETAILS
+
+def _fetch_details(place_id, timeout=DETAILS_TIMEOUT, deadline=None):
+    resp = resources.http.get(details_url(place_id), timeout=timeout, deadline=deadline,
+                              endpoint="places.details")
+    resp.raise_for_status()
+    return parse_details(resp.json())
+
+def fetch_review_and_details(place_id, timeout=DETAILS_TIMEOUT, deadline=None):
+    with span("details.lookup"):
+        return details_cache.get_or_fetch(
+            place_id, lambda pid: details_flight.do(pid, lambda: _fetch_details(pid, timeout, deadline)),
+            NO_DETAILS
+        )
+
+# ——————————————————————————————————————————————————————————————————
+# Helper: enrich selected suggestions with details, concurrently
+# ——————————————————————————————————————————————————————————————————
+def enrich_suggestions(suggestions_list, max_workers=DETAILS_MAX_WORKERS, timeout=DETAILS_TIMEOUT):
+    """
+    Fill price_level / generative_summary / latest_review in place, running at
+    most `max_workers` details lookups at once. Every lookup, retries
+    included, is bounded by one overall deadline (HttpClient `deadline`);
+    lookups that have not finished by then keep the "no details" defaults.
+    """
+    if not suggestions_list:
+        return suggestions_list
 
+    workers  = max(1, min(max_workers, len(suggestions_list)))
+    rounds   = -(-len(suggestions_list) // workers)
+    deadline = time.monotonic() + timeout * rounds
+    pool     = ThreadPoolExecutor(max_workers=workers)
+    # Each lookup runs in a copy of this context, so its logs keep the request id
+    futures = {pool.submit(contextvars.copy_context().run, fetch_review_and_details,
+                           s["place_id"], timeout, deadline): s
+               for s in suggestions_list}
     try:
-        resp = requests.get(url)
-        resp.raise_for_status()
-        data = resp.json()
-
-        reviews     = data.get("reviews", [])
-        gen_summary = data.get("generativeSummary", {})
-        summary = gen_summary.get("description", {}).get("text",
-                   gen_summary.get("overview", {}).get("text", ""))
-        price_level = data.get("priceLevel", "N/A")
-
-        filtered = [r for r in reviews if r.get("rating", 0) >= 4 and r.get("text")]
-        filtered.sort(key=lambda r: len(r["text"]), reverse=True)
-        if filtered:
-            return filtered[0]["text"], summary, price_level
-        for r in reviews:
-            if r.get("text"):
-                return r["text"], summary, price_level
+        # The grace second covers a connect that started just before the deadline
+        done, pending = wait(futures, timeout=deadline - time.monotonic() + 1.0)
+        for fut, s in futures.items():
+            review, summary, price = fut.result() if fut in done else NO_DETAILS
+            s["price_level"]        = price
+            s["generative_summary"] = summary
+            s["latest_review"]      = review
+        if pending:
+            ERRORS.inc(len(pending), where="details.timeout")
+            log.warning(f"{len(pending)} details lookups timed out", extra=fields(timed_out=len(pending)))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return suggestions_list
 
+# ——————————————————————————————————————————————————————————————————
+# Helper: score a whole Text Search page at once
+# ——————————————————————————————————————————————————————————————————
+def score_page(places, origin=None, last_sent=None, fallback=None):
+    # Positive-class probability per place, so candidates can be ranked;
+    # origin / last_sent feed the distance and recency features (ml.features).
+    # If the model fails: `fallback` scores, else all 0
+    try:
+        with span("score"):
+            return score_places(places, resources.model, proba=True, origin=origin, last_sent=last_sent)
     except Exception as e:
-        print(f"⚠️ fetch_review_and_details({place_id}) failed: {e}", flush=True)
-
-    return "No review available", "", "N/A"
-
-# ——————————————————————————————————————————————————————————————————
-# Helper: filter, score, shuffle & update history
-# ——————————————————————————————————————————————————————————————————
-def filter_and_format_results(places, user_id=None):
-    sent_ids = set()
-    if user_id:
-        doc = db.collection("history").document(user_id).get()
-        if doc.exists:
-            sent_ids = set(doc.to_dict().get("place_ids", []))
-
-    def build(skip_history):
-        results = []
-        for p in places:
-            pid = p.get("id")
-            if not pid or (not skip_history and pid in sent_ids):
-                continue
-
-            name          = p.get("displayName", {}).get("text")
-            address       = p.get("formattedAddress")
-            rating        = p.get("rating", 0.0)
-            reviews_count = p.get("userRatingCount", "N/A")
-
-            photo_url = None
-            if p.get("photos"):
-                ref = p["photos"][0].get("name")
-                if ref:
-                    photo_url = (
-                        f"https://places.googleapis.com/v1/{ref}/media"
-                        f"?maxHeightPx=400&key={os.environ.get('MAPS_API_KEY')}"
-                    )
-
-            try:
-                score = get_prediction([float(rating), 1.0], model)
-            except Exception:
-                score = 0
-
-            if score == 1:
-                review, summary, price = fetch_review_and_details(pid)
-                results.append({
-                    "name":               name,
-                    "address":            address,
-                    "rating":             rating,
-                    "total_reviews":      reviews_count,
-                    "photo_url":          photo_url,
-                    "place_id":           pid,
-                    "maps_url":           f"https://www.google.com/maps/place/?q=place_id:{pid}",
-                    "save_link":          f"https://www.google.com/maps/search/?api=1&query=Google&query_place_id={pid}",
-                    "price_level":        price,
-                    "generative_summary": summary,
-                    "latest_review":      review
-                })
-        return results
-
-    suggestions_list = build(False)
-    if not suggestions_list and user_id:
-        suggestions_list = build(True)
-
-    random.seed(time.time())
-    random.shuffle(suggestions_list)
-
-    if user_id and suggestions_list:
-        try:
-            hist_ref = db.collection("history").document(user_id)
-            prev     = hist_ref.get()
-            old_ids  = prev.to_dict().get("place_ids", []) if prev.exists else []
-            new_ids  = [s["place_id"] for s in suggestions_list[:3]]
-            keep     = list({*old_ids, *new_ids})[:50]
-            hist_ref.set({"place_ids": keep, "last_sent": firestore.SERVER_TIMESTAMP})
-        except Exception as e:
-            print(f"🚨 history write failed: {e}", flush=True)
+        ERRORS.inc(where="score")
+        log.warning(f"batch scoring failed: {e}", extra=fields(places=len(places)))
+        return [0] * len(places) if fallback is None else fallback
 
-    return suggestions_list
+# ——————————————————————————————————————————————————————————————————
+# Helper: format one place for the response
+# ——————————————————————————————————————————————————————————————————
+def format_place(p):
+    pid = p.get("id")
+
+    photo_url = None
+    if p.get("photos"):
+        ref = p["photos"][0].get("name")
+        if ref:
+            photo_url = (
+                f"https://places.googleapis.com/v1/{ref}/media"
+                f"?maxHeightPx=400&key={os.environ.get('MAPS_API_KEY')}"
+            )
+
+    return {
+        "name":               p.get("displayName", {}).get("text"),
+        "address":            p.get("formattedAddress"),
+        "rating":             p.get("rating", 0.0),
+        "total_reviews":      p.get("userRatingCount", "N/A"),
+        "photo_url":          photo_url,
+        "place_id":           pid,
+        "maps_url":           f"https://www.google.com/maps/place/?q=place_id:{pid}",
+        "save_link":          f"https://www.google.com/maps/search/?api=1&query=Google&query_place_id={pid}",
+        "price_level":        NO_DETAILS[2],
+        "generative_summary": NO_DETAILS[1],
+        "latest_review":      NO_DETAILS[0]
+    }
 
 # ——————————————————————————————————————————————————————————————————
-# Endpoints
+# Helper: score, select top-k, enrich & update history
 # ——————————————————————————————————————————————————————————————————
-@suggestions.route('/suggestions', methods=['GET'])
-def no_user():
-    return jsonify({"error": "Use /suggestions/<user_id>"}), 400
+def filter_and_format_results(places, user_id=None, limit=SUGGESTIONS_LIMIT, scores=None,
+                              record_history=True, history=None, store=None, origin=None, enrich=True):
+    """
+    Score every candidate once, then sample `limit` of them weighted by
+    score. Places already sent to the user stay eligible with their weight
+    scaled by HISTORY_PENALTY, so they only surface when fresh places run
+    out. Only the selected places are enriched.
 
-@suggestions.route('/suggestions/<user_id>', methods=['GET'])
-def get_suggestions_for_user(user_id):
-    pref_doc = db.collection('preferences').document(user_id).get()
-    if not pref_doc.exists:
-        return jsonify({"error": "No preferences found."}), 404
-    prefs    = pref_doc.to_dict()
+    `history` is the user's already-loaded history document ({} if none);
+    it is only read here when not given. Writes go through `store`
+    (default: the shared SuggestionStore). `origin` is the user's (lat, lng);
+    enrich=False leaves the details fields at their defaults.
+    """
+    store = store or resources.store
+    if user_id and history is None:
+        with span("history.load"):
+            history = store.load_history(user_id)
+    recent = RecentPlaces.from_doc(history)
+
+    suggestions_list = select_suggestions(places, recent, user_id=user_id, limit=limit, scores=scores,
+                                          origin=origin)
+
+    # Lazy enrichment: only the selected places cost a details round-trip.
+    if enrich:
+        with span("enrich"):
+            enrich_suggestions(suggestions_list)
+
+    if user_id and record_history:
+        record_sent(store, user_id, recent, suggestions_list)
+
+    return suggestions_list
+
+def record_sent(store, user_id, recent, suggestions_list):
+    # Everything just sent goes to the front of the user's history
+    if not suggestions_list:
+        return
+    try:
+        with span("history.save"):
+            recent.add(s["place_id"] for s in suggestions_list)
+            store.save_history(user_id, recent.to_doc())
+    except Exception as e:
+        ERRORS.inc(where="history.save")
+        log.error(f"history write failed: {e}", extra=fields(user_id=user_id))
+
+def select_suggestions(places, recent, user_id=None, limit=SUGGESTIONS_LIMIT, scores=None, origin=None):
+    """
+    Formatted, not yet enriched, top-`limit` places for a user whose
+    history is `recent` (a RecentPlaces).
+    """
+    # Score the whole page in one model call (unless the caller already did,
+    # e.g. once per shared search in the batch job).
+    if scores is None:
+        scores = score_page(places, origin=origin, last_sent=recent.last_sent() if user_id else None)
+
+    with span("select"):
+        ids     = [p.get("id") for p in places]
+        weights = history_weights(np.asarray(scores, dtype=np.float64), ids, recent if user_id else None)
+        weights[np.fromiter((not pid for pid in ids), dtype=bool, count=len(ids))] = 0.0
+        chosen  = weighted_top_k(weights, limit or int(np.count_nonzero(weights)))
+        return [format_place(places[i]) for i in chosen]
+
+def history_weights(scores, ids, recent=None):
+    """
+    Sampling weight per candidate: its score, scaled by HISTORY_PENALTY if
+    already sent (per `recent`), and 0 at or below SUGGESTIONS_MIN_SCORE.
+    """
+    weights = np.where(scores > SUGGESTIONS_MIN_SCORE, scores, 0.0)
+    if recent is not None and len(recent):
+        sent = np.fromiter((pid in recent for pid in ids), dtype=bool, count=len(ids))
+        weights = np.where(sent, weights * HISTORY_PENALTY, weights)
+    return weights
+
+# ——————————————————————————————————————————————————————————————————
+# Helper: Text Search, cached per (query, type, location cell)
+# ——————————————————————————————————————————————————————————————————
+def search_params(prefs):
+    """
+    (query_text, cuisine_type, lat, lng) for a preferences dict, or None when
+    cuisine or location is missing. Picks one of the query_variants at random.
+    """
     cuisine  = prefs.get("cuisine")
     location = prefs.get("location")
     variants = prefs.get("query_variants", [])
-
     if not cuisine or not location:
-        return jsonify({"error": "'cuisine' and 'location' required."}), 400
+        return None
 
     cuisine_type = cuisine.strip().lower().replace(" ", "_") + "_restaurant"
     lat, lng      = map(float, location.split(","))
     query_text    = random.choice(variants) if variants else cuisine.replace("_", " ")
+    return query_text, cuisine_type, lat, lng
 
+def search_key(query_text, cuisine_type, lat, lng, precision=SEARCH_CELL_PRECISION):
+    return " ".join(query_text.lower().split()), cuisine_type, geohash_encode(lat, lng, precision)
+
+def text_search_request(query_text, cuisine_type, lat, lng):
+    """(url, headers, json payload) for one Text Search call."""
     payload = {
         "textQuery": query_text,
         "includedType": cuisine_type,
@@ -157,58 +333,293 @@ def get_suggestions_for_user(user_id):
         "X-Goog-FieldMask": (
             "places.id,places.displayName,places.formattedAddress,"
             "places.rating,places.userRatingCount,places.photos,"
-            "places.generativeSummary"
+            "places.generativeSummary,places.priceLevel,places.location"
         )
     }
+    return f"{PLACES_BASE_URL}/places:searchText", headers, payload
+
+def _text_search(query_text, cuisine_type, lat, lng):
+    url, headers, payload = text_search_request(query_text, cuisine_type, lat, lng)
+    # Text Search is a read despite the POST: safe to retry
+    return resources.http.post(url, headers=headers, json=payload, endpoint="places.searchText",
+                               idempotent=True)
+
+def search_places(query_text, cuisine_type, lat, lng):
+    """
+    Return (places, status). places is None when Text Search failed.
+
+    With the cache enabled the search is biased to the cell centre rather
+    than the exact user location, so every user in the cell shares one
+    upstream call and one result.
+    """
+    with span("search"):
+        key    = search_key(query_text, cuisine_type, lat, lng)
+        places = search_cache.get(key)
+        if places is not MISSING:
+            return places, 200
+        return search_flight.do(key, lambda: _search_uncached(key, cuisine_type, lat, lng))
+
+def _search_uncached(key, cuisine_type, lat, lng):
+    # Another caller may have filled the cache while we queued for the flight
+    places = search_cache.get(key)
+    if places is not MISSING:
+        return places, 200
+
+    if search_cache.ttl > 0:
+        lat, lng = geohash_center(key[2])
+    places = catalog.local(cuisine_type, lat, lng)
+    if places is not None:
+        search_cache.set(key, places)
+        return places, 200
+
+    try:
+        resp = _text_search(key[0], cuisine_type, lat, lng)
+    except Exception as e:
+        # Out of retries on a transport error / timeout: same fallback as a 5xx
+        return search_result(key, cuisine_type, lat, lng, 502, repr(e))
+    return search_result(key, cuisine_type, lat, lng, resp.status_code,
+                         resp.json() if resp.status_code == 200 else resp.text)
+
+def search_result(key, cuisine_type, lat, lng, status, body):
+    """
+    (places, status) for a Text Search response: cached and added to the
+    catalog on success; on failure the catalog's places nearby, if any.
+    """
+    if status != 200:
+        ERRORS.inc(where="places.searchText")
+        log.error("Text Search failed", extra=fields(status=status, body=str(body)[:500]))
+        places = catalog.fallback(cuisine_type, lat, lng)
+        if places is None:
+            return None, status
+        log.warning("serving catalog places", extra=fields(key="|".join(key), places=len(places)))
+        return places, 200
+
+    places = body.get("places", [])
+    search_cache.set(key, places)
+    catalog.remember(places, cuisine_type)
+    return places, 200
+
+# ——————————————————————————————————————————————————————————————————
+# Helper: precomputed pools per (query variant, cuisine type, cell)
+# ——————————————————————————————————————————————————————————————————
+def build_pool(key):
+    """
+    Search, score, format and enrich the best POOL_SIZE eligible places for
+    a search key and store them as its pool. Returns (pool, status); pool is
+    None when Text Search failed.
+    """
+    query_text, cuisine_type, cell = key
+    lat, lng = geohash_center(cell)
+    places, status = search_places(query_text, cuisine_type, lat, lng)
+    if places is None:
+        return None, status
+
+    with span("pool.build"):
+        # Shared by every user of the key: distance from the cell centre, no history
+        scores = np.asarray(score_page(places, origin=(lat, lng)), dtype=np.float64)
+        scores[[not p.get("id") for p in places]] = 0.0
+        order  = np.argsort(-scores, kind="stable")[:POOL_SIZE]
+        order  = order[scores[order] > SUGGESTIONS_MIN_SCORE]
+        candidates = [format_place(places[i]) for i in order]
+        inputs     = [{f: places[i][f] for f in FEATURE_FIELDS if f in places[i]} for i in order]
+        enrich_suggestions(candidates)
+        pool = Pool(candidates, scores[order].tolist(), inputs)
+    pools.put(key, pool)
+    return pool, 200
+
+def get_pool(key):
+    """(pool, status) for a search key, building it inline on a miss."""
+    pool = pools.get(key)
+    if pool is not None:
+        return pool, 200
+    return pool_flight.do(key, lambda: _get_or_build_pool(key))
+
+def _get_or_build_pool(key):
+    # The previous flight for this key may have just stored it
+    pool = pools.get(key)
+    return (pool, 200) if pool is not None else build_pool(key)
+
+def select_from_pool(pool, recent, user_id=None, limit=SUGGESTIONS_LIMIT, origin=None):
+    """
+    Sample `limit` suggestions from a pool, in memory: the candidates are
+    re-scored for this user (distance from `origin`, recency from `recent`)
+    and weighted as in select_suggestions. Pools built before candidates
+    kept their inputs fall back to the cell-centre scores. Returns copies,
+    ready to send.
+    """
+    scores = pool.scores
+    if pool.inputs and (origin is not None or user_id):
+        scores = score_page(pool.inputs, origin=origin, last_sent=recent.last_sent() if user_id else None,
+                            fallback=pool.scores)
+    with span("pool.select"):
+        ids     = [p["place_id"] for p in pool.places]
+        weights = history_weights(np.asarray(scores, dtype=np.float64), ids,
+                                  recent if user_id else None)
+        chosen  = weighted_top_k(weights, limit or len(weights))
+        return [dict(pool.places[i]) for i in chosen]
 
-    resp = requests.post("https://places.googleapis.com/v1/places:searchText", headers=headers, json=payload)
-    if resp.status_code != 200:
-        print(f"❌ Text Search failed: {resp.text}", flush=True)
-        return jsonify({"suggestions": []}), resp.status_code
+# Rebuilds shared pools before they expire; started by main.start_worker()
+pool_refresher = PoolRefresher(pools, build_pool)
 
-    places = resp.json().get("places", [])
-    suggs  = filter_and_format_results(places, user_id=user_id)
-    return jsonify({"suggestions": suggs})
+# ——————————————————————————————————————————————————————————————————
+# Endpoints
+# ——————————————————————————————————————————————————————————————————
+@suggestions.route('/suggestions', methods=['GET'])
+def no_user():
+    return jsonify({"error": "Use /suggestions/<user_id>"}), 400
+
+def needs_details(fields):
+    return fields is None or any(f in DETAIL_FIELDS for f in fields)
+
+def encode_suggestions(suggs, fields, status, accept_encoding):
+    # (status, headers, payload) for a suggestions list. No ETag: every GET
+    # draws a new random selection and records it as sent, so the body is
+    # not a stable representation a 304 could stand for
+    with span("encode"):
+        return encode({"suggestions": project(suggs, fields)}, status, accept_encoding, cacheable=False)
+
+def suggestions_response(suggs, fields=None, status=200):
+    """
+    Flask response for a suggestions list: projected to `fields`, encoded
+    by services.responses (compression).
+    """
+    status, headers, payload = encode_suggestions(suggs, fields, status,
+                                                  request.headers.get("Accept-Encoding"))
+    return Response(payload, status=status, headers=headers)
+
+@suggestions.route('/suggestions/<user_id>', methods=['GET'])
+def get_suggestions_for_user(user_id):
+    """
+    Suggestions for one user. ?fields=name,maps_url,... returns only those
+    keys of each suggestion (no Place Details lookups unless a details
+    field is asked for).
+    """
+    try:
+        fields = parse_fields(request.args.get("fields"), SUGGESTION_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Preferences and history in one round-trip; history is reused for the update
+    with span("firestore.load_user"):
+        prefs, history = resources.store.load_user(user_id)
+    if prefs is None:
+        return jsonify({"error": "No preferences found."}), 404
+    params = search_params(prefs)
+    if params is None:
+        return jsonify({"error": "'cuisine' and 'location' required."}), 400
+
+    if pools.enabled:
+        # Precomputed path: history filter + sampling against the pool
+        pool, status = get_pool(search_key(*params))
+        if pool is None:
+            return suggestions_response([], status=status)
+        recent = RecentPlaces.from_doc(history or {})
+        suggs  = select_from_pool(pool, recent, user_id=user_id, origin=params[2:4])
+        record_sent(resources.store, user_id, recent, suggs)
+        return suggestions_response(suggs, fields)
+
+    places, status = search_places(*params)
+    if places is None:
+        return suggestions_response([], status=status)
+
+    suggs  = filter_and_format_results(places, user_id=user_id, history=history or {}, origin=params[2:4],
+                                       enrich=needs_details(fields))
+    return suggestions_response(suggs, fields)
+
+def preference_stream(after=None):
+    """
+    Single ordered pass over preferences (by document id), optionally
+    starting after a checkpoint cursor.
+    """
+    col   = resources.db.collection('preferences')
+    query = col.order_by('__name__')
+    if after:
+        query = query.where('__name__', '>', col.document(after))
+    for user_doc in query.stream():
+        yield user_doc.id, user_doc
+
+def _save_checkpoint(cursor):
+    try:
+        resources.db.collection('jobs').document('send_emails_to_all').set(
+            {"cursor": cursor, "updated": time.time()}
+        )
+    except Exception as e:
+        ERRORS.inc(where="checkpoint.save")
+        log.warning(f"checkpoint write failed: {e}", extra=fields(cursor=cursor))
+
+# The request must return before gunicorn kills the worker (GUNICORN_TIMEOUT,
+# 0 = never, as on Cloud Run): the dispatch budget leaves room for one last
+# in-flight send and the final checkpoint write.
+WORKER_TIMEOUT  = float(os.environ.get("GUNICORN_TIMEOUT", "0"))
+DISPATCH_MARGIN = 5.0
+
+def dispatch_budget(budget, call_timeout, worker_timeout=None):
+    """(budget, call_timeout) in seconds, capped to fit inside the worker timeout."""
+    worker_timeout = WORKER_TIMEOUT if worker_timeout is None else worker_timeout
+    if worker_timeout <= 0:
+        return budget, call_timeout
+    call_timeout = min(call_timeout, worker_timeout / 3)
+    return max(0.0, min(budget, worker_timeout - call_timeout - DISPATCH_MARGIN)), call_timeout
+
+def _load_checkpoint():
+    doc = resources.db.collection('jobs').document('send_emails_to_all').get()
+    return doc.to_dict().get("cursor") if doc.exists else None
 
 @send_all.route('/send_emails_to_all', methods=['POST'])
 def send_emails_to_all():
     """
-    Loop through all users and invoke Cloud Function send_email via query params
+    Invoke Cloud Function send_email for every user, concurrently.
+
+    Users are streamed once in document-id order, sent with bounded
+    concurrency, per-user retries and a rate limit. When the time budget runs
+    out the response is 202 with a `cursor`; POST {"cursor": ...} or
+    {"resume": true} (saved checkpoint) to continue after it.
     """
     try:
-        errors   = []
         send_url = os.getenv("SEND_EMAIL_URL")
         if not send_url:
             raise RuntimeError("SEND_EMAIL_URL not set")
 
-        print(f"🔥 Retrieved {len(list(db.collection('preferences').stream()))} preference docs", flush=True)
-        print(f"🚀 Batch start, send_url={send_url}", flush=True)
+        body   = request.get_json(silent=True) or {}
+        cursor = body.get("cursor") or (_load_checkpoint() if body.get("resume") else None)
+        budget, call_timeout = dispatch_budget(float(os.getenv("EMAIL_DISPATCH_BUDGET", "3000")),
+                                               float(os.getenv("EMAIL_DISPATCH_TIMEOUT", "60")))
 
-        for user_doc in db.collection('preferences').stream():
+        def send(user_doc):
             uid   = user_doc.id
-            prefs = user_doc.to_dict()
-            email = prefs.get("email")
+            email = user_doc.to_dict().get("email")
             if not email:
-                errors.append(f"{uid}: missing email")
-                continue
-
-            call_url = f"{send_url.rstrip('/')}?user_id={uid}&email={email}"
-            print(f"📧 Invoking send_email for {uid} → {call_url}", flush=True)
-            try:
-                resp = requests.post(call_url, timeout=60)
-                print(f"📡 {uid} response: {resp.status_code}", flush=True)
-                if resp.status_code not in (200, 202):
-                    errors.append(f"{uid}: email status {resp.status_code}")
-            except BaseException as e:
-                tb = traceback.format_exc()
-                print(f"❌ Exception for {uid}: {e}\n{tb}", flush=True)
-                errors.append(f"{uid}: exception {e}")
-
-        print(f"✅ Batch finished, errors={errors}", flush=True)
+                raise PermanentError("missing email")
+            resp = resources.http.post(send_url.rstrip('/'), params={"user_id": uid, "email": email},
+                                       timeout=call_timeout, retries=0, endpoint="email.send")
+            log.info("send_email invoked", extra=fields(user_id=uid, status=resp.status_code))
+            return resp.status_code
+
+        log.info("batch start", extra=fields(send_url=send_url, after=cursor))
+        dispatcher = Dispatcher(
+            send,
+            max_workers   = int(os.getenv("EMAIL_DISPATCH_WORKERS", "8")),
+            retries       = int(os.getenv("EMAIL_DISPATCH_RETRIES", "3")),
+            backoff       = float(os.getenv("EMAIL_DISPATCH_BACKOFF", "1.0")),
+            rate          = float(os.getenv("EMAIL_DISPATCH_RATE", "10")) or None,
+            deadline      = time.monotonic() + budget,
+            on_checkpoint = _save_checkpoint,
+            cursor        = cursor,
+        ).run(preference_stream(cursor))
+
+        errors = dispatcher.errors
+        log.info("batch finished", extra=fields(processed=dispatcher.processed, errors=len(errors)))
+        if dispatcher.timed_out:
+            _save_checkpoint(dispatcher.cursor)
+            return jsonify({"status": "incomplete", "cursor": dispatcher.cursor,
+                            "processed": dispatcher.processed, "errors": errors}), 202
+
+        _save_checkpoint(None)
         status = "partial_success" if errors else "success"
-        return jsonify({"status": status, "errors": errors}), (207 if errors else 200)
+        return jsonify({"status": status, "processed": dispatcher.processed,
+                        "errors": errors}), (207 if errors else 200)
 
     except BaseException:
-        tb = traceback.format_exc()
-        print("🚨 Uncaught exception in send_emails_to_all:\n" + tb, flush=True)
+        ERRORS.inc(where="send_emails_to_all")
+        log.exception("uncaught exception in send_emails_to_all")
         return jsonify({"error": "Internal error (see logs)"}), 500
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from routes.suggestions import (DETAILS_TIMEOUT, FLIGHTS, NO_DETAILS, catalog, details_cache,
+                                details_url, get_pool, needs_details, parse_details, pools,
+                                search_cache, search_key, search_params, search_result,
+                                select_from_pool, select_suggestions, text_search_request)
+from services.details_cache import is_definitive
+from services.geo import geohash_center
+from services.history import RecentPlaces
+from services.log import fields, get_logger
+from services.metrics import ERRORS, span
+from services.resources import resources
+from services.singleflight import AsyncSingleFlight
+from services.ttl_cache import MISSING
+
+# ——————————————————————————————————————————————————————————————————
+# Async twins of the /suggestions/<user_id> I/O path (served by asgi.py).
+# Selection, parsing and both caches are shared with routes.suggestions;
+# only the Places / Firestore round-trips differ (httpx.AsyncClient and
+# firestore.AsyncClient via resources.ahttp / resources.astore).
+# ——————————————————————————————————————————————————————————————————
+search_flight  = AsyncSingleFlight()
+details_flight = AsyncSingleFlight()
+FLIGHTS.update(search_async=search_flight, details_async=details_flight)
+
+log = get_logger("suggestions_async")
+
+
+async def _details_cache(fn, *args):
+    # The shared details tier (SQLite / Firestore) blocks: keep it off the loop
+    if details_cache.shared is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+async def _fetch_details(place_id, timeout, deadline=None):
+    resp = await resources.ahttp.get(details_url(place_id), timeout=timeout, deadline=deadline,
+                                     endpoint="places.details")
+    resp.raise_for_status()
+    return parse_details(resp.json())
+
+async def fetch_review_and_details(place_id, timeout=DETAILS_TIMEOUT, deadline=None):
+    with span("details.lookup"):
+        value = await _details_cache(details_cache.get, place_id)
+        if value is not MISSING:
+            return value
+        try:
+            value = tuple(await details_flight.do(place_id, lambda: _fetch_details(place_id, timeout, deadline)))
+        except Exception as e:
+            ERRORS.inc(where="places.details")
+            log.warning(f"place details fetch failed: {e}", extra=fields(place_id=place_id))
+            if is_definitive(e):
+                details_cache.put(place_id, NO_DETAILS, True)
+            return NO_DETAILS
+        await _details_cache(details_cache.put, place_id, value)
+        return value
+
+async def enrich_suggestions(suggestions_list, timeout=DETAILS_TIMEOUT):
+    """
+    Fill the details fields in place, all lookups concurrently; lookups still
+    running at the deadline keep the "no details" defaults.
+    """
+    if not suggestions_list:
+        return suggestions_list
+    # The deadline also stops retries of a shielded (single-flight) fetch
+    # that outlives the cancelled task
+    deadline = time.monotonic() + timeout
+    tasks = [asyncio.ensure_future(fetch_review_and_details(s["place_id"], timeout, deadline))
+             for s in suggestions_list]
+    done, pending = await asyncio.wait(tasks, timeout=timeout + 1.0)
+    for task in pending:
+        task.cancel()
+    for task, s in zip(tasks, suggestions_list):
+        review, summary, price = task.result() if task in done else NO_DETAILS
+        s["price_level"]        = price
+        s["generative_summary"] = summary
+        s["latest_review"]      = review
+    if pending:
+        ERRORS.inc(len(pending), where="details.timeout")
+        log.warning(f"{len(pending)} details lookups timed out", extra=fields(timed_out=len(pending)))
+    return suggestions_list
+
+async def search_places(query_text, cuisine_type, lat, lng):
+    with span("search"):
+        key    = search_key(query_text, cuisine_type, lat, lng)
+        places = search_cache.get(key)
+        if places is not MISSING:
+            return places, 200
+        return await search_flight.do(key, lambda: _search_uncached(key, cuisine_type, lat, lng))
+
+async def _search_uncached(key, cuisine_type, lat, lng):
+    # Another caller may have filled the cache while we queued for the flight
+    places = search_cache.get(key)
+    if places is not MISSING:
+        return places, 200
+
+    if search_cache.ttl > 0:
+        lat, lng = geohash_center(key[2])
+    places = catalog.local(cuisine_type, lat, lng)
+    if places is not None:
+        search_cache.set(key, places)
+        return places, 200
+
+    url, headers, payload = text_search_request(key[0], cuisine_type, lat, lng)
+    try:
+        resp = await resources.ahttp.post(url, headers=headers, json=payload, endpoint="places.searchText",
+                                          idempotent=True)
+    except Exception as e:
+        # Out of retries on a transport error / timeout: same fallback as a 5xx
+        return search_result(key, cuisine_type, lat, lng, 502, repr(e))
+    return search_result(key, cuisine_type, lat, lng, resp.status_code,
+                         resp.json() if resp.status_code == 200 else resp.text)
+
+async def get_suggestions_for_user(user_id, fields=None):
+    """
+    Same contract as routes.suggestions.get_suggestions_for_user; returns
+    (body dict, status). The caller projects the body to `fields`.
+    """
+    with span("firestore.load_user"):
+        prefs, history = await resources.astore.load_user(user_id)
+    if prefs is None:
+        return {"error": "No preferences found."}, 404
+    params = search_params(prefs)
+    if params is None:
+        return {"error": "'cuisine' and 'location' required."}, 400
+
+    recent = RecentPlaces.from_doc(history or {})
+    if pools.enabled:
+        key  = search_key(*params)
+        pool = pools.get(key)
+        if pool is None:
+            # Rare: build it with the sync helpers, off the loop
+            pool, status = await asyncio.to_thread(get_pool, key)
+            if pool is None:
+                return {"suggestions": []}, status
+        suggs = select_from_pool(pool, recent, user_id=user_id, origin=params[2:4])
+    else:
+        places, status = await search_places(*params)
+        if places is None:
+            return {"suggestions": []}, status
+
+        # Scoring one page is sub-millisecond: run it inline on the loop
+        suggs = select_suggestions(places, recent, user_id=user_id, origin=params[2:4])
+        if needs_details(fields):
+            with span("enrich"):
+                await enrich_suggestions(suggs)
+
+    if suggs:
+        try:
+            with span("history.save"):
+                recent.add(s["place_id"] for s in suggs[:3])
+                await resources.astore.save_history(user_id, recent.to_doc())
+        except Exception as e:
+            ERRORS.inc(where="history.save")
+            log.error(f"history write failed: {e}", extra=fields(user_id=user_id))
+    return {"suggestions": suggs}, 200
@@ -0,0 +1,321 @@
+import math
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from ml.features import haversine_km
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+
+log = get_logger("catalog")
+
+# ——————————————————————————————————————————————————————————————————
+# Local restaurant catalog: every place Text Search has returned, kept as
+# columns (NumPy arrays + string lists) and indexed by cuisine type and by
+# a lat/lng grid, so "cuisine X within R metres of lat,lng" is a handful
+# of dict lookups and one vectorized distance pass.
+#
+# CATALOG_MAX_AGE       answer from the catalog only with places seen by
+#                       Text Search within this long (s); 0 disables it
+# CATALOG_MIN_RESULTS   fewer fresh places than this nearby = thin, ask Google
+# CATALOG_RADIUS        search radius (m), same as the Text Search bias circle
+# CATALOG_CELL_DEG      grid cell size in degrees (0.01 ≈ 1.1 km)
+# CATALOG_PATH          .npz file to load at start and save to ("" = memory only)
+# CATALOG_SAVE_INTERVAL save at most this often (s) after new places arrive
+# ——————————————————————————————————————————————————————————————————
+CATALOG_MAX_AGE       = float(os.environ.get("CATALOG_MAX_AGE", "604800"))
+CATALOG_MIN_RESULTS   = int(os.environ.get("CATALOG_MIN_RESULTS", "10"))
+CATALOG_RADIUS        = float(os.environ.get("CATALOG_RADIUS", "2500"))
+CATALOG_CELL_DEG      = float(os.environ.get("CATALOG_CELL_DEG", "0.01"))
+CATALOG_PATH          = os.environ.get("CATALOG_PATH", "")
+CATALOG_SAVE_INTERVAL = float(os.environ.get("CATALOG_SAVE_INTERVAL", "300"))
+
+PAGE_SIZE = 20
+
+# Float and string columns of the file (strings as fixed-width unicode),
+# plus "types": the comma-joined cuisine types of each row
+NUMERIC = ("lat", "lng", "rating", "rating_count", "seen_at")
+STRINGS = ("id", "name", "address", "price_level", "photo")
+
+
+class Catalog:
+    """
+    Places by row. `add` upserts a Text Search page under its cuisine type;
+    `nearby` answers radius queries from the indexes.
+    """
+
+    def __init__(self, cell_deg=CATALOG_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._lock    = threading.Lock()
+        self._rows    = {}                       # place id -> row
+        self._num     = {c: np.empty(0) for c in NUMERIC}
+        self._str     = {c: [] for c in STRINGS}
+        self._types   = []                       # row -> set of cuisine types
+        self._places  = []                       # row -> Places-shaped dict, built on write
+        self._grid    = {}                       # cuisine type -> {(i, j) cell: [rows]}
+        self._size    = 0
+
+        self.hits      = 0
+        self.misses    = 0
+        self.fallbacks = 0
+
+    def __len__(self):
+        return self._size
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _grow(self):
+        capacity = max(1024, 2 * len(self._num["lat"]))
+        for c, col in self._num.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._size] = col[:self._size]
+            self._num[c] = grown
+
+    def _index(self, row, cuisine_type):
+        if cuisine_type in self._types[row]:
+            return
+        self._types[row].add(cuisine_type)
+        cell = self._cell(self._num["lat"][row], self._num["lng"][row])
+        self._grid.setdefault(cuisine_type, {}).setdefault(cell, []).append(row)
+
+    def add(self, places, cuisine_type, seen_at=None):
+        """Upsert a page of Places results seen for `cuisine_type`; returns rows added."""
+        seen_at = time.time() if seen_at is None else seen_at
+        added   = 0
+        with self._lock:
+            for p in places:
+                loc = p.get("location") or {}
+                if not p.get("id") or loc.get("latitude") is None or loc.get("longitude") is None:
+                    continue
+                row = self._rows.get(p["id"])
+                if row is None:
+                    if self._size == len(self._num["lat"]):
+                        self._grow()
+                    row = self._rows[p["id"]] = self._size
+                    self._size += 1
+                    self._types.append(set())
+                    self._places.append(None)
+                    for c in STRINGS:
+                        self._str[c].append("")
+                    self._num["lat"][row] = loc["latitude"]
+                    self._num["lng"][row] = loc["longitude"]
+                    added += 1
+                photos = p.get("photos") or [{}]
+                self._num["rating"][row]       = p.get("rating", np.nan)
+                self._num["rating_count"][row] = p.get("userRatingCount", np.nan)
+                self._num["seen_at"][row]      = seen_at
+                self._str["id"][row]           = p["id"]
+                self._str["name"][row]         = (p.get("displayName") or {}).get("text") or ""
+                self._str["address"][row]      = p.get("formattedAddress") or ""
+                self._str["price_level"][row]  = p.get("priceLevel") or ""
+                self._str["photo"][row]        = photos[0].get("name") or ""
+                self._places[row]              = self._build(row)
+                self._index(row, cuisine_type)
+        return added
+
+    def place(self, row):
+        # Shared between callers: treat as read-only
+        return self._places[row]
+
+    def _build(self, row):
+        # A Places-API-shaped dict, enough for format_place and ml.features
+        num, s = self._num, self._str
+        p = {
+            "id":               s["id"][row],
+            "displayName":      {"text": s["name"][row]},
+            "formattedAddress": s["address"][row],
+            "location":         {"latitude": float(num["lat"][row]), "longitude": float(num["lng"][row])},
+        }
+        if not np.isnan(num["rating"][row]):
+            p["rating"] = float(num["rating"][row])
+        if not np.isnan(num["rating_count"][row]):
+            p["userRatingCount"] = int(num["rating_count"][row])
+        if s["price_level"][row]:
+            p["priceLevel"] = s["price_level"][row]
+        if s["photo"][row]:
+            p["photos"] = [{"name": s["photo"][row]}]
+        return p
+
+    def nearby(self, cuisine_type, lat, lng, radius=CATALOG_RADIUS, max_age=None, limit=PAGE_SIZE):
+        """
+        Up to `limit` places of `cuisine_type` within `radius` metres, nearest
+        first, optionally only those seen within `max_age` seconds.
+        """
+        dlat = radius / 111_320.0
+        dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        i0, j0 = self._cell(lat - dlat, lng - dlng)
+        i1, j1 = self._cell(lat + dlat, lng + dlng)
+        with self._lock:
+            grid = self._grid.get(cuisine_type)
+            if not grid:
+                return []
+            rows = [r for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) for r in grid.get((i, j), ())]
+            if not rows:
+                return []
+            rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            dist = haversine_km(lat, lng, self._num["lat"][rows], self._num["lng"][rows]) * 1000.0
+            keep = dist <= radius
+            if max_age:
+                keep &= self._num["seen_at"][rows] >= time.time() - max_age
+            rows, dist = rows[keep], dist[keep]
+            return [self._places[r] for r in rows[np.argsort(dist, kind="stable")[:limit]].tolist()]
+
+    # Persistence: one compressed .npz of columns, no pickled objects
+    def save(self, path):
+        with self._lock:
+            n       = self._size
+            arrays  = {c: col[:n].copy() for c, col in self._num.items()}
+            strings = {c: list(col) for c, col in self._str.items()}
+            types   = [",".join(sorted(t)) for t in self._types]
+        for c, col in strings.items():
+            arrays[c] = np.array(col, dtype=str)
+        arrays["types"] = np.array(types, dtype=str)
+        # A temp file of our own next to `path` (instances may share the
+        # directory), renamed over it once complete
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return n
+
+    @classmethod
+    def load(cls, path, cell_deg=CATALOG_CELL_DEG):
+        catalog = cls(cell_deg)
+        with np.load(path) as data:
+            cols = {c: data[c] for c in NUMERIC + STRINGS + ("types",)}
+        for row in range(len(cols["id"])):
+            catalog._load_row({c: cols[c][row] for c in cols})
+        return catalog
+
+    def _load_row(self, values):
+        if self._size == len(self._num["lat"]):
+            self._grow()
+        row = self._rows[str(values["id"])] = self._size
+        self._size += 1
+        for c in NUMERIC:
+            self._num[c][row] = values[c]
+        for c in STRINGS:
+            self._str[c].append(str(values[c]))
+        self._types.append(set())
+        self._places.append(self._build(row))
+        # Re-indexed with this process's cell size
+        for cuisine_type in filter(None, str(values["types"]).split(",")):
+            self._index(row, cuisine_type)
+
+    def stats(self):
+        return {
+            "size":      self._size,
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "fallbacks": self.fallbacks,
+            "types":     len(self._grid),
+        }
+
+
+class CatalogSearch:
+    """
+    Text Search in front of a Catalog: answer locally when there are at
+    least `min_results` fresh places nearby, otherwise go upstream and add
+    what comes back; if upstream fails, serve whatever the catalog has.
+    Periodic saves run on a background thread, one at a time.
+    """
+
+    def __init__(self, catalog, max_age=CATALOG_MAX_AGE, min_results=CATALOG_MIN_RESULTS,
+                 radius=CATALOG_RADIUS, path=CATALOG_PATH, save_interval=CATALOG_SAVE_INTERVAL):
+        self.catalog       = catalog
+        self.max_age       = max_age
+        self.min_results   = min_results
+        self.radius        = radius
+        self.path          = path
+        self.save_interval = save_interval
+        self._saved_at     = time.monotonic()
+        self._dirty        = False
+        self._saving       = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_age > 0
+
+    def local(self, cuisine_type, lat, lng):
+        """A page of fresh places from the catalog, or None when it is thin."""
+        if not self.enabled:
+            return None
+        places = self.catalog.nearby(cuisine_type, lat, lng, self.radius, max_age=self.max_age)
+        if len(places) < max(1, self.min_results):
+            self.catalog.misses += 1
+            return None
+        self.catalog.hits += 1
+        return places
+
+    def fallback(self, cuisine_type, lat, lng):
+        # Upstream failed: any known place nearby, however old, beats nothing
+        if not self.enabled:
+            return None
+        places = self.catalog.nearby(cuisine_type, lat, lng, self.radius)
+        if places:
+            self.catalog.fallbacks += 1
+        return places or None
+
+    def remember(self, places, cuisine_type):
+        if not self.enabled:
+            return
+        if self.catalog.add(places, cuisine_type):
+            self._dirty = True
+        if self.path and self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save_in_background()
+
+    def save_in_background(self):
+        # Off the request path; skipped while a save is already running
+        if not self._saving.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._save_and_release, name="catalog-save", daemon=True).start()
+        return True
+
+    def _save_and_release(self):
+        try:
+            self._save()
+        finally:
+            self._saving.release()
+
+    def save(self):
+        with self._saving:
+            return self._save()
+
+    def _save(self):
+        if not self.path or not self._dirty:
+            return 0
+        self._saved_at, self._dirty = time.monotonic(), False
+        try:
+            return self.catalog.save(self.path)
+        except Exception as e:
+            self._dirty = True  # try again at the next interval
+            ERRORS.inc(where="catalog.save")
+            log.warning(f"catalog save failed: {e}", extra=fields(path=self.path))
+            return 0
+
+    def stats(self):
+        return self.catalog.stats()
+
+
+def catalog_from_env():
+    catalog = Catalog()
+    if CATALOG_PATH and os.path.exists(CATALOG_PATH):
+        try:
+            catalog = Catalog.load(CATALOG_PATH)
+            log.info("catalog loaded", extra=fields(path=CATALOG_PATH, places=len(catalog)))
+        except Exception as e:
+            ERRORS.inc(where="catalog.load")
+            log.warning(f"catalog load failed: {e}", extra=fields(path=CATALOG_PATH))
+    return CatalogSearch(catalog)
@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+from services.resources import LazyDb
+from services.ttl_cache import MISSING, TTLCache
+
+log = get_logger("details_cache")
+
+# Places answers that are about the place id itself (NOT_FOUND, INVALID_ARGUMENT
+# / INVALID_REQUEST): retrying will not help, so they are cached negatively.
+# Timeouts, 429 and 5xx are not: the next request tries again.
+DEFINITIVE_STATUS = (400, 404)
+
+
+def is_definitive(error):
+    """Whether a details fetch error (requests / httpx HTTP error) is a definitive answer."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in DEFINITIVE_STATUS
+
+# ——————————————————————————————————————————————————————————————————
+# Shared tiers: survive restarts / are shared between instances.
+# Entries carry a wall-clock expiry so any process can judge freshness.
+# ——————————————————————————————————————————————————————————————————
+class SQLiteTier:
+    """
+    Local file-backed tier (one table, place_id -> JSON payload). The
+    connection is opened on first use in each process, never inherited
+    across a fork (gunicorn preload_app builds this in the master).
+    """
+
+    def __init__(self, path):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid  = None
+
+    @property
+    def conn(self):
+        # Under self._lock
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid  = os.getpid()
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS details ("
+                    " place_id TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+                    " negative INTEGER NOT NULL, expires_at REAL NOT NULL)"
+                )
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT payload, negative, expires_at FROM details WHERE place_id = ?", (key,)
+            ).fetchone()
+        if not row or row[2] <= time.time():
+            return None
+        return json.loads(row[0]), bool(row[1]), row[2]
+
+    def set(self, key, value, negative, expires_at):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), int(negative), expires_at),
+            )
+
+
+class FirestoreTier(LazyDb):
+    """Firestore-backed tier, shared by every Cloud Run instance."""
+
+    def __init__(self, db, collection="places_details_cache"):
+        super().__init__(db)
+        self._collection = collection
+
+    def get(self, key):
+        doc = self.db.collection(self._collection).document(key).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        if data.get("expires_at", 0) <= time.time():
+            return None
+        return data["payload"], data.get("negative", False), data["expires_at"]
+
+    def set(self, key, value, negative, expires_at):
+        self.db.collection(self._collection).document(key).set({
+            "payload":    list(value),
+            "negative":   negative,
+            "expires_at": expires_at,
+        })
+
+
+# ——————————————————————————————————————————————————————————————————
+# Two-tier details cache
+# ——————————————————————————————————————————————————————————————————
+class DetailsCache:
+    """
+    Place details cache keyed by place_id: an in-process LRU/TTL tier in front
+    of an optional shared tier. Lookups Places definitively rejected are
+    cached in memory only, for a short `negative_ttl`, so a broken place_id
+    is not retried on every request; transient failures are not cached.
+    """
+
+    def __init__(self, maxsize=2048, ttl=86400.0, negative_ttl=300.0, shared=None):
+        self.ttl          = ttl
+        self.negative_ttl = negative_ttl
+        self.memory       = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared       = shared
+        self._lock        = threading.Lock()  # counters: lookups run on many threads
+
+        self.shared_hits    = 0
+        self.negative_hits  = 0
+        self.shared_errors  = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, place_id):
+        entry = self.memory.get(place_id)
+        if entry is MISSING and self.shared is not None:
+            try:
+                found = self.shared.get(place_id)
+            except Exception as e:
+                self._count("shared_errors")
+                ERRORS.inc(where="details_cache.shared_get")
+                log.warning(f"details cache shared get failed: {e}", extra=fields(place_id=place_id))
+                found = None
+            if found:
+                value, negative, expires_at = found
+                entry = (tuple(value), negative)
+                self.memory.set(place_id, entry, ttl=expires_at - time.time())
+                self._count("shared_hits")
+        if entry is MISSING:
+            return MISSING
+        value, negative = entry
+        if negative:
+            self._count("negative_hits")
+        return value
+
+    def put(self, place_id, value, negative=False):
+        # Negative entries stay in this process: one instance's view of a
+        # failure must not blank the place for every other one
+        ttl = self.negative_ttl if negative else self.ttl
+        self.memory.set(place_id, (tuple(value), negative), ttl=ttl)
+        if self.shared is not None and ttl > 0 and not negative:
+            try:
+                self.shared.set(place_id, value, negative, time.time() + ttl)
+            except Exception as e:
+                self._count("shared_errors")
+                ERRORS.inc(where="details_cache.shared_set")
+                log.warning(f"details cache shared set failed: {e}", extra=fields(place_id=place_id))
+
+    def get_or_fetch(self, place_id, fetch, fallback):
+        """
+        Return cached details for `place_id`, calling `fetch(place_id)` on a
+        miss. If `fetch` raises, `fallback` is returned, and cached negatively
+        only when the error is definitive (is_definitive).
+        """
+        value = self.get(place_id)
+        if value is not MISSING:
+            return value
+        try:
+            value = tuple(fetch(place_id))
+        except Exception as e:
+            ERRORS.inc(where="places.details")
+            log.warning(f"place details fetch failed: {e}", extra=fields(place_id=place_id))
+            if is_definitive(e):
+                self.put(place_id, fallback, negative=True)
+            return fallback
+        self.put(place_id, value)
+        return value
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update({
+            "shared_hits":   self.shared_hits,
+            "negative_hits": self.negative_hits,
+            "shared_errors": self.shared_errors,
+        })
+        return stats
+
+
+def details_cache_from_env(db_factory=None):
+    """
+    Build the cache from DETAILS_CACHE_* environment variables.
+
+    DETAILS_CACHE_BACKEND selects the shared tier: "" (memory only),
+    "sqlite" (file at DETAILS_CACHE_PATH) or "firestore".
+    """
+    backend = os.environ.get("DETAILS_CACHE_BACKEND", "").strip().lower()
+    shared  = None
+    if backend == "sqlite":
+        shared = SQLiteTier(os.environ.get("DETAILS_CACHE_PATH", "/tmp/places_details_cache.sqlite3"))
+    elif backend == "firestore" and db_factory is not None:
+        shared = FirestoreTier(db_factory)
+
+    return DetailsCache(
+        maxsize      = int(os.environ.get("DETAILS_CACHE_SIZE", "2048")),
+        ttl          = float(os.environ.get("DETAILS_CACHE_TTL", "86400")),
+        negative_ttl = float(os.environ.get("DETAILS_CACHE_NEGATIVE_TTL", "300")),
+        shared       = shared,
+    )
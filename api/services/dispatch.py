@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class PermanentError(Exception):
+    """Raised by a send function for items that must not be retried."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised by call_with_retries when the next attempt would start past the deadline."""
+
+
+class RateLimiter:
+    """
+    Token bucket: at most `rate` acquisitions per second, bursts of `burst`.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate     = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self._tokens  = self.capacity
+        self._last    = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retries(fn, retries=3, backoff=1.0, limiter=None, sleep=time.sleep, deadline=None):
+    """
+    Call `fn()` (which returns an HTTP status code) until it succeeds or
+    `retries` extra attempts are used up. Exceptions and 429/5xx are retried
+    with exponential backoff and jitter. Returns (status or None, error or None).
+    Raises DeadlineExceeded instead of retrying past `deadline` (monotonic).
+    """
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(error)
+            sleep(delay)
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            status = fn()
+        except PermanentError as e:
+            return None, str(e)
+        except Exception as e:
+            error = f"exception {e}"
+            continue
+        if status in (200, 202):
+            return status, None
+        error = f"email status {status}"
+        if status not in RETRYABLE_STATUS:
+            return status, error
+    return None, error
+
+
+class Dispatcher:
+    """
+    Streams `(key, item)` pairs through `send(item) -> status` on a bounded
+    thread pool. Keys must arrive in ascending order; `cursor` is the last key
+    of the fully finished prefix (starting at `cursor`, the point this run
+    resumes from), so a later run can resume after it.
+
+    Stops taking new items once `deadline` (a time.monotonic() value) passes,
+    and does not retry past it either: an item cut short that way stays
+    unfinished, so the cursor stops before it and a resumed run sends it.
+    `on_checkpoint(cursor)` is called every `checkpoint_every` completions,
+    by one writer at a time and never with an older cursor than the last.
+    """
+
+    def __init__(self, send, max_workers=8, retries=3, backoff=1.0, rate=None,
+                 deadline=None, on_checkpoint=None, checkpoint_every=50, cursor=None):
+        self.send             = send
+        self.max_workers      = max_workers
+        self.retries          = retries
+        self.backoff          = backoff
+        self.limiter          = RateLimiter(rate) if rate else None
+        self.deadline         = deadline
+        self.on_checkpoint    = on_checkpoint
+        self.checkpoint_every = checkpoint_every
+
+        self.cursor    = cursor
+        self.processed = 0
+        self.errors    = []
+        self.timed_out = False
+
+        self._lock    = threading.Lock()
+        self._pending = deque()  # [key, finished] in submission order
+        self._slots   = threading.BoundedSemaphore(max_workers * 2)
+        self._writer  = threading.Lock()  # serializes on_checkpoint calls
+        self._saved   = cursor
+
+    def _run(self, entry, item):
+        try:
+            _, error = call_with_retries(
+                lambda: self.send(item), self.retries, self.backoff, self.limiter, deadline=self.deadline
+            )
+        except DeadlineExceeded:
+            self.timed_out = True
+            return
+        except BaseException as e:
+            error = f"exception {e}"
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            entry[1] = True
+            self.processed += 1
+            if error:
+                self.errors.append(f"{entry[0]}: {error}")
+            while self._pending and self._pending[0][1]:
+                self.cursor = self._pending.popleft()[0]
+            checkpoint = self.on_checkpoint and self.processed % self.checkpoint_every == 0
+        if checkpoint:
+            self.checkpoint()
+
+    def checkpoint(self):
+        # The cursor only moves forward, so reading it inside the writer lock
+        # means each write is at least as recent as the one before it
+        with self._writer:
+            with self._lock:
+                cursor = self.cursor
+            if cursor != self._saved:
+                self.on_checkpoint(cursor)
+                self._saved = cursor
+
+    def run(self, items):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for key, item in items:
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.timed_out = True
+                    break
+                # Bounded backlog: the stream is only read as fast as we send
+                self._slots.acquire()
+                entry = [key, False]
+                with self._lock:
+                    self._pending.append(entry)
+                pool.submit(self._run, entry, item)
+        return self
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import time
+from array import array
+from collections import OrderedDict
+
+# Per-user "recently sent" memory: exact for the last HISTORY_CAPACITY
+# places, optionally backed by a Bloom filter (HISTORY_BLOOM_BITS > 0) that
+# remembers evicted places over a much longer horizon in a fixed size.
+HISTORY_CAPACITY   = int(os.environ.get("HISTORY_CAPACITY", "50"))
+HISTORY_BLOOM_BITS = int(os.environ.get("HISTORY_BLOOM_BITS", "0"))
+HISTORY_BLOOM_MAX  = int(os.environ.get("HISTORY_BLOOM_MAX", "1000"))
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Once `max_items` have been added
+    the false-positive rate would climb, so it starts over empty instead.
+    """
+
+    def __init__(self, bits, hashes=5, max_items=HISTORY_BLOOM_MAX, data=None, count=0):
+        self.bits      = bits
+        self.hashes    = hashes
+        self.max_items = max_items
+        self.count     = count
+        self.data      = bytearray(data) if data else bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        if self.count >= self.max_items:
+            self.data  = bytearray(len(self.data))
+            self.count = 0
+        for pos in self._positions(key):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RecentPlaces:
+    """
+    Bounded recency set of place ids: O(1) membership, and once `capacity`
+    is exceeded the oldest-sent ids are evicted first (into the Bloom
+    summary, when enabled).
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY, bloom=None):
+        self.capacity = capacity
+        self.bloom    = bloom
+        self._sent    = OrderedDict()  # place_id -> sent_at (epoch s), oldest first
+
+    def __contains__(self, place_id):
+        return place_id in self._sent or (self.bloom is not None and place_id in self.bloom)
+
+    def __len__(self):
+        return len(self._sent)
+
+    def ids(self):
+        return list(self._sent)
+
+    def last_sent(self):
+        # {place_id: epoch seconds} for the exactly-tracked places (0 = legacy, time unknown)
+        return self._sent
+
+    def add(self, place_ids, now=None):
+        now = int(now if now is not None else time.time())
+        for pid in place_ids:
+            self._sent.pop(pid, None)
+            self._sent[pid] = now
+        while len(self._sent) > self.capacity:
+            pid, _ = self._sent.popitem(last=False)
+            if self.bloom is not None:
+                self.bloom.add(pid)
+
+    # ——— Firestore encoding ———
+    # {"v": 2, "recent": "<ids oldest-first, space separated>",
+    #  "sent_at": <uint32 epoch seconds, packed bytes>,
+    #  "bloom": <bytes>, "bloom_n": <items in filter>}
+    # Version-1 documents ({"place_ids": [...]}) are still read.
+    def to_doc(self):
+        doc = {
+            "v":       2,
+            "recent":  " ".join(self._sent),
+            "sent_at": array("I", self._sent.values()).tobytes(),
+        }
+        if self.bloom is not None:
+            doc["bloom"]   = bytes(self.bloom.data)
+            doc["bloom_n"] = self.bloom.count
+        return doc
+
+    @classmethod
+    def from_doc(cls, doc, capacity=HISTORY_CAPACITY, bloom_bits=HISTORY_BLOOM_BITS):
+        doc   = doc or {}
+        bloom = None
+        if bloom_bits > 0:
+            data = doc.get("bloom")
+            if data is not None and len(data) != (bloom_bits + 7) // 8:
+                data = None  # filter was resized: start a fresh one
+            bloom = BloomFilter(bloom_bits, data=data, count=doc.get("bloom_n", 0) if data else 0)
+        recent = cls(capacity, bloom)
+
+        if doc.get("v") == 2:
+            ids = doc.get("recent", "").split()
+            sent_at = array("I")
+            sent_at.frombytes(doc.get("sent_at", b""))
+            for pid, ts in zip(ids, sent_at):
+                recent._sent[pid] = ts
+        else:
+            recent._sent.update((pid, 0) for pid in doc.get("place_ids", []))
+        recent.add([])  # apply capacity if it shrank
+        return recent
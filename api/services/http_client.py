@@ -0,0 +1,271 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.metrics import UPSTREAM_CALLS, UPSTREAM_SECONDS
+
+# Base URL of the Places API (New); overridable to point at a local fake.
+PLACES_BASE_URL = os.environ.get("PLACES_BASE_URL", "https://places.googleapis.com/v1").rstrip("/")
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Methods retried by default; any other call is retried only when the caller
+# marks it safe (`idempotent=True`), since a 5xx or a dropped connection may
+# come after the upstream already acted on it
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class EndpointStats:
+    """
+    Latency/outcome counters for one logical endpoint. Percentiles come from
+    the most recent `window` samples. Every attempt is also counted in the
+    /metrics registry under `name`.
+    """
+
+    def __init__(self, window=1024, name="other"):
+        self.name    = name
+        self.count   = 0
+        self.errors  = 0
+        self.retries = 0
+        self.total_s = 0.0
+        self.max_s   = 0.0
+        self.samples = deque(maxlen=window)
+        self._lock   = threading.Lock()  # one instance per endpoint, shared by every thread
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.count   += 1
+            self.total_s += seconds
+            self.max_s    = max(self.max_s, seconds)
+            self.samples.append(seconds)
+            if not ok:
+                self.errors += 1
+        UPSTREAM_CALLS.inc(endpoint=self.name, outcome="ok" if ok else "error")
+        UPSTREAM_SECONDS.observe(seconds, endpoint=self.name)
+
+    def retried(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self):
+        with self._lock:
+            ordered = sorted(self.samples)
+            count, errors, retries = self.count, self.errors, self.retries
+            total_s, max_s         = self.total_s, self.max_s
+        pct = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        return {
+            "count":   count,
+            "errors":  errors,
+            "retries": retries,
+            "mean_ms": round(1000 * total_s / count, 2) if count else 0.0,
+            "p50_ms":  round(1000 * pct(0.50), 2),
+            "p95_ms":  round(1000 * pct(0.95), 2),
+            "p99_ms":  round(1000 * pct(0.99), 2),
+            "max_ms":  round(1000 * max_s, 2),
+        }
+
+
+def _make_session(pool_size, http2):
+    """
+    Keep-alive session with a connection pool per host. Uses httpx with
+    HTTP/2 when HTTP_HTTP2=1 and httpx[http2] is installed, else requests.
+    """
+    if http2:
+        try:
+            import httpx
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            return httpx.Client(http2=True, limits=limits), (httpx.TransportError,), httpx.Timeout
+        except ImportError:
+            pass
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session, (requests.ConnectionError, requests.Timeout), None
+
+
+def _remaining(timeout, deadline):
+    # Per-attempt timeout cut down to what is left before `deadline`
+    # (time.monotonic()); httpx.Timeout objects are left as they are
+    if deadline is None:
+        return timeout
+    left = max(deadline - time.monotonic(), 0.001)
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) for t in timeout)
+    if isinstance(timeout, (int, float)):
+        return min(timeout, left)
+    return timeout
+
+def _past(deadline, delay):
+    return deadline is not None and time.monotonic() + delay >= deadline
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client: pooled keep-alive connections, default
+    (connect, read) timeouts, retries with exponential backoff and full
+    jitter on connection errors and 429/5xx (honouring Retry-After), and
+    per-endpoint latency stats. Only IDEMPOTENT_METHODS are retried unless
+    the call passes `idempotent=True`. A `deadline` (time.monotonic())
+    bounds a call including its retries: attempts are cut to the time left,
+    and a retry whose backoff would end past it is not made.
+    """
+
+    def __init__(self, pool_size=20, connect_timeout=3.05, read_timeout=10.0,
+                 retries=2, backoff=0.3, http2=False):
+        self.timeout   = (connect_timeout, read_timeout)
+        self.retries   = retries
+        self.backoff   = backoff
+        self.session, self._transient, self._httpx_timeout = _make_session(pool_size, http2)
+        self._stats    = {}
+        self._lock     = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            pool_size       = int(os.environ.get("HTTP_POOL_SIZE", "20")),
+            connect_timeout = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout    = float(os.environ.get("HTTP_READ_TIMEOUT", "10")),
+            retries         = int(os.environ.get("HTTP_RETRIES", "2")),
+            backoff         = float(os.environ.get("HTTP_BACKOFF", "0.3")),
+            http2           = os.environ.get("HTTP_HTTP2", "").lower() in ("1", "true", "yes"),
+        )
+
+    def _endpoint(self, name):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = EndpointStats(name=name)
+            return stats
+
+    def _retries(self, method, retries, idempotent):
+        if retries is not None:
+            return retries
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return self.retries if idempotent else 0
+
+    def _delay(self, attempt, resp):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def request(self, method, url, endpoint=None, timeout=None, retries=None, deadline=None,
+                idempotent=None, **kwargs):
+        stats   = self._endpoint(endpoint or "other")
+        timeout = timeout if timeout is not None else self.timeout
+        retries = self._retries(method, retries, idempotent)
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            attempt_timeout = _remaining(timeout, deadline)
+            if self._httpx_timeout is not None and isinstance(attempt_timeout, tuple):
+                attempt_timeout = self._httpx_timeout(attempt_timeout[1], connect=attempt_timeout[0])
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except self._transient:
+                stats.record(time.perf_counter() - start, ok=False)
+                delay = self._delay(attempt, None)
+                if last or _past(deadline, delay):
+                    raise
+                stats.retried()
+                time.sleep(delay)
+                continue
+            stats.record(time.perf_counter() - start, ok=resp.status_code < 400)
+            if resp.status_code not in RETRY_STATUS or last:
+                return resp
+            delay = self._delay(attempt, resp)
+            if _past(deadline, delay):
+                return resp
+            stats.retried()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            items = list(self._stats.items())
+        return {name: s.snapshot() for name, s in items}
+
+
+class AsyncHttpClient(HttpClient):
+    """
+    HttpClient for the async serving mode: the same timeouts, retry policy
+    and per-endpoint stats on a pooled httpx.AsyncClient. `request()` is a
+    coroutine; build one per event loop.
+    """
+
+    def __init__(self, pool_size=100, connect_timeout=3.05, read_timeout=10.0,
+                 retries=2, backoff=0.3, http2=False):
+        import httpx
+        self.timeout  = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries  = retries
+        self.backoff  = backoff
+        limits        = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        try:
+            self.session = httpx.AsyncClient(http2=http2, limits=limits)
+        except ImportError:  # http2=True without the h2 extra
+            self.session = httpx.AsyncClient(limits=limits)
+        self._transient = (httpx.TransportError,)
+        self._stats     = {}
+        self._lock      = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            pool_size       = int(os.environ.get("ASYNC_HTTP_POOL_SIZE", "100")),
+            connect_timeout = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout    = float(os.environ.get("HTTP_READ_TIMEOUT", "10")),
+            retries         = int(os.environ.get("HTTP_RETRIES", "2")),
+            backoff         = float(os.environ.get("HTTP_BACKOFF", "0.3")),
+            http2           = os.environ.get("HTTP_HTTP2", "").lower() in ("1", "true", "yes"),
+        )
+
+    async def request(self, method, url, endpoint=None, timeout=None, retries=None, deadline=None,
+                      idempotent=None, **kwargs):
+        stats   = self._endpoint(endpoint or "other")
+        timeout = timeout if timeout is not None else self.timeout
+        retries = self._retries(method, retries, idempotent)
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            start = time.perf_counter()
+            try:
+                resp = await self.session.request(method, url, timeout=_remaining(timeout, deadline), **kwargs)
+            except self._transient:
+                stats.record(time.perf_counter() - start, ok=False)
+                delay = self._delay(attempt, None)
+                if last or _past(deadline, delay):
+                    raise
+                stats.retried()
+                await asyncio.sleep(delay)
+                continue
+            stats.record(time.perf_counter() - start, ok=resp.status_code < 400)
+            if resp.status_code not in RETRY_STATUS or last:
+                return resp
+            delay = self._delay(attempt, resp)
+            if _past(deadline, delay):
+                return resp
+            stats.retried()
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.session.aclose()
@@ -0,0 +1,125 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+# ——————————————————————————————————————————————————————————————————
+# Structured logs: one JSON object per line on stdout, in the shape Cloud
+# Logging parses (severity, message, plus any extra fields), tagged with the
+# current request id. LOG_FORMAT=text gives plain lines for local runs.
+#
+#   log = get_logger(__name__)
+#   log.warning("Text Search failed", extra=fields(status=503))
+# ——————————————————————————————————————————————————————————————————
+LOG_LEVEL  = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def request_id():
+    return _request_id.get()
+
+def bind_request_id(rid=None):
+    """Set the request id for this context; returns a token for reset_request_id."""
+    return _request_id.set(rid or uuid.uuid4().hex[:16])
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+def fields(**kwargs):
+    # extra= payload for structured fields on one log record
+    return {"fields": kwargs}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "severity": record.levelname,
+            "message":  record.getMessage(),
+            "logger":   record.name,
+            "time":     time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                        + f".{int(record.msecs):03d}Z",
+        }
+        rid = _request_id.get()
+        if rid:
+            entry["request_id"] = rid
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+
+    def format(self, record):
+        line = f"{record.levelname:7} [{_request_id.get() or '-'}] {record.getMessage()}"
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_root = logging.getLogger("suggester")
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+def get_logger(name):
+    return _root.getChild(name)
+
+
+# ——————————————————————————————————————————————————————————————————
+# Flask: request id per request + access log + request metrics
+# ——————————————————————————————————————————————————————————————————
+def _incoming_request_id(headers):
+    rid = headers.get("X-Request-ID")
+    if not rid and headers.get("X-Cloud-Trace-Context"):
+        rid = headers["X-Cloud-Trace-Context"].split("/", 1)[0]
+    return rid
+
+def init_app(app):
+    """
+    Bind a request id (X-Request-ID, else the Cloud Run trace id, else a new
+    one) for every request, echo it in the response, log one access line and
+    count the request in services.metrics.
+    """
+    from flask import g, request
+    from services.metrics import HTTP_REQUESTS, HTTP_SECONDS
+
+    access = get_logger("access")
+
+    @app.before_request
+    def _start_request():
+        g.request_token = bind_request_id(_incoming_request_id(request.headers))
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _finish_request(response):
+        elapsed = time.perf_counter() - g.get("request_start", time.perf_counter())
+        route   = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        HTTP_SECONDS.observe(elapsed, route=route)
+        response.headers["X-Request-ID"] = request_id() or ""
+        access.info(f"{request.method} {request.path} {response.status_code}",
+                    extra=fields(route=route, status=response.status_code,
+                                 latency_ms=round(elapsed * 1000, 1)))
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        token = g.pop("request_token", None)
+        if token is not None:
+            reset_request_id(token)
+
+    return app
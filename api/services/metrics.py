@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# ——————————————————————————————————————————————————————————————————
+# In-process metrics in the Prometheus text format (served at /metrics).
+# Counters and histograms are updated on the hot path; collectors are
+# called only at scrape time, to export counters other objects already
+# keep (cache and single-flight stats).
+#
+# The registry lives in one process. With several gunicorn workers
+# (WEB_CONCURRENCY > 1) each scrape reaches whichever worker accepts it and
+# returns only that worker's counts, which then look like resets; /metrics
+# is meant for one worker per instance (the default), scaling out with
+# instances and, in SERVING_MODE=async, the event loop.
+# ——————————————————————————————————————————————————————————————————
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    pairs  = ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+
+    def __init__(self, name, help, labelnames=()):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._values    = {}
+        self._lock      = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self.buckets    = tuple(buckets)
+        self._series    = {}  # labels -> [bucket counts..., sum, count]
+        self._lock      = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            names = self.labelnames + ("le",)
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_labels(names, key + (bound,))} {count}"
+            yield f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {round(series[-2], 6)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}"
+
+
+class Registry:
+    """
+    Named counters/histograms plus scrape-time collectors. A collector is a
+    zero-argument callable returning (name, type, help, [(labels dict, value)]).
+    """
+
+    def __init__(self):
+        self._metrics    = {}
+        self._collectors = []
+        self._lock       = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "suggester_stage_seconds", "Time spent in each stage of a request.", ("stage",))
+UPSTREAM_CALLS = REGISTRY.counter(
+    "suggester_upstream_calls_total", "Upstream HTTP attempts by endpoint and outcome.",
+    ("endpoint", "outcome"))
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "suggester_upstream_seconds", "Upstream HTTP attempt latency.", ("endpoint",))
+ERRORS = REGISTRY.counter(
+    "suggester_errors_total", "Handled errors by where they happened.", ("where",))
+HTTP_REQUESTS = REGISTRY.counter(
+    "suggester_http_requests_total", "Requests served, by route, method and status.",
+    ("route", "method", "status"))
+HTTP_SECONDS = REGISTRY.histogram(
+    "suggester_http_request_seconds", "Request latency by route.", ("route",))
+
+
+@contextmanager
+def span(stage):
+    # Time a block of a request (also fine around awaits in async handlers)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
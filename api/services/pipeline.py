@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+
+from services.log import fields, get_logger
+from services.metrics import ERRORS, STAGE_SECONDS
+
+_DONE = object()
+log   = get_logger("pipeline")
+
+
+class Stage:
+    """
+    One pipeline step: `fn(item)` returns an iterable of outputs (zero, one or
+    many) for the next stage, and runs on `workers` threads.
+
+    With `batch` set, `fn` gets a list of up to `batch` items instead: the
+    first one waited for, then whatever is already queued behind it. Batches
+    fill up when the stage is the bottleneck and stay small when it is not.
+    """
+
+    def __init__(self, name, fn, workers=1, batch=None):
+        self.name    = name
+        self.fn      = fn
+        self.workers = workers
+        self.batch   = batch
+
+        self.processed = 0
+        self.emitted   = 0
+        self.errors    = 0
+        self.busy_s    = 0.0
+
+
+class Pipeline:
+    """
+    Streaming pipeline of stages connected by bounded queues.
+
+    The source is consumed on its own thread and only as fast as the slowest
+    stage drains, so memory stays flat regardless of input size. A failing
+    item is counted and logged against its stage and dropped; the rest of the
+    stream keeps flowing.
+    """
+
+    def __init__(self, stages, queue_size=100):
+        self.stages     = stages
+        self.queue_size = queue_size
+        self.errors     = []
+        self._lock      = threading.Lock()
+
+    @staticmethod
+    def _take(stage, inbox):
+        # (next input for stage.fn, whether the end of the stream was reached)
+        item = inbox.get()
+        if item is _DONE or not stage.batch:
+            return item, item is _DONE
+        items = [item]
+        while len(items) < stage.batch:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _worker(self, stage, inbox, outbox, finished):
+        done = False
+        while not done:
+            item, done = self._take(stage, inbox)
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                outputs = list(stage.fn(item) or ())
+            except Exception as e:
+                outputs = []
+                with self._lock:
+                    stage.errors += 1
+                    self.errors.append(f"{stage.name}: {e}")
+                ERRORS.inc(where=f"pipeline.{stage.name}")
+                log.warning(f"pipeline stage failed: {e}", extra=fields(stage=stage.name))
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.observe(elapsed, stage=f"pipeline.{stage.name}")
+            with self._lock:
+                stage.processed += len(item) if stage.batch else 1
+                stage.emitted   += len(outputs)
+                stage.busy_s    += elapsed
+            if outbox is not None:
+                for out in outputs:
+                    outbox.put(out)
+        # Last worker of this stage out closes the next queue
+        with self._lock:
+            finished[stage.name] -= 1
+            last = finished[stage.name] == 0
+        if last and outbox is not None:
+            nxt = self.stages[self.stages.index(stage) + 1]
+            for _ in range(nxt.workers):
+                outbox.put(_DONE)
+
+    def run(self, source):
+        queues   = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        finished = {s.name: s.workers for s in self.stages}
+        threads  = []
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(stage, queues[i], outbox, finished),
+                                     name=f"pipeline-{stage.name}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        start = time.perf_counter()
+        try:
+            for item in source:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for t in threads:
+                t.join()
+        self.elapsed_s = time.perf_counter() - start
+        return self
+
+    def stats(self):
+        return {
+            "elapsed_s": round(getattr(self, "elapsed_s", 0.0), 3),
+            "errors":    len(self.errors),
+            "stages": {
+                s.name: {"workers": s.workers, "processed": s.processed, "emitted": s.emitted,
+                         "errors": s.errors, "busy_s": round(s.busy_s, 3)}
+                for s in self.stages
+            },
+        }
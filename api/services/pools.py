@@ -0,0 +1,305 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+from services.resources import LazyDb
+
+# ——————————————————————————————————————————————————————————————————
+# Precomputed suggestion pools: per search key (query variant, cuisine
+# type, geohash cell) the scored, formatted and enriched candidates, so a
+# request only has to re-score them for the user (distance, recency) and
+# sample.
+#
+# POOL_MAX_AGE          serve a pool for at most this long (s); 0 (default)
+#                       disables pools and every request is computed live
+# POOL_REFRESH_AGE      the background refresher rebuilds pools older than this
+# POOL_REFRESH_INTERVAL how often the refresher looks (s); 0 = no thread
+# POOL_REFRESH_LEASE    how long one process holds a key's rebuild (s)
+# POOL_IDLE_AGE         keys nobody has asked for in this long (s) are no
+#                       longer refreshed and are dropped
+# POOL_MAX_KEYS         pools kept in memory; least recently used go first
+# POOL_SIZE             candidates kept per pool (best-scored first)
+# POOL_BACKEND          "" (per process) or "firestore" (shared by instances
+#                       and the daily job)
+#
+# The refresher only runs with the shared backend, where a lease per key
+# lets one process rebuild it and the others pick the result up from the
+# shared tier. Per-process pools are rebuilt on the request that finds
+# one expired; or refresh them all with jobs/refresh_pools.py.
+# ——————————————————————————————————————————————————————————————————
+POOL_MAX_AGE          = float(os.environ.get("POOL_MAX_AGE", "0"))
+POOL_REFRESH_AGE      = float(os.environ.get("POOL_REFRESH_AGE", "3600"))
+POOL_REFRESH_INTERVAL = float(os.environ.get("POOL_REFRESH_INTERVAL", "300"))
+POOL_REFRESH_LEASE    = float(os.environ.get("POOL_REFRESH_LEASE", "600"))
+POOL_IDLE_AGE         = float(os.environ.get("POOL_IDLE_AGE", "21600"))
+POOL_MAX_KEYS         = int(os.environ.get("POOL_MAX_KEYS", "10000"))
+POOL_SIZE             = int(os.environ.get("POOL_SIZE", "20"))
+
+log = get_logger("pools")
+
+
+class Pool:
+    """
+    Candidates for one search key, best first: `places` are formatted and
+    enriched suggestion dicts, `scores` their model probabilities from the
+    cell centre, `inputs` the Places fields the model reads (ml.features.
+    FEATURE_FIELDS), so each user's request can re-score them.
+    """
+    __slots__ = ("places", "scores", "inputs", "built_at")
+
+    def __init__(self, places, scores, inputs=None, built_at=None):
+        self.places   = places
+        self.scores   = scores
+        self.inputs   = inputs or []
+        self.built_at = built_at if built_at is not None else time.time()
+
+    def age(self):
+        return time.time() - self.built_at
+
+    def to_doc(self):
+        return {"places": self.places, "scores": self.scores, "inputs": self.inputs,
+                "built_at": self.built_at}
+
+    @classmethod
+    def from_doc(cls, doc):
+        return cls(doc.get("places", []), doc.get("scores", []), doc.get("inputs"), doc.get("built_at", 0.0))
+
+
+class FirestorePoolTier(LazyDb):
+    """Pools shared through Firestore (one document per key), and their rebuild leases."""
+
+    def __init__(self, db, collection="suggestion_pools", leases="suggestion_pool_leases"):
+        super().__init__(db)
+        self._collection = collection
+        self._leases     = leases
+
+    @staticmethod
+    def doc_id(key):
+        # Any key is a valid document id this way (no "/", ".", "__x__" or > 1500 bytes)
+        return hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        doc = self.db.collection(self._collection).document(self.doc_id(key)).get()
+        return Pool.from_doc(doc.to_dict()) if doc.exists else None
+
+    def set(self, key, pool):
+        self.db.collection(self._collection).document(self.doc_id(key)).set(pool.to_doc())
+
+    def claim(self, key, ttl):
+        """
+        Take the rebuild lease of `key` for `ttl` seconds. True for one
+        caller at a time across every process and instance.
+        """
+        from google.api_core.exceptions import Conflict, FailedPrecondition
+
+        ref   = self.db.collection(self._leases).document(self.doc_id(key))
+        now   = time.time()
+        lease = {"until": now + ttl}
+        try:
+            ref.create(lease)
+            return True
+        except Conflict:
+            pass
+        snap = ref.get()
+        if snap.exists and snap.to_dict().get("until", 0) > now:
+            return False
+        try:
+            # Expired: take it over, unless another process did since we read it
+            if snap.exists:
+                ref.update(lease, option=self.db.write_option(last_update_time=snap.update_time))
+            else:
+                ref.create(lease)
+            return True
+        except (Conflict, FailedPrecondition):
+            return False
+
+
+class PoolStore:
+    """
+    Pools in memory, optionally backed by a shared tier. A pool older than
+    `max_age` is not served. Keys are kept in least-recently-requested
+    order: at most `max_keys` of them, and none idle for over `idle_age`
+    once evict_idle() has run (the refresher calls it every pass).
+    """
+
+    def __init__(self, max_age=POOL_MAX_AGE, shared=None, idle_age=POOL_IDLE_AGE, max_keys=POOL_MAX_KEYS):
+        self.max_age  = max_age
+        self.shared   = shared
+        self.idle_age = idle_age
+        self.max_keys = max_keys
+        self._pools   = OrderedDict()            # key -> Pool, least recently requested first
+        self._used    = {}                       # key -> last request (epoch s)
+        self._lock    = threading.Lock()
+
+        self.hits          = 0
+        self.misses        = 0
+        self.shared_hits   = 0
+        self.shared_errors = 0
+        self.builds        = 0
+        self.evictions     = 0
+
+    @property
+    def enabled(self):
+        return self.max_age > 0
+
+    def get(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._touch(key)
+        if (pool is None or pool.age() > self.max_age) and self.shared is not None:
+            try:
+                found = self.shared.get(key)
+            except Exception as e:
+                self.shared_errors += 1
+                ERRORS.inc(where="pools.shared_get")
+                log.warning(f"pool shared get failed: {e}", extra=fields(key="|".join(key)))
+                found = None
+            if found is not None and found.age() <= self.max_age:
+                self._insert(key, found)
+                pool = found
+                self.shared_hits += 1
+        if pool is None or pool.age() > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pool
+
+    def put(self, key, pool):
+        self._insert(key, pool)
+        self.builds += 1
+        if self.shared is not None:
+            try:
+                self.shared.set(key, pool)
+            except Exception as e:
+                self.shared_errors += 1
+                ERRORS.inc(where="pools.shared_set")
+                log.warning(f"pool shared set failed: {e}", extra=fields(key="|".join(key)))
+
+    def adopt(self, key, max_age):
+        """
+        Take the shared tier's pool for `key` if it is at most `max_age` old
+        (another process rebuilt it). Does not count as a request for the key.
+        """
+        if self.shared is None:
+            return False
+        try:
+            found = self.shared.get(key)
+        except Exception as e:
+            self.shared_errors += 1
+            ERRORS.inc(where="pools.shared_get")
+            log.warning(f"pool shared get failed: {e}", extra=fields(key="|".join(key)))
+            return False
+        if found is None or found.age() > max_age:
+            return False
+        self._insert(key, found)
+        return True
+
+    def claim(self, key, ttl=POOL_REFRESH_LEASE):
+        # Whether this process should rebuild `key` now (always, without a shared tier)
+        return self.shared is None or self.shared.claim(key, ttl)
+
+    def _touch(self, key):
+        # Under the lock
+        self._used[key] = time.time()
+        self._pools.move_to_end(key)
+
+    def _insert(self, key, pool):
+        # A refresh keeps the key's place; a new key counts as just requested
+        with self._lock:
+            if key not in self._pools:
+                self._used[key] = time.time()
+            self._pools[key] = pool
+            while len(self._pools) > self.max_keys:
+                self._drop(next(iter(self._pools)))
+
+    def _drop(self, key):
+        # Under the lock
+        del self._pools[key]
+        self._used.pop(key, None)
+        self.evictions += 1
+
+    def evict_idle(self):
+        """Drop the keys nobody has requested for `idle_age` seconds; returns how many."""
+        cutoff = time.time() - self.idle_age
+        with self._lock:
+            idle = [key for key in self._pools if self._used.get(key, 0.0) < cutoff]
+            for key in idle:
+                self._drop(key)
+        return len(idle)
+
+    def keys_older_than(self, seconds):
+        with self._lock:
+            return [key for key, pool in self._pools.items() if pool.age() > seconds]
+
+    def stats(self):
+        return {
+            "size":          len(self._pools),
+            "hits":          self.hits,
+            "misses":        self.misses,
+            "shared_hits":   self.shared_hits,
+            "shared_errors": self.shared_errors,
+            "builds":        self.builds,
+            "evictions":     self.evictions,
+        }
+
+
+class PoolRefresher:
+    """
+    Background thread that rebuilds, every `interval` seconds, each pool this
+    process holds that is older than `refresh_age`, so requests keep hitting
+    a fresh pool instead of rebuilding one inline. A key another process has
+    already rebuilt (shared tier) is taken from there; one whose lease
+    another process holds is left to it.
+    """
+
+    def __init__(self, store, build, interval=POOL_REFRESH_INTERVAL, refresh_age=POOL_REFRESH_AGE,
+                 lease=POOL_REFRESH_LEASE):
+        self.store       = store
+        self.build       = build
+        self.interval    = interval
+        self.refresh_age = refresh_age
+        self.lease       = lease
+        self.refreshed   = 0
+        self.adopted     = 0
+        self._stop       = threading.Event()
+        self._thread     = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="pool-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_once(self):
+        # Keys that went idle are dropped, not rebuilt: no quota spent on them
+        self.store.evict_idle()
+        for key in self.store.keys_older_than(self.refresh_age):
+            try:
+                if self.store.adopt(key, self.refresh_age):
+                    self.adopted += 1
+                    continue
+                if not self.store.claim(key, self.lease):
+                    continue
+                self.build(key)
+                self.refreshed += 1
+            except Exception as e:
+                ERRORS.inc(where="pools.refresh")
+                log.warning(f"pool refresh failed: {e}", extra=fields(key="|".join(key)))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh_once()
+
+
+def pool_store_from_env(db_factory=None):
+    backend = os.environ.get("POOL_BACKEND", "").strip().lower()
+    shared  = FirestorePoolTier(db_factory) if backend == "firestore" and db_factory else None
+    return PoolStore(max_age=POOL_MAX_AGE, shared=shared)
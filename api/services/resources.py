@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+
+# ——————————————————————————————————————————————————————————————————
+# MODEL_PATH       compiled forest (.npz); the .pkl next to it is the fallback
+# MODEL_MMAP       map the compiled model's arrays read-only (ml.inference.
+#                  map_npz) instead of reading a private copy per process
+# WARMUP_ON_START  build every resource before the first request
+# APP_PRELOAD      set by gunicorn.conf.py when the master imports the app
+#                  before forking (preload_app): the model is loaded there,
+#                  once, and shared by the workers; clients, which do not
+#                  survive a fork, are left for each worker (main.start_worker)
+# ——————————————————————————————————————————————————————————————————
+MODEL_PATH      = os.environ.get("MODEL_PATH", "suggestion_model.npz")
+MODEL_MMAP      = os.environ.get("MODEL_MMAP", "1").lower() in ("1", "true", "yes")
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "").lower() in ("1", "true", "yes")
+PRELOADED       = os.environ.get("APP_PRELOAD", "").lower() in ("1", "true", "yes")
+
+# ——————————————————————————————————————————————————————————————————
+# Default factories: heavy imports happen here, on first use, not at import
+# ——————————————————————————————————————————————————————————————————
+def _firestore_client():
+    from google.cloud import firestore
+    return firestore.Client()
+
+def _http_session():
+    from services.http_client import HttpClient
+    return HttpClient.from_env()
+
+def _store():
+    from services.store import SuggestionStore
+    return SuggestionStore(resources.db)
+
+def _async_firestore_client():
+    from google.cloud import firestore
+    return firestore.AsyncClient()
+
+def _async_http_session():
+    from services.http_client import AsyncHttpClient
+    return AsyncHttpClient.from_env()
+
+def _async_store():
+    from services.store import AsyncSuggestionStore
+    return AsyncSuggestionStore(resources.adb)
+
+def _model():
+    from ml.inference import load_scorer
+    return load_scorer(MODEL_PATH, os.path.splitext(MODEL_PATH)[0] + ".pkl", mmap=MODEL_MMAP)
+
+
+class LazyDb:
+    """
+    Base for Firestore-backed tiers: `db` may be a client or a zero-argument
+    callable returning one (e.g. lambda: resources.db), resolved on first use.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    @property
+    def db(self):
+        if callable(self._db):
+            self._db = self._db()
+        return self._db
+
+
+class Resources:
+    """
+    Per-process registry of expensive shared handles (Firestore client, HTTP
+    session, data-access store, model). Each one is built by its factory the first time it is
+    asked for, exactly once even under concurrent first access, and the time
+    it took is kept in `timings` (seconds).
+    """
+
+    def __init__(self):
+        self._lock      = threading.RLock()  # factories may depend on other resources
+        self._factories = {}
+        self._instances = {}
+        self.timings    = {}
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def override(self, name, instance):
+        # Inject a ready-made instance (tests, benchmarks, batch jobs)
+        with self._lock:
+            self._instances[name] = instance
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self.timings[name] = time.perf_counter() - start
+                self._instances[name] = instance
+        return instance
+
+    def loaded(self):
+        return sorted(self._instances)
+
+    def warmup(self, names=None):
+        """
+        Build the given resources (default: the sync ones) now instead of on
+        the first request. Returns {name: init seconds}.
+        """
+        for name in names or SYNC_RESOURCES:
+            self.get(name)
+        return dict(self.timings)
+
+    @property
+    def db(self):
+        return self.get("db")
+
+    @property
+    def http(self):
+        return self.get("http")
+
+    @property
+    def store(self):
+        return self.get("store")
+
+    @property
+    def model(self):
+        return self.get("model")
+
+    # Async serving mode (asgi.py): clients bound to the worker's event loop
+    @property
+    def adb(self):
+        return self.get("adb")
+
+    @property
+    def ahttp(self):
+        return self.get("ahttp")
+
+    @property
+    def astore(self):
+        return self.get("astore")
+
+
+resources = Resources()
+resources.register("db", _firestore_client)
+resources.register("http", _http_session)
+resources.register("store", _store)
+resources.register("model", _model)
+resources.register("adb", _async_firestore_client)
+resources.register("ahttp", _async_http_session)
+resources.register("astore", _async_store)
+
+# Built by warmup() when no names are given; the async clients are only
+# needed, and only warmed, by the ASGI app.
+SYNC_RESOURCES  = ("db", "http", "store", "model")
+ASYNC_RESOURCES = ("adb", "ahttp", "astore", "model")
+# Plain read-only data, safe to build before fork and share
+FORK_SAFE       = ("model",)
+
+
+def init_app(app):
+    """
+    Attach the registry to a Flask app. In a preloading gunicorn master the
+    fork-safe resources (the model) are built now, for every worker to share.
+    """
+    app.extensions["resources"] = resources
+    if PRELOADED:
+        resources.warmup(FORK_SAFE)
+    return resources
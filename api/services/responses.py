@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # plain json fallback, same output modulo whitespace
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# ——————————————————————————————————————————————————————————————————
+# JSON responses for the suggestion payloads, shared by the Flask route and
+# the async (ASGI) handler: fast encoding (orjson when installed), optional
+# field projection, Accept-Encoding negotiation (br / gzip) and, for
+# cacheable bodies, a weak ETag so a client that already has the same body
+# gets a 304. /suggestions is not cacheable (see encode_suggestions).
+#
+# RESPONSE_COMPRESS_MIN  bodies smaller than this (bytes) are sent as is
+# RESPONSE_GZIP_LEVEL    gzip level (1-9)
+# RESPONSE_BROTLI_LEVEL  brotli quality (0-11)
+# ——————————————————————————————————————————————————————————————————
+RESPONSE_COMPRESS_MIN = int(os.environ.get("RESPONSE_COMPRESS_MIN", "1024"))
+RESPONSE_GZIP_LEVEL   = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_LEVEL = int(os.environ.get("RESPONSE_BROTLI_LEVEL", "4"))
+
+
+def _default(value):
+    # NumPy scalars (scores, ratings read back from arrays), anything else as str
+    return value.item() if hasattr(value, "item") else str(value)
+
+def dumps(body):
+    """Compact UTF-8 JSON bytes for `body`."""
+    if orjson is not None:
+        return orjson.dumps(body, default=_default)
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+def parse_fields(value, allowed):
+    """
+    Fields requested by a `fields=a,b` query value: a tuple, None when the
+    parameter is absent or empty. Raises ValueError naming unknown fields.
+    """
+    if not value:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown   = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return requested or None
+
+def project(items, fields):
+    # Copies of `items` with only `fields` (in that order); all of them if fields is None
+    if fields is None:
+        return items
+    return [{f: item[f] for f in fields if f in item} for item in items]
+
+def etag(payload):
+    return 'W/"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match, tag):
+    # Weak comparison, as If-None-Match requires
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = tag[2:] if tag.startswith("W/") else tag
+    return any((t.strip()[2:] if t.strip().startswith("W/") else t.strip()) == bare
+               for t in if_none_match.split(","))
+
+def not_modified(tag):
+    return 304, [("Vary", "Accept-Encoding"), ("ETag", tag), ("Cache-Control", "private, no-cache")], b""
+
+def negotiate(accept_encoding):
+    """Best of br / gzip / identity that the client accepts (q > 0)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return "identity"
+
+def compress(payload, coding):
+    if coding == "br":
+        return brotli.compress(payload, quality=RESPONSE_BROTLI_LEVEL)
+    if coding == "gzip":
+        return gzip.compress(payload, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    return payload
+
+def encode(body, status=200, accept_encoding=None, if_none_match=None, cacheable=True):
+    """
+    (status, headers, payload bytes) for a JSON body. Successful cacheable
+    responses carry an ETag (and become a bodiless 304 when it matches
+    If-None-Match); bodies of RESPONSE_COMPRESS_MIN bytes or more are
+    compressed with the best coding in Accept-Encoding.
+    """
+    payload = dumps(body)
+    headers = [("Content-Type", "application/json"), ("Vary", "Accept-Encoding")]
+    if cacheable and status == 200:
+        tag = etag(payload)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+        headers += [("ETag", tag), ("Cache-Control", "private, no-cache")]
+    coding = negotiate(accept_encoding) if len(payload) >= RESPONSE_COMPRESS_MIN else "identity"
+    if coding != "identity":
+        payload = compress(payload, coding)
+        headers.append(("Content-Encoding", coding))
+    headers.append(("Content-Length", str(len(payload))))
+    return status, headers, payload
@@ -0,0 +1,18 @@
+import heapq
+import random
+
+
+def weighted_top_k(weights, k, rng=random):
+    """
+    Indices of `k` items sampled without replacement with probability
+    proportional to their weight (Efraimidis–Spirakis: key = u ** (1 / w),
+    keep the k largest keys in a heap), ordered by key, best first.
+
+    Higher-weight items are usually, not always, picked first, which keeps
+    repeated requests diverse. Items with weight <= 0 are never picked.
+    O(n log k).
+    """
+    if k <= 0:
+        return []
+    keyed = ((rng.random() ** (1.0 / w), i) for i, w in enumerate(weights) if w > 0)
+    return [i for _, i in heapq.nlargest(k, keyed)]
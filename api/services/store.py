@@ -0,0 +1,193 @@
+import os
+import threading
+
+from services.ttl_cache import MISSING, TTLCache
+
+# ——————————————————————————————————————————————————————————————————
+# Firestore data access for the suggestion path: preferences + history
+# ——————————————————————————————————————————————————————————————————
+MAX_BATCH_WRITES = 500  # Firestore limit per WriteBatch
+
+# Read-through cache of preference documents, shared by /preferences and
+# /suggestions in this process. Writes made here invalidate it; writes made
+# by other instances show up within the TTL. A missing document (None) is
+# kept only PREFS_MISSING_TTL seconds (default: not cached), so a user who
+# signs up through another instance is not answered 404 for the full TTL.
+preferences_cache = TTLCache(
+    maxsize = int(os.environ.get("PREFS_CACHE_SIZE", "10000")),
+    ttl     = float(os.environ.get("PREFS_CACHE_TTL", "300")),
+)
+PREFS_MISSING_TTL = float(os.environ.get("PREFS_MISSING_TTL", "0"))
+
+
+def cache_prefs(cache, user_id, prefs):
+    cache.set(user_id, prefs, ttl=PREFS_MISSING_TTL if prefs is None else None)
+
+
+def _server_timestamp():
+    from google.cloud import firestore
+    return firestore.SERVER_TIMESTAMP
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer for history documents: writes are queued and
+    committed as WriteBatches of up to `batch_size` documents, on `flush()`
+    or whenever the buffer fills. A later write for the same user replaces
+    the queued one.
+    """
+
+    def __init__(self, db, batch_size=MAX_BATCH_WRITES):
+        self._db        = db
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self._pending   = {}
+        self._lock      = threading.Lock()
+        self.commits    = 0
+        self.written    = 0
+
+    def set(self, user_id, data):
+        with self._lock:
+            self._pending[user_id] = data
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        for i in range(0, len(items), self.batch_size):
+            batch = self._db.batch()
+            chunk = items[i:i + self.batch_size]
+            for user_id, data in chunk:
+                batch.set(self._db.collection("history").document(user_id), data)
+            batch.commit()
+            self.commits += 1
+            self.written += len(chunk)
+
+
+class SuggestionStore:
+    """
+    Reads preferences and history together in one `get_all` round-trip and
+    writes history either directly or through a HistoryWriter (batch mode).
+    Preference reads go through `prefs_cache`, preference writes invalidate it.
+    """
+
+    def __init__(self, db, writer=None, prefs_cache=preferences_cache):
+        self._db         = db
+        self.writer      = writer
+        self.prefs_cache = prefs_cache
+
+    def _refs(self, collection, user_ids):
+        col = self._db.collection(collection)
+        return [col.document(uid) for uid in user_ids]
+
+    def load_user(self, user_id):
+        """
+        Return (prefs, history) for one user; either is None when the
+        document does not exist. Cached preferences leave a single read.
+        """
+        prefs = self.prefs_cache.get(user_id)
+        if prefs is not MISSING:
+            return prefs, self.load_history(user_id)
+
+        prefs, history = None, None
+        refs = [self._db.collection("preferences").document(user_id),
+                self._db.collection("history").document(user_id)]
+        for snap in self._db.get_all(refs):
+            if not snap.exists:
+                continue
+            if snap.reference.parent.id == "preferences":
+                prefs = snap.to_dict()
+            else:
+                history = snap.to_dict()
+        cache_prefs(self.prefs_cache, user_id, prefs)
+        return prefs, history
+
+    def load_prefs(self, user_id):
+        prefs = self.prefs_cache.get(user_id)
+        if prefs is MISSING:
+            snap  = self._db.collection("preferences").document(user_id).get()
+            prefs = snap.to_dict() if snap.exists else None
+            cache_prefs(self.prefs_cache, user_id, prefs)
+        return prefs
+
+    def save_prefs(self, user_id, prefs):
+        self._db.collection("preferences").document(user_id).set(prefs)
+        self.prefs_cache.invalidate(user_id)
+
+    def save_prefs_batch(self, items):
+        """Write [(user_id, prefs)] as one WriteBatch (at most MAX_BATCH_WRITES)."""
+        if len(items) > MAX_BATCH_WRITES:
+            raise ValueError(f"{len(items)} writes exceed the {MAX_BATCH_WRITES} per batch limit")
+        if not items:
+            return 0
+        col   = self._db.collection("preferences")
+        batch = self._db.batch()
+        for user_id, prefs in items:
+            batch.set(col.document(user_id), prefs)
+        batch.commit()
+        for user_id, _ in items:
+            self.prefs_cache.invalidate(user_id)
+        return len(items)
+
+    def stream_prefs(self, after=None):
+        """(user_id, prefs) for every preferences document, in id order, after `after`."""
+        col   = self._db.collection("preferences")
+        query = col.order_by("__name__")
+        if after:
+            query = query.where("__name__", ">", col.document(after))
+        for snap in query.stream():
+            yield snap.id, snap.to_dict()
+
+    def load_histories(self, user_ids):
+        """{user_id: history dict} for the users that have one, in one round-trip."""
+        if not user_ids:
+            return {}
+        return {snap.id: snap.to_dict()
+                for snap in self._db.get_all(self._refs("history", user_ids)) if snap.exists}
+
+    def load_history(self, user_id):
+        snap = self._db.collection("history").document(user_id).get()
+        return snap.to_dict() if snap.exists else None
+
+    def save_history(self, user_id, doc):
+        # `doc` is an encoded services.history.RecentPlaces
+        data = dict(doc, last_sent=_server_timestamp())
+        if self.writer is not None:
+            self.writer.set(user_id, data)
+        else:
+            self._db.collection("history").document(user_id).set(data)
+
+
+class AsyncSuggestionStore:
+    """
+    SuggestionStore for the async serving mode, on a firestore.AsyncClient.
+    """
+
+    def __init__(self, db, prefs_cache=preferences_cache):
+        self._db         = db
+        self.prefs_cache = prefs_cache
+
+    async def load_user(self, user_id):
+        prefs = self.prefs_cache.get(user_id)
+        if prefs is not MISSING:
+            snap = await self._db.collection("history").document(user_id).get()
+            return prefs, (snap.to_dict() if snap.exists else None)
+
+        prefs, history = None, None
+        refs = [self._db.collection("preferences").document(user_id),
+                self._db.collection("history").document(user_id)]
+        async for snap in self._db.get_all(refs):
+            if not snap.exists:
+                continue
+            if snap.reference.parent.id == "preferences":
+                prefs = snap.to_dict()
+            else:
+                history = snap.to_dict()
+        cache_prefs(self.prefs_cache, user_id, prefs)
+        return prefs, history
+
+    async def save_history(self, user_id, doc):
+        data = dict(doc, last_sent=_server_timestamp())
+        await self._db.collection("history").document(user_id).set(data)
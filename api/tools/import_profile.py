@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+# Import-time profile of the API entry point, from `python -X importtime`.
+# Usage (from api/): python -m tools.import_profile [module] [top_n]
+#
+# Prints the total wall time to import `module` (default: main, i.e. what a
+# gunicorn worker pays before serving /health) and the slowest imports by
+# cumulative time, so startup regressions show up in review.
+
+def profile_imports(module="main"):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return rows
+
+def report(module="main", top_n=25):
+    rows = profile_imports(module)
+    top_level = [r for r in rows if not r[2].startswith(" ")]
+    total_us = sum(r[0] for r in top_level)
+
+    print(f"import {module}: {total_us / 1000:.1f} ms total, {len(rows)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top_n]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name.strip()}")
+    return total_us
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    report(args[0] if args else "main", int(args[1]) if len(args) > 1 else 25)
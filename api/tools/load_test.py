@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+# Closed-loop load test: `concurrency` clients each send requests back to back
+# until `requests` have completed, then report RPS and latency percentiles.
+# `url` may also be a function i -> (method, url, json body or None), for
+# scenarios that vary the request (bench.run).
+# Pass several base URLs to compare deployments (e.g. sync vs async mode):
+#
+#   python -m tools.load_test http://localhost:8080 http://localhost:8081 \
+#       --path /suggestions/user1 --concurrency 200 --requests 2000
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+async def run_load(url, concurrency=100, requests=1000, timeout=30.0):
+    latencies, statuses = [], {}
+    remaining = [requests]
+    make      = url if callable(url) else (lambda i: ("GET", url, None))
+
+    async def client(session):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            method, target, body = make(remaining[0])
+            start = time.perf_counter()
+            try:
+                resp = await session.request(method, target, json=body)
+                status = resp.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    return {
+        "url":      url if isinstance(url, str) else getattr(url, "__name__", "scenario"),
+        "requests": len(latencies),
+        "ok":       statuses.get(200, 0),
+        "statuses": statuses,
+        "rps":      round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms":   round(1000 * percentile(ordered, 0.50), 1),
+        "p95_ms":   round(1000 * percentile(ordered, 0.95), 1),
+        "p99_ms":   round(1000 * percentile(ordered, 0.99), 1),
+    }
+
+def report(results):
+    print(f"{'url':40} {'ok':>6} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+    for r in results:
+        print(f"{r['url']:40} {r['ok']:>6} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+        if r["ok"] != r["requests"]:
+            print(f"{'':40} statuses: {r['statuses']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare throughput/latency of one path across deployments")
+    parser.add_argument("base_urls", nargs="+")
+    parser.add_argument("--path", default="/suggestions/user1")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    report([asyncio.run(run_load(base.rstrip("/") + args.path, args.concurrency, args.requests))
+            for base in args.base_urls])
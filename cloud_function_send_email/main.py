@@ -1,12 +1,30 @@
 import os
 import requests
-import smtplib
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from email.mime.text import MIMEText
 from jinja2 import Environment, FileSystemLoader
 from flask import Flask, request
+from mailer import Mailer
 
 app = Flask(__name__)
 
+# SMTP sessions are reused across requests served by this instance
+mailer = Mailer.from_env()
+
+# Parsed and compiled once per instance, not per request
+template_env = Environment(loader=FileSystemLoader('templates'), auto_reload=False)
+
+# Keep-alive session for the suggestions call: explicit (connect, read)
+# timeouts, and GETs retried with backoff on connection errors and 429/5xx.
+# The defaults keep every attempt inside the function's 60 s timeout.
+SUGGESTIONS_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")), float(os.getenv("SUGGESTIONS_TIMEOUT", "15")))
+http = requests.Session()
+http.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=int(os.getenv("HTTP_RETRIES", "2")), backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.3")),
+    status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET"}), raise_on_status=False)))
+http.mount("http://", http.get_adapter("https://"))
+
 @app.route('/', methods=['GET'])
 def home():
     return "Email sender is running.", 200
@@ -14,7 +32,6 @@ def home():
 @app.route('/send_email', methods=['POST'])
 def send_email():
     SENDER_EMAIL = os.getenv("SENDER_EMAIL")
-    GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
     CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")
 
     user_id = "user123"
@@ -23,7 +40,7 @@ def send_email():
     print(f"📡 Fetching suggestions from: {suggestions_url}", flush=True)
 
     try:
-        response = requests.get(suggestions_url)
+        response = http.get(suggestions_url, timeout=SUGGESTIONS_TIMEOUT)
         if response.status_code != 200:
             print(f"❌ Failed to fetch suggestions. Status: {response.status_code}", flush=True)
             return "Failed to fetch suggestions", 500
@@ -36,8 +53,7 @@ def send_email():
         return f"Exception during fetch: {e}", 500
 
     try:
-        env = Environment(loader=FileSystemLoader('templates'))
-        template = env.get_template('suggestion_email.html')
+        template = template_env.get_template('suggestion_email.html')
         html_content = template.render(suggestions=suggestions)
 
         msg = MIMEText(html_content, 'html')
@@ -45,10 +61,7 @@ def send_email():
         msg['From'] = SENDER_EMAIL
         msg['To'] = SENDER_EMAIL
 
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
+        mailer.send(msg)
 
         print("✅ Email sent successfully", flush=True)
         return "Email sent successfully", 200
@@ -0,0 +1,12 @@
+#!/bin/sh
+# Refresh the copies of email_service/mailer.py and the email template that
+# the Cloud Functions deploy with (each is deployed from its own directory,
+# so it cannot import the shared package). The copies are checked in;
+# tests/test_vendored.py fails when one has drifted. Run from anywhere.
+set -e
+cd "$(dirname "$0")/.."
+
+for dir in cloud_function_send_email email_trigger_function; do
+    cp email_service/mailer.py "$dir/mailer.py"
+    cp email_service/templates/suggestion_email.html "$dir/templates/suggestion_email.html"
+done
@@ -1,19 +1,45 @@
 import os
+import sys
 import requests
-import smtplib
 from email.mime.text import MIMEText
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from dotenv import load_dotenv
 
+if __name__ == '__main__':
+    # Run as a script (python email_service/email_sender.py): the package's
+    # parent (repo root, or /app in the image) and the repo's api/ on the path
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [_root, os.path.join(_root, "api")]
+
+from email_service.mailer import get_mailer
+from services.log import fields, get_logger
+from services.metrics import ERRORS
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Set your live Cloud Run service URL
-CLOUD_RUN_URL = "https://restaurant-suggester-726264366097.asia-northeast1.run.app"
+log = get_logger("email_sender")
+
+# Use env var if set, fallback to hardcoded Cloud Run URL
+CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL") or "https://restaurant-suggester-726264366097.asia-northeast1.run.app"
 
-# Retrieve your sender email and app password from environment variables
+# Sender address (the SMTP password is read by the mailer)
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")  # e.g., "kopser@gmail.com"
-GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")  # e.g., "your_app_password"
+
+# Keep-alive session for calls to the suggestions service, with (connect, read) timeouts
+http = requests.Session()
+SUGGESTIONS_TIMEOUT = (3.05, float(os.getenv("SUGGESTIONS_TIMEOUT", "60")))
+
+# Template registry: one Environment per process, so each template is parsed
+# and compiled once. Compiled bytecode is also cached on disk
+# (TEMPLATE_CACHE_DIR, default: system temp dir) for the next cold start.
+# Templates are only re-checked for changes when TEMPLATE_AUTO_RELOAD=1 (dev).
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", os.getenv("FLASK_DEBUG", "0")).lower() in ("1", "true", "yes")
+template_env = Environment(
+    loader=FileSystemLoader(['email_service/templates', os.path.join(os.path.dirname(__file__), 'templates')]),
+    bytecode_cache=FileSystemBytecodeCache(os.getenv("TEMPLATE_CACHE_DIR") or None),
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+)
 
 def fetch_personalized_suggestions(user_id):
     """
@@ -21,46 +47,88 @@ def fetch_personalized_suggestions(user_id):
     """
     url = f"{CLOUD_RUN_URL}/suggestions/{user_id}"
     try:
-        response = requests.get(url)
+        response = http.get(url, timeout=SUGGESTIONS_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             return data.get("suggestions", [])
         else:
-            print("Error fetching suggestions. Status code:", response.status_code)
+            ERRORS.inc(where="email.fetch_suggestions")
+            log.error("fetching suggestions failed",
+                      extra=fields(user_id=user_id, status=response.status_code))
             return []
     except Exception as e:
-        print("Exception fetching suggestions:", e)
+        ERRORS.inc(where="email.fetch_suggestions")
+        log.error(f"fetching suggestions failed: {e}", extra=fields(user_id=user_id))
         return []
 
-def send_personalized_email(recipient_email, suggestions):
+def render_email(suggestions):
     """
-    Render an email template with personalized suggestions and send the email.
+    Render the suggestions email body with the cached, compiled template.
+    """
+    return template_env.get_template('suggestion_email.html').render(suggestions=suggestions)
+
+def render_many(payloads):
+    """
+    Stream rendered bodies for an iterable of suggestion lists, all through
+    the same compiled template.
+    """
+    template = template_env.get_template('suggestion_email.html')
+    for suggestions in payloads:
+        yield template.render(suggestions=suggestions)
+
+def build_email(recipient_email, suggestions, html_content=None):
     """
-    # Load the email template (ensure this file exists in email_service/templates)
-    env = Environment(loader=FileSystemLoader('email_service/templates'))
-    template = env.get_template('suggestion_email.html')
-    html_content = template.render(suggestions=suggestions)
+    Render the suggestions template into a ready-to-send message.
+    """
+    if html_content is None:
+        html_content = render_email(suggestions)
 
-    # Configure the email message
     msg = MIMEText(html_content, 'html')
     msg['Subject'] = "Your Daily Personalized Restaurant Suggestions"
-    msg['From'] = SENDER_EMAIL  # Using sender email from environment
+    msg['From'] = SENDER_EMAIL
     msg['To'] = recipient_email
+    return msg
+
+def send_personalized_email(recipient_email, suggestions):
+    """
+    Render an email template with personalized suggestions and send the email.
+    """
+    msg = build_email(recipient_email, suggestions)
 
-    # Send the email using Gmail's SMTP server
     try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
-            print("Email sent successfully!")
+        get_mailer().send(msg)
+        log.info("email sent")
     except Exception as e:
-        print("Error sending email:", e)
+        ERRORS.inc(where="email.send")
+        log.error(f"email send failed: {e}")
+
+def send_personalized_emails(batch):
+    """
+    Send many emails over one SMTP session.
+
+    `batch` is an iterable of (recipient_email, suggestions); messages are
+    rendered lazily as they are sent. Returns the number delivered.
+    """
+    messages = (build_email(recipient, suggs) for recipient, suggs in batch)
+    results = get_mailer().send_many(messages)
+    errors = [e for e in results if e is not None]
+    if errors:
+        ERRORS.inc(len(errors), where="email.send")
+        log.error(f"{len(errors)} of {len(results)} emails failed: {errors[0]}",
+                  extra=fields(failed=len(errors), sent=len(results) - len(errors)))
+    return len(results) - len(errors)
 
 if __name__ == '__main__':
-    # Use a test user_id, for example "user123"
-    user_id = "user123"
+    if len(sys.argv) < 2:
+        print("⚠️ Please provide a user_id as an argument: python main.py <user_id>")
+        sys.exit(1)
+
+    user_id = sys.argv[1]
     suggestions = fetch_personalized_suggestions(user_id)
-    print("Fetched personalized suggestions:", suggestions)
-    # Replace the recipient email with your actual email address for testing
+
+    if suggestions:
+        print(f"✅ Fetched {len(suggestions)} personalized suggestions for {user_id}")
+    else:
+        print(f"⚠️ No suggestions available for user_id: {user_id}")
+
     send_personalized_email(SENDER_EMAIL, suggestions)
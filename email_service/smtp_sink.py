@@ -0,0 +1,150 @@
+import argparse
+import base64
+import binascii
+import socketserver
+import threading
+
+# Minimal local SMTP server that accepts (and keeps) every message, as a
+# stand-in for Gmail in tests and benchmarks. It speaks just enough SMTP for
+# smtplib: EHLO/HELO, AUTH PLAIN/LOGIN (any credentials, unless `credentials`
+# is set), MAIL, RCPT, DATA, RSET, NOOP, QUIT. No TLS, so run the sender
+# with SMTP_STARTTLS=0. With `drop_after` it hangs up after that many
+# messages on a connection, like a provider enforcing per-session limits.
+#
+#   python -m email_service.smtp_sink --port 1025
+#   SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=0 python ...
+
+
+def _b64(value):
+    try:
+        return base64.b64decode(value, validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def ask(self, line):
+        self.reply(line)
+        return self.rfile.readline().decode("ascii", "replace").strip()
+
+    def auth(self, line):
+        # (user, password) from AUTH PLAIN / AUTH LOGIN, initial response or not
+        parts = line.split()
+        mech  = parts[1].upper() if len(parts) > 1 else ""
+        try:
+            if mech == "PLAIN":
+                _, user, password = _b64(parts[2] if len(parts) > 2 else self.ask("334 ")).split("\0")
+                return user, password
+            if mech == "LOGIN":
+                user = _b64(parts[2] if len(parts) > 2 else self.ask("334 VXNlcm5hbWU6"))
+                return user, _b64(self.ask("334 UGFzc3dvcmQ6"))
+        except ValueError:
+            pass
+        return None
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost smtp-sink ready")
+        sender, recipients, received = None, [], 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                given = self.auth(line)
+                with server.lock:
+                    server.logins += 1
+                if given is None or (server.credentials is not None and given != tuple(server.credentials)):
+                    self.reply("535 5.7.8 Username and Password not accepted")
+                else:
+                    self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = line[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(line[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    body.append(data[1:] if data.startswith(b"..") else data)
+                with server.lock:
+                    server.messages.append((sender, recipients, b"".join(body)))
+                self.reply("250 OK queued")
+                received += 1
+                if server.drop_after and received >= server.drop_after:
+                    return
+            elif verb in ("RSET", "NOOP"):
+                if verb == "RSET":
+                    sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP sink; received messages are kept in `messages` as
+    (mail_from, [rcpt_to], raw_bytes), `connections` counts sessions and
+    `logins` AUTH attempts. `credentials` = (user, password) rejects any
+    other login; `drop_after` closes a session after that many messages.
+    """
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, credentials=None, drop_after=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.credentials = credentials
+        self.drop_after  = drop_after
+        self.lock        = threading.Lock()
+        self.messages    = []
+        self.connections = 0
+        self.logins      = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        # Serve in a background thread (port=0 picks a free port)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    sink = SMTPSink(args.host, args.port)
+    print(f"📭 SMTP sink listening on {args.host}:{args.port}", flush=True)
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
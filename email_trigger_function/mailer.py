@@ -0,0 +1,175 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+
+# SMTP endpoint; point these at a local sink (python -m email_service.smtp_sink)
+# with SMTP_STARTTLS=0 to exercise the send path without Gmail.
+SMTP_HOST      = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT      = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS  = os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_TIMEOUT   = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+
+def _is_dropped(error):
+    # Connection-level failure (as opposed to the server rejecting a message)
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class Mailer:
+    """
+    Pool of authenticated SMTP sessions.
+
+    Connections are opened (connect + STARTTLS + login) on demand, up to
+    `pool_size` at once, and reused for later messages. A session that the
+    server dropped is replaced transparently, and each one is recycled after
+    `max_messages` sends to stay under provider per-connection limits.
+    Rejected credentials fail the rest of a batch at once instead of logging
+    in again for every message.
+    """
+
+    def __init__(self, username, password, host=SMTP_HOST, port=SMTP_PORT, starttls=SMTP_STARTTLS,
+                 pool_size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT, max_messages=90, max_idle=120.0):
+        self.username     = username
+        self.password     = password
+        self.host         = host
+        self.port         = port
+        self.starttls     = starttls
+        self.timeout      = timeout
+        self.max_messages = max_messages
+        self.max_idle     = max_idle
+
+        self._idle  = queue.LifoQueue()  # (server, sent_count, last_used)
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+        self.connections_opened = 0
+        self.messages_sent      = 0
+        self.reconnects         = 0
+        self.auth_failures      = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv("SENDER_EMAIL"), os.getenv("GMAIL_APP_PASSWORD"))
+
+    # ——— connection handling ———
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except BaseException:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, sent, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return None, 0  # connected lazily by the sender
+                if time.monotonic() - last_used < self.max_idle:
+                    return server, sent
+                # Idle too long: the server has likely dropped it already
+                self._close(server)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, server, sent):
+        try:
+            if server is not None and sent < self.max_messages:
+                self._idle.put((server, sent, time.monotonic()))
+            elif server is not None:
+                self._close(server)
+        finally:
+            self._slots.release()
+
+    # ——— sending ———
+    def send_many(self, messages):
+        """
+        Send every message over one pooled session. Returns a list with None
+        for each delivered message or the exception that stopped it.
+        """
+        results  = []
+        messages = iter(messages)
+        server, sent = self._acquire()
+        try:
+            for msg in messages:
+                for attempt in (0, 1):
+                    try:
+                        if server is None or sent >= self.max_messages:
+                            if server is not None:
+                                self._close(server)
+                                server = None
+                            server, sent = self._connect(), 0
+                        server.send_message(msg)
+                        sent += 1
+                        self.messages_sent += 1
+                        results.append(None)
+                        break
+                    except smtplib.SMTPAuthenticationError as e:
+                        # Retrying the login per message would only repeat the rejection
+                        self.auth_failures += 1
+                        results.append(e)
+                        results.extend(e for _ in messages)
+                        return results
+                    except Exception as e:
+                        dropped = _is_dropped(e)
+                        if dropped and server is not None:
+                            self._close(server)
+                            server = None
+                        if dropped and not attempt:
+                            # Session went away under us: reconnect once and retry
+                            self.reconnects += 1
+                            continue
+                        results.append(e)
+                        break
+        finally:
+            self._release(server, sent)
+        return results
+
+    def send(self, msg):
+        error = self.send_many([msg])[0]
+        if error is not None:
+            raise error
+
+    def close(self):
+        while True:
+            try:
+                server, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+_mailer = None
+_mailer_lock = threading.Lock()
+
+def get_mailer():
+    # Process-wide mailer, built from SENDER_EMAIL / GMAIL_APP_PASSWORD on first use
+    global _mailer
+    if _mailer is None:
+        with _mailer_lock:
+            if _mailer is None:
+                _mailer = Mailer.from_env()
+    return _mailer
@@ -1,9 +1,11 @@
 import os
 import requests
-import smtplib
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from email.mime.text import MIMEText
 from jinja2 import Environment, FileSystemLoader
 from dotenv import load_dotenv
+from mailer import Mailer
 
 # Load environment variables (if needed for local testing)
 load_dotenv()
@@ -13,6 +15,22 @@ SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")  # URL of your deployed Cloud Run service
 
+# Kept at module level so warm invocations reuse the authenticated SMTP session
+mailer = Mailer(SENDER_EMAIL, GMAIL_APP_PASSWORD)
+
+# Template environment shared by warm invocations (compiled templates are cached)
+template_env = Environment(loader=FileSystemLoader('templates'), auto_reload=False)
+
+# Keep-alive session for the suggestions call: explicit (connect, read)
+# timeouts, and GETs retried with backoff on connection errors and 429/5xx.
+# The defaults keep every attempt inside the function's 60 s timeout.
+SUGGESTIONS_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")), float(os.getenv("SUGGESTIONS_TIMEOUT", "15")))
+http = requests.Session()
+http.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=int(os.getenv("HTTP_RETRIES", "2")), backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.3")),
+    status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET"}), raise_on_status=False)))
+http.mount("http://", http.get_adapter("https://"))
+
 def send_email(request):
     """
     Cloud Function entry point.
@@ -24,7 +42,7 @@ def send_email(request):
     suggestions_url = f"{CLOUD_RUN_URL}/suggestions/{user_id}"
     
     try:
-        response = requests.get(suggestions_url)
+        response = http.get(suggestions_url, timeout=SUGGESTIONS_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             suggestions = data.get("suggestions", [])
@@ -34,9 +52,8 @@ def send_email(request):
         suggestions = []
     
     # Load the email template from the templates folder
-    env = Environment(loader=FileSystemLoader('templates'))
     try:
-        template = env.get_template('suggestion_email.html')
+        template = template_env.get_template('suggestion_email.html')
     except Exception as e:
         return f"Template error: {e}", 500
     
@@ -49,10 +66,7 @@ def send_email(request):
     msg['To'] = SENDER_EMAIL  # For testing, sending to yourself
 
     try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
+        mailer.send(msg)
         return "Email sent successfully", 200
     except Exception as e:
         return f"Error sending email: {e}", 500
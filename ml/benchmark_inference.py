@@ -0,0 +1,37 @@
+import os
+import sys
+import timeit
+from ml.inference import load_model, load_compiled_model, get_prediction, place_features, predict_batch
+
+# Micro-benchmark: one predict() per place vs. one call for the whole page,
+# plus the NumPy-only compiled forest when its .npz sits next to the pickle.
+# Usage: python -m ml.benchmark_inference [model_path] [n_places]
+
+def main(model_path='suggestion_model.pkl', n_places=20, repeat=20):
+    model = load_model(model_path)
+    compiled_path = os.path.splitext(model_path)[0] + '.npz'
+    compiled = load_compiled_model(compiled_path) if os.path.exists(compiled_path) else None
+    places = [{"rating": 3.5 + (i % 15) / 10.0} for i in range(n_places)]
+    X = place_features(places)
+
+    per_row = lambda: [get_prediction(row, model) for row in X]
+    batched = lambda: predict_batch(X, model)
+    batched_proba = lambda: predict_batch(X, model, proba=True)
+
+    cases = [("per-row", per_row), ("batched", batched), ("batched proba", batched_proba)]
+    if compiled is not None:
+        cases.append(("compiled", lambda: predict_batch(X, compiled)))
+
+    results = {}
+    for name, fn in cases:
+        fn()  # warm up
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        results[name] = best
+        print(f"{name:>14}: {best * 1000:8.2f} ms / {n_places} places")
+
+    print(f"speed-up (per-row / batched): {results['per-row'] / results['batched']:.1f}x")
+    return results
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(args[0] if args else 'suggestion_model.pkl', int(args[1]) if len(args) > 1 else 20)
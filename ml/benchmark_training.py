@@ -0,0 +1,77 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from ml.dataset import iter_matrices, write_synthetic
+
+# Timing benchmark for ml.train_pipeline on synthetic impressions: generates
+# N rows of JSON lines, then runs each case in a fresh process so its peak
+# RSS is its own.
+# Usage: python -m ml.benchmark_training [--rows 1000000] [--files 4] [--chunk-rows 100000]
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _featurize(paths, chunk_rows):
+    rows = sum(len(X) for X, _ in iter_matrices(paths, chunk_rows))
+    return {"rows": rows}
+
+def _train(paths, chunk_rows, **kwargs):
+    from ml.train_pipeline import train_streaming
+    _, info = train_streaming(paths, chunk_rows=chunk_rows, **kwargs)
+    return {"rows": info["rows"], "fit_s": info["fit_s"], "auc": info["holdout"].get("roc_auc")}
+
+def _case(fn, args, kwargs, queue):
+    start  = time.perf_counter()
+    result = fn(*args, **kwargs)
+    result.update(total_s=round(time.perf_counter() - start, 2), peak_rss_mb=round(_peak_rss_mb()))
+    queue.put(result)
+
+def run_case(fn, *args, **kwargs):
+    ctx   = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc  = ctx.Process(target=_case, args=(fn, args, kwargs, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming training on synthetic impressions")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--dir", help="reuse/keep the synthetic logs here instead of a temp dir")
+    args = parser.parse_args()
+
+    tmp  = None if args.dir else tempfile.TemporaryDirectory()
+    root = args.dir or tmp.name
+    os.makedirs(root, exist_ok=True)
+    paths = [os.path.join(root, f"impressions-{i:03d}.jsonl") for i in range(args.files)]
+    start = time.perf_counter()
+    for i, path in enumerate(paths):
+        if not os.path.exists(path):
+            write_synthetic(path, args.rows // args.files, seed=i)
+    print(f"{args.rows} synthetic rows in {args.files} files ({time.perf_counter() - start:.1f}s)", flush=True)
+
+    trees, chunks = args.n_estimators, max(1, args.rows // args.chunk_rows)
+    cases = [
+        ("featurize only",           _featurize, {}),
+        ("full, n_jobs=1",           _train, {"n_jobs": 1, "n_estimators": trees}),
+        ("full, n_jobs=-1",          _train, {"n_jobs": -1, "n_estimators": trees}),
+        ("incremental, n_jobs=-1",   _train, {"n_jobs": -1, "incremental": True,
+                                             "trees_per_chunk": max(1, trees // chunks)}),
+    ]
+    print(f"{'case':>24} {'rows/s':>10} {'fit s':>8} {'total s':>8} {'peak MB':>8} {'AUC':>7}")
+    for name, fn, kwargs in cases:
+        r = run_case(fn, paths, args.chunk_rows, **kwargs)
+        print(f"{name:>24} {r['rows'] / r['total_s']:>10.0f} {r.get('fit_s', 0):>8} {r['total_s']:>8} "
+              f"{r['peak_rss_mb']:>8} {r.get('auc') or '-':>7}", flush=True)
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import glob
+import gzip
+import itertools
+import json
+import os
+import random
+import numpy as np
+from ml.features import PRICE_LEVELS, training_matrix
+
+# Impression logs for offline training: one record per suggestion sent,
+# with its outcome, as JSON lines (optionally .gz) or Parquet with the same
+# (nested) columns:
+#
+#   {"user_id": "u1", "ts": 1760000000, "label": 1,
+#    "origin": [35.68, 139.76], "last_sent": 1759000000,
+#    "place": {"id": "...", "rating": 4.5, "userRatingCount": 812,
+#              "priceLevel": "PRICE_LEVEL_MODERATE",
+#              "location": {"latitude": 35.68, "longitude": 139.77}}}
+#
+# ts is when it was sent (recency is measured from there), last_sent the
+# previous send of the same place to that user (null = never), label 1 if
+# the user acted on it. Files are read in chunks of rows, so memory is
+# bounded by the chunk size, not the size of the logs.
+CHUNK_ROWS = 100_000
+LOG_PATTERNS = ("*.jsonl", "*.jsonl.gz", "*.parquet")
+
+
+def expand(paths):
+    """Files for a list of files, directories (searched for LOG_PATTERNS) and globs, sorted."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in LOG_PATTERNS:
+                files.extend(glob.glob(os.path.join(path, "**", pattern), recursive=True))
+        else:
+            files.extend(glob.glob(path) or [path])
+    return sorted(set(files))
+
+def _jsonl_records(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _parquet_records(path, batch_rows=10_000):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"reading {path} needs pyarrow (pip install pyarrow)") from e
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+        yield from batch.to_pylist()
+
+def iter_records(paths):
+    for path in expand(paths):
+        yield from (_parquet_records if path.endswith(".parquet") else _jsonl_records)(path)
+
+def iter_chunks(paths, chunk_rows=CHUNK_ROWS):
+    """
+    Lists of at most `chunk_rows` impression records across all files, in
+    file order; only the current chunk is held in memory.
+    """
+    records = iter_records(paths)
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_matrices(paths, chunk_rows=CHUNK_ROWS):
+    # (X, y) per chunk, features as float32 (what the forest trains on anyway)
+    for records in iter_chunks(paths, chunk_rows):
+        X, y = training_matrix(records)
+        yield X.astype(np.float32), y
+
+
+# ——————————————————————————————————————————————————————————————————
+# Synthetic impressions (benchmarks, smoke tests)
+# ——————————————————————————————————————————————————————————————————
+def synthetic_record(rng, ts):
+    lat, lng = 35.6 + rng.random() * 0.4, 139.6 + rng.random() * 0.3
+    rating   = round(rng.uniform(2.5, 5.0), 1)
+    count    = int(rng.lognormvariate(5, 1.5))
+    price    = rng.randrange(len(PRICE_LEVELS))
+    dlat, dlng = rng.gauss(0, 0.02), rng.gauss(0, 0.02)
+    sent_ago = rng.choice((None, rng.uniform(1, 400) * 86400))
+    # Hidden preference: well rated, popular, cheap, close, not sent lately
+    distance = ((dlat * 111) ** 2 + (dlng * 91) ** 2) ** 0.5
+    logit = (2.0 * (rating - 4.0) + 0.3 * (np.log1p(count) - 5) - 0.4 * (price - 2)
+             - 0.8 * distance + (-1.5 if sent_ago is not None and sent_ago < 30 * 86400 else 0.0))
+    label = int(rng.random() < 1 / (1 + np.exp(-logit)))
+    return {
+        "user_id":   f"u{rng.randrange(100_000)}",
+        "ts":        ts,
+        "label":     label,
+        "origin":    [lat, lng],
+        "last_sent": ts - sent_ago if sent_ago is not None else None,
+        "place": {
+            "id":              f"p{rng.randrange(1_000_000)}",
+            "rating":          rating,
+            "userRatingCount": count,
+            "priceLevel":      list(PRICE_LEVELS)[price],
+            "location":        {"latitude": lat + dlat, "longitude": lng + dlng},
+        },
+    }
+
+def write_synthetic(path, n_rows, seed=0, start_ts=1_750_000_000):
+    """Write `n_rows` synthetic impressions as JSON lines (gzip if path ends in .gz)."""
+    rng    = random.Random(seed)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        for i in range(n_rows):
+            f.write(json.dumps(synthetic_record(rng, start_ts + i * 5)) + "\n")
+    return path
@@ -0,0 +1,125 @@
+import time
+import numpy as np
+
+# Feature pipeline shared by training (ml.train_model) and serving
+# (ml.inference.score_places): a list of Places API (New) results in, one
+# float64 matrix out. Fields are pulled out of the JSON once, column by
+# column; every transform after that is a NumPy array operation.
+#
+# Columns, in model order:
+#   rating            Places rating, 0 when missing
+#   log_rating_count  log1p(userRatingCount)
+#   price_level       0 (free) .. 4 (very expensive), -1 when unknown
+#   distance_km       great-circle distance from the user, -1 when unknown
+#   days_since_sent   days since the place was last sent to this user,
+#                     capped at RECENCY_CAP_DAYS (also the value for never)
+FEATURES = ("rating", "log_rating_count", "price_level", "distance_km", "days_since_sent")
+
+# Layout of the original model: [rating, 1.0]
+LEGACY_FEATURES = ("rating", "bias")
+
+# The Places fields feature_matrix reads (enough to re-score a place later)
+FEATURE_FIELDS = ("id", "rating", "userRatingCount", "priceLevel", "location")
+
+PRICE_LEVELS = {
+    "PRICE_LEVEL_FREE":           0,
+    "PRICE_LEVEL_INEXPENSIVE":    1,
+    "PRICE_LEVEL_MODERATE":       2,
+    "PRICE_LEVEL_EXPENSIVE":      3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
+RECENCY_CAP_DAYS = 365.0
+EARTH_RADIUS_KM  = 6371.0088
+
+
+def _column(places, get, default=np.nan):
+    return np.fromiter((get(p, default) for p in places), dtype=np.float64, count=len(places))
+
+def _number(field):
+    def get(p, default):
+        value = p.get(field)
+        return float(value) if value is not None else default
+    return get
+
+def _price(p, default):
+    level = p.get("priceLevel")
+    if isinstance(level, (int, float)):
+        return float(level)
+    return float(PRICE_LEVELS.get(level, default))
+
+def _lat(p, default):
+    return (p.get("location") or {}).get("latitude", default)
+
+def _lng(p, default):
+    return (p.get("location") or {}).get("longitude", default)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    # Element-wise great-circle distance; inputs in degrees, broadcastable
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def days_since(last_sent, now=None):
+    """
+    Days since each epoch timestamp in `last_sent` (NaN or <= 0 = never or
+    unknown), capped at RECENCY_CAP_DAYS.
+    """
+    now  = time.time() if now is None else now
+    days = (now - last_sent) / 86400.0
+    days = np.where(np.isnan(last_sent) | (last_sent <= 0), RECENCY_CAP_DAYS, days)
+    return np.clip(days, 0.0, RECENCY_CAP_DAYS)
+
+
+def feature_matrix(places, origin=None, last_sent=None, now=None, n_features=len(FEATURES)):
+    """
+    Feature matrix (len(places) x n_features) for a list of Places results.
+
+    origin     the user's (lat, lng), or an (n, 2) array for one origin per
+               row (training data); None leaves distance unknown
+    last_sent  {place_id: epoch seconds} for this user, or an array of epoch
+               seconds per row (NaN = never sent); None = never sent
+    n_features 2 for the legacy [rating, 1.0] layout, else len(FEATURES)
+    """
+    n = len(places)
+    rating = np.nan_to_num(_column(places, _number("rating")), nan=0.0)
+    if n_features == len(LEGACY_FEATURES):
+        return np.column_stack([rating, np.ones(n)])
+    if n_features != len(FEATURES):
+        raise ValueError(f"model expects {n_features} features; this pipeline builds 2 or {len(FEATURES)}")
+
+    count = np.nan_to_num(_column(places, _number("userRatingCount")), nan=0.0)
+    price = np.nan_to_num(_column(places, _price), nan=-1.0)
+
+    distance = np.full(n, -1.0)
+    if origin is not None and n:
+        lat, lng = _column(places, _lat), _column(places, _lng)
+        origin   = np.asarray(origin, dtype=np.float64)
+        d = haversine_km(origin[..., 0], origin[..., 1], lat, lng)
+        distance = np.where(np.isnan(d), -1.0, d)
+
+    if last_sent is None:
+        sent = np.full(n, np.nan)
+    elif isinstance(last_sent, dict):
+        sent = np.fromiter((last_sent.get(p.get("id"), np.nan) for p in places), dtype=np.float64, count=n)
+    else:
+        sent = np.asarray(last_sent, dtype=np.float64)
+
+    return np.column_stack([rating, np.log1p(np.maximum(count, 0.0)), price, distance, days_since(sent, now)])
+
+def training_matrix(examples, now=None):
+    """
+    (X, y) from labelled examples: dicts with "place" (a Places result),
+    "label", and optionally "origin" [lat, lng], "last_sent" (epoch s) and
+    "ts" (when it was shown: the reference time for recency, else `now`).
+    Built with the same feature_matrix used at serving time.
+    """
+    n         = len(examples)
+    places    = [e["place"] for e in examples]
+    origin    = np.array([e.get("origin") or (np.nan, np.nan) for e in examples], dtype=np.float64)
+    last_sent = np.fromiter((e.get("last_sent") or np.nan for e in examples), dtype=np.float64, count=n)
+    shown_at  = np.fromiter((e.get("ts") or np.nan for e in examples), dtype=np.float64, count=n)
+    shown_at  = np.where(np.isnan(shown_at), time.time() if now is None else now, shown_at)
+    y         = np.fromiter((e["label"] for e in examples), dtype=np.int64, count=n)
+    return feature_matrix(places, origin=origin.reshape(-1, 2), last_sent=last_sent, now=shown_at), y
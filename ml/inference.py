@@ -1,15 +1,130 @@
+import mmap
+import os
 import pickle
+import struct
+import zipfile
+import numpy as np
+from ml.features import FEATURES, feature_matrix
 
 def load_model(model_path='suggestion_model.pkl'):
     with open(model_path, 'rb') as f:
         model = pickle.load(f)
     return model
 
+class CompiledForest:
+    """
+    NumPy-only evaluator for a forest exported by ml.train_model.export_compiled.
+
+    Mirrors RandomForestClassifier.predict / predict_proba without importing
+    scikit-learn: every row walks all trees at once, one level per step.
+    """
+
+    def __init__(self, arrays):
+        self.left      = arrays["left"]
+        self.right     = arrays["right"]
+        self.feature   = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value     = arrays["value"]
+        self.roots     = arrays["roots"]
+        self.classes_  = arrays["classes"]
+        self.n_features_in_ = int(arrays["n_features"])
+        self.max_depth = int(arrays["max_depth"])
+
+    def apply(self, X):
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.tile(self.roots, (len(X), 1))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def map_npz(path):
+    """
+    The arrays of an uncompressed .npz (np.savez, as export_compiled writes)
+    as read-only views of one shared file mapping: nothing is copied, and
+    every process mapping the same file shares its pages through the OS page
+    cache. Raises ValueError for compressed members (np.savez_compressed).
+    """
+    arrays = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f) as zf:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: {info.filename} is compressed, cannot be memory-mapped")
+            # Member data follows its local header (30 bytes + name + extra)
+            name_len, extra_len = struct.unpack("<HH", buf[info.header_offset + 26:info.header_offset + 30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            shape, fortran, dtype = (np.lib.format.read_array_header_1_0(f) if version == (1, 0)
+                                     else np.lib.format.read_array_header_2_0(f))
+            if dtype.hasobject:
+                raise ValueError(f"{path}: {info.filename} holds Python objects, cannot be memory-mapped")
+            arrays[info.filename[:-4]] = np.ndarray(shape, dtype, buffer=buf, offset=f.tell(),
+                                                    order="F" if fortran else "C")
+    return arrays
+
+def load_compiled_model(model_path='suggestion_model.npz', mmap=False):
+    # mmap: map the arrays read-only instead of reading private copies
+    if mmap:
+        return CompiledForest(map_npz(model_path))
+    with np.load(model_path) as data:
+        return CompiledForest({k: data[k] for k in data.files})
+
+def load_scorer(compiled_path='suggestion_model.npz', pickle_path='suggestion_model.pkl', mmap=False):
+    # Prefer the compiled artifact (no scikit-learn import); fall back to the pickle
+    if os.path.exists(compiled_path):
+        return load_compiled_model(compiled_path, mmap=mmap)
+    return load_model(pickle_path)
+
 def get_prediction(features, model):
     # Features: list or numpy array
     prediction = model.predict([features])
     return prediction[0]
 
+def place_features(places, origin=None, last_sent=None, now=None, n_features=2):
+    # One row per Places API result, built by ml.features (default: the
+    # original [rating, 1.0] layout)
+    return feature_matrix(places, origin=origin, last_sent=last_sent, now=now, n_features=n_features)
+
+def model_features(model):
+    # Number of input columns the model was trained on (2 = legacy layout)
+    return int(getattr(model, "n_features_in_", len(FEATURES)))
+
+def predict_batch(X, model, proba=False):
+    """
+    Score a whole feature matrix with a single model call.
+
+    Returns hard labels, or the positive-class probability when `proba` is set.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) == 0:
+        return np.zeros(0)
+    if not proba:
+        return model.predict(X)
+    probs = model.predict_proba(X)
+    classes = list(model.classes_)
+    if 1 not in classes:
+        return np.zeros(len(X))
+    return probs[:, classes.index(1)]
+
+def score_places(places, model, proba=False, origin=None, last_sent=None, now=None):
+    """
+    Places API dicts in, one score per place out (a NumPy array). The
+    feature layout follows the model: legacy 2-column models get
+    [rating, 1.0], newer ones the full ml.features set, for which `origin`
+    (the user's lat, lng) and `last_sent` ({place_id: epoch s}) are used.
+    """
+    X = place_features(places, origin=origin, last_sent=last_sent, now=now, n_features=model_features(model))
+    return predict_batch(X, model, proba=proba)
+
 if __name__ == '__main__':
     model = load_model()
     features = [4.6, 1.0]  # Example features
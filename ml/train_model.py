@@ -1,23 +1,120 @@
 import pickle
+import sys
+import time
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
+from ml.features import training_matrix
 
-def train_model(training_data):
-    # Dummy training function – training_data should be a list of dicts with 'features' and 'label'
-    X = [data['features'] for data in training_data]
-    y = [data['label'] for data in training_data]
+def train_model(training_data, now=None):
+    """
+    Fit the forest on labelled examples. Each example is either a dict with
+    'place' (a Places API result), 'label' and optionally 'origin' /
+    'last_sent' — featurized by ml.features, exactly as at serving time — or
+    a legacy dict with a precomputed 'features' row and 'label'.
+    """
+    if training_data and 'place' in training_data[0]:
+        X, y = training_matrix(training_data, now=now)
+    else:
+        X = [data['features'] for data in training_data]
+        y = [data['label'] for data in training_data]
 
     model = RandomForestClassifier(n_estimators=100)
     model.fit(X, y)
     return model
 
+def export_compiled(model, path='suggestion_model.npz'):
+    """
+    Flatten every tree of a fitted forest into shared node arrays and save them
+    as an .npz that ml.inference.load_compiled_model evaluates with NumPy only.
+
+    Child indices are made global across trees, and leaves point to themselves
+    so a fixed number of descent steps (max_depth) lands every row on a leaf.
+    """
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for est in model.estimators_:
+        t = est.tree_
+        idx = np.arange(t.node_count) + offset
+        is_leaf = t.children_left == -1
+
+        left.append(np.where(is_leaf, idx, t.children_left + offset))
+        right.append(np.where(is_leaf, idx, t.children_right + offset))
+        feature.append(np.where(is_leaf, 0, t.feature))
+        threshold.append(t.threshold)
+        v = t.value[:, 0, :]
+        value.append(v / v.sum(axis=1, keepdims=True))
+
+        roots.append(offset)
+        offset += t.node_count
+        max_depth = max(max_depth, t.max_depth)
+
+    np.savez(
+        path,
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        value=np.concatenate(value).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=np.asarray(model.classes_),
+        n_features=np.int32(model.n_features_in_),
+        max_depth=np.int32(max_depth),
+    )
+    return path
+
+def check_parity(model, path='suggestion_model.npz', n_samples=10000, seed=0):
+    """
+    Compare the compiled artifact against the sklearn model on random inputs
+    spanning every split threshold of each feature; raises AssertionError on
+    any mismatch.
+    """
+    from ml.inference import load_compiled_model
+
+    compiled = load_compiled_model(path)
+    rng = np.random.default_rng(seed)
+    low, high = np.zeros(model.n_features_in_), np.full(model.n_features_in_, 5.0)
+    for est in model.estimators_:
+        t = est.tree_
+        split = t.children_left != -1
+        np.minimum.at(low, t.feature[split], t.threshold[split] - 1.0)
+        np.maximum.at(high, t.feature[split], t.threshold[split] + 1.0)
+    X = rng.uniform(low, high, size=(n_samples, model.n_features_in_))
+
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    assert np.allclose(expected, actual, atol=1e-9), "predict_proba differs from sklearn"
+    assert (model.predict(X) == compiled.predict(X)).all(), "predict differs from sklearn"
+    return n_samples
+
 if __name__ == '__main__':
-    # Example training data
+    # python -m ml.train_model --export suggestion_model.pkl [suggestion_model.npz]
+    if len(sys.argv) > 2 and sys.argv[1] == '--export':
+        with open(sys.argv[2], 'rb') as f:
+            model = pickle.load(f)
+        out = sys.argv[3] if len(sys.argv) > 3 else 'suggestion_model.npz'
+        export_compiled(model, out)
+        print(f"Compiled model saved as {out}, parity checked on {check_parity(model, out)} samples")
+        sys.exit(0)
+
+    # Example training data: Places results as returned by Text Search, the
+    # user's location and when the place was last sent to them
+    now = time.time()
+    origin = [35.6812, 139.7671]
     training_data = [
-        {"features": [4.5, 1.0], "label": 1},
-        {"features": [4.3, 1.2], "label": 0},
-        {"features": [4.7, 0.8], "label": 1},
+        {"place": {"id": "a", "rating": 4.5, "userRatingCount": 812, "priceLevel": "PRICE_LEVEL_MODERATE",
+                   "location": {"latitude": 35.6840, "longitude": 139.7700}},
+         "origin": origin, "label": 1},
+        {"place": {"id": "b", "rating": 4.3, "userRatingCount": 95, "priceLevel": "PRICE_LEVEL_EXPENSIVE",
+                   "location": {"latitude": 35.7100, "longitude": 139.8100}},
+         "origin": origin, "last_sent": now - 2 * 86400, "label": 0},
+        {"place": {"id": "c", "rating": 4.7, "userRatingCount": 2310, "priceLevel": "PRICE_LEVEL_INEXPENSIVE",
+                   "location": {"latitude": 35.6790, "longitude": 139.7650}},
+         "origin": origin, "last_sent": now - 90 * 86400, "label": 1},
     ]
-    model = train_model(training_data)
+    model = train_model(training_data, now=now)
     with open('suggestion_model.pkl', 'wb') as f:
         pickle.dump(model, f)
     print("Model trained and saved as suggestion_model.pkl")
+
+    export_compiled(model, 'suggestion_model.npz')
+    print(f"Compiled model saved as suggestion_model.npz, parity checked on {check_parity(model)} samples")
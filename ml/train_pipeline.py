@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import pickle
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+from ml.dataset import CHUNK_ROWS, expand, iter_matrices
+from ml.features import FEATURES
+from ml.train_model import check_parity, export_compiled
+
+# Offline training over impression logs (see ml.dataset for the format).
+#
+#   python -m ml.train_pipeline logs/ --out models/                 one forest, all cores
+#   python -m ml.train_pipeline logs/ --out models/ --incremental   trees per chunk
+#
+# Full mode streams the logs chunk by chunk into a compact float32 matrix
+# (20 bytes per row) and fits one forest with n_jobs workers. Past
+# `max_rows` rows it keeps a uniform reservoir sample of that size instead
+# (--max-rows 0 keeps every row), so memory is capped at max_rows * 20
+# bytes. Incremental mode never holds more than one chunk: each chunk adds
+# `trees_per_chunk` trees to the same forest (warm_start), so memory stays
+# flat however many months of logs there are. Every `holdout_every`-th row
+# is kept aside for the evaluation written next to the model, sampled the
+# same way down to max_rows / holdout_every rows.
+#
+# Each run writes models/<version>/ with suggestion_model.pkl, the compiled
+# suggestion_model.npz served by the API, and metadata.json; models/LATEST
+# names the newest version.
+FOREST_PARAMS = {"max_depth": 12, "min_samples_leaf": 20}
+MAX_ROWS      = 5_000_000
+
+
+def _split(X, y, offset, holdout_every):
+    # Rows whose global index is a multiple of holdout_every go to the holdout set
+    if not holdout_every:
+        return X, y, X[:0], y[:0]
+    held = (np.arange(offset, offset + len(X)) % holdout_every) == 0
+    return X[~held], y[~held], X[held], y[held]
+
+class _Reservoir:
+    """
+    Uniform sample of at most `size` rows of a stream of (X, y) chunks
+    (Algorithm R, one vectorised step per chunk). size 0 keeps every row.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size  = size
+        self.seen  = 0
+        self.rng   = np.random.default_rng(seed)
+        self.parts = []
+        self.X = self.y = None
+
+    def add(self, X, y):
+        if self.X is None:
+            take = len(X) if not self.size else min(len(X), self.size - self.seen)
+            self.parts.append((X[:take], y[:take]))
+            self.seen += take
+            X, y = X[take:], y[take:]
+            if not len(X):
+                return
+            self.X, self.y = self.arrays()
+            self.parts = None
+        # Row i of the stream replaces a random slot with probability size / (i + 1)
+        slot = self.rng.integers(0, np.arange(self.seen, self.seen + len(X)) + 1)
+        keep = slot < self.size
+        self.X[slot[keep]] = X[keep]
+        self.y[slot[keep]] = y[keep]
+        self.seen += len(X)
+
+    def arrays(self):
+        if self.X is not None:
+            return self.X, self.y
+        return np.concatenate([X for X, _ in self.parts]), np.concatenate([y for _, y in self.parts])
+
+def train_streaming(paths, chunk_rows=CHUNK_ROWS, n_jobs=-1, n_estimators=100, incremental=False,
+                    trees_per_chunk=10, holdout_every=20, max_rows=MAX_ROWS, random_state=0,
+                    **forest_params):
+    """
+    Fit a RandomForestClassifier over impression logs read in chunks.
+    Full mode fits on at most `max_rows` rows, a uniform sample once the logs
+    are larger (0 = no cap). Returns (model, info) where info has row counts,
+    timings and holdout metrics.
+    """
+    params = dict(FOREST_PARAMS, **forest_params)
+    model  = RandomForestClassifier(n_estimators=trees_per_chunk if incremental else n_estimators,
+                                    n_jobs=n_jobs, warm_start=incremental, random_state=random_state,
+                                    **params)
+    start  = time.perf_counter()
+    rows, chunks, skipped, fitted, fit_s = 0, 0, 0, 0, 0.0
+    train = _Reservoir(max_rows, seed=random_state)
+    held  = _Reservoir(max_rows // holdout_every if max_rows and holdout_every else max_rows,
+                       seed=random_state + 1)
+
+    for X, y in iter_matrices(paths, chunk_rows):
+        X, y, hx, hy = _split(X, y, rows, holdout_every)
+        rows   += len(X) + len(hx)
+        chunks += 1
+        held.add(hx, hy)
+        if not incremental:
+            train.add(X, y)
+            continue
+        if len(np.unique(y)) < 2:
+            # Trees fitted on one class would not line up with the rest of the forest
+            skipped += 1
+            continue
+        if hasattr(model, "estimators_"):
+            model.n_estimators += trees_per_chunk
+        t = time.perf_counter()
+        model.fit(X, y)
+        fit_s  += time.perf_counter() - t
+        fitted += len(X)
+
+    if not chunks:
+        raise ValueError(f"no impression records found in {paths}")
+    read_s = time.perf_counter() - start - fit_s
+    if not incremental:
+        X, y = train.arrays()
+        del train
+        t = time.perf_counter()
+        model.fit(X, y)
+        fit_s = time.perf_counter() - t
+    elif not hasattr(model, "estimators_"):
+        raise ValueError("no chunk had both labels; nothing to train on")
+
+    info = {
+        "rows":        rows,
+        "chunks":      chunks,
+        "chunk_rows":  chunk_rows,
+        "skipped":     skipped,
+        "mode":        "incremental" if incremental else "full",
+        "fit_rows":    fitted if incremental else len(X),
+        "trees":       len(model.estimators_),
+        "read_s":      round(read_s, 3),
+        "fit_s":       round(fit_s, 3),
+        "holdout":     evaluate(model, *held.arrays()),
+    }
+    return model, info
+
+def evaluate(model, X, y):
+    if not len(X):
+        return {}
+    proba  = model.predict_proba(X)
+    labels = list(model.classes_)
+    metrics = {
+        "rows":     int(len(X)),
+        "accuracy": round(float(accuracy_score(y, model.classes_[np.argmax(proba, axis=1)])), 4),
+        "log_loss": round(float(log_loss(y, proba, labels=labels)), 4),
+    }
+    if 1 in labels and len(np.unique(y)) == 2:
+        metrics["roc_auc"] = round(float(roc_auc_score(y, proba[:, labels.index(1)])), 4)
+    return metrics
+
+
+def new_version(out_dir):
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    n = 1
+    while os.path.exists(os.path.join(out_dir, version)):
+        n += 1
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-{n}"
+    return version
+
+def save_artifacts(model, out_dir, info, version=None):
+    """
+    Write models/<version>/{suggestion_model.pkl, suggestion_model.npz,
+    metadata.json} (the .npz parity-checked against the pickle) and point
+    out_dir/LATEST at it. Returns the version directory.
+    """
+    version = version or new_version(out_dir)
+    path    = os.path.join(out_dir, version)
+    os.makedirs(path)
+    with open(os.path.join(path, "suggestion_model.pkl"), "wb") as f:
+        pickle.dump(model, f)
+    compiled = export_compiled(model, os.path.join(path, "suggestion_model.npz"))
+    check_parity(model, compiled, n_samples=2000)
+
+    meta = dict(info, version=version, features=list(FEATURES), n_features=int(model.n_features_in_),
+                params={k: v for k, v in model.get_params().items() if k != "n_jobs"},
+                created=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    with open(os.path.join(path, "metadata.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    tmp = os.path.join(out_dir, "LATEST.tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(out_dir, "LATEST"))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the suggestion model from impression logs")
+    parser.add_argument("logs", nargs="+", help="JSONL(.gz)/Parquet files, directories or globs")
+    parser.add_argument("--out", default="models", help="directory for versioned artifacts")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="fit workers (-1 = all cores)")
+    parser.add_argument("--n-estimators", type=int, default=100, help="trees (full mode)")
+    parser.add_argument("--incremental", action="store_true", help="warm-start trees chunk by chunk")
+    parser.add_argument("--trees-per-chunk", type=int, default=10)
+    parser.add_argument("--max-depth", type=int, default=FOREST_PARAMS["max_depth"])
+    parser.add_argument("--min-samples-leaf", type=int, default=FOREST_PARAMS["min_samples_leaf"])
+    parser.add_argument("--holdout-every", type=int, default=20, help="0 = no holdout")
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS,
+                        help="full mode: sample at most this many rows (0 = all)")
+    args = parser.parse_args()
+
+    print(f"Training on {len(expand(args.logs))} log files ...", flush=True)
+    model, info = train_streaming(args.logs, chunk_rows=args.chunk_rows, n_jobs=args.n_jobs,
+                                  n_estimators=args.n_estimators, incremental=args.incremental,
+                                  trees_per_chunk=args.trees_per_chunk, holdout_every=args.holdout_every,
+                                  max_rows=args.max_rows,
+                                  max_depth=args.max_depth, min_samples_leaf=args.min_samples_leaf)
+    path = save_artifacts(model, args.out, info)
+    print(f"{info['rows']} rows in {info['chunks']} chunks, {info['trees']} trees, "
+          f"read {info['read_s']}s, fit {info['fit_s']}s, holdout {info['holdout']}")
+    print(f"Model saved in {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the API the way the container runs it (routes.x, services.x
+# from api/) and ml from the repo root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "api"), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
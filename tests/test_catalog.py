@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.catalog import Catalog, CatalogSearch
+
+TOKYO = (35.6812, 139.7671)
+
+
+def place(pid, north_m=0.0, east_m=0.0, **extra):
+    # A Text Search result `north_m` / `east_m` metres from TOKYO
+    lat = TOKYO[0] + north_m / 111_320.0
+    lng = TOKYO[1] + east_m / (111_320.0 * 0.8126)  # cos(35.68°)
+    return dict({"id": pid, "displayName": {"text": f"Place {pid}"},
+                 "location": {"latitude": lat, "longitude": lng}}, **extra)
+
+def ids(places):
+    return [p["id"] for p in places]
+
+
+def test_nearby_is_nearest_first_within_the_radius():
+    catalog = Catalog(cell_deg=0.01)
+    catalog.add([place("far", 3000), place("b", 0, 900), place("a", 100), place("c", -1500, -1500)], "ramen")
+    assert ids(catalog.nearby("ramen", *TOKYO, radius=2500)) == ["a", "b", "c"]
+    assert ids(catalog.nearby("ramen", *TOKYO, radius=2500, limit=2)) == ["a", "b"]
+    assert ids(catalog.nearby("ramen", *TOKYO, radius=50)) == []
+
+def test_nearby_skips_stale_places():
+    catalog = Catalog()
+    catalog.add([place("old", 100)], "ramen", seen_at=time.time() - 7200)
+    catalog.add([place("new", 200)], "ramen")
+    assert ids(catalog.nearby("ramen", *TOKYO, max_age=3600)) == ["new"]
+    assert ids(catalog.nearby("ramen", *TOKYO)) == ["old", "new"]
+
+def test_index_is_per_cuisine_type():
+    catalog = Catalog()
+    assert catalog.add([place("a", 100), place("b", 200)], "ramen") == 2
+    assert catalog.add([place("b", 200, rating=4.5), place("s", 300)], "sushi") == 1
+    assert ids(catalog.nearby("ramen", *TOKYO)) == ["a", "b"]
+    assert ids(catalog.nearby("sushi", *TOKYO)) == ["b", "s"]
+    assert catalog.nearby("pizza", *TOKYO) == []
+    # Upserted, not duplicated: the newer fields win for both types
+    assert len(catalog) == 3 and catalog.nearby("ramen", *TOKYO)[1]["rating"] == 4.5
+
+def test_rows_without_an_id_or_location_are_skipped():
+    catalog = Catalog()
+    assert catalog.add([{"id": "x"}, {"location": {"latitude": 1, "longitude": 2}}], "ramen") == 0
+    assert len(catalog) == 0
+
+def test_npz_round_trip(tmp_path):
+    catalog = Catalog()
+    a = place("a", 100, rating=4.2, userRatingCount=10, priceLevel="PRICE_LEVEL_MODERATE",
+              photos=[{"name": "photos/a"}], formattedAddress="1-1 Marunouchi")
+    catalog.add([a], "ramen")
+    catalog.add([a, place("s", 300)], "sushi")
+    path = str(tmp_path / "catalog.npz")
+    assert catalog.save(path) == 2
+
+    # Loaded with another cell size: re-indexed, same answers
+    loaded = Catalog.load(path, cell_deg=0.05)
+    assert len(loaded) == 2
+    for cuisine in ("ramen", "sushi"):
+        assert loaded.nearby(cuisine, *TOKYO) == catalog.nearby(cuisine, *TOKYO)
+    assert loaded.nearby("ramen", *TOKYO)[0]["priceLevel"] == "PRICE_LEVEL_MODERATE"
+    assert list(tmp_path.iterdir()) == [tmp_path / "catalog.npz"]
+
+
+@pytest.fixture
+def search():
+    return CatalogSearch(Catalog(), max_age=3600, min_results=3, radius=2500, path="")
+
+def test_thin_results_go_upstream(search):
+    search.remember([place("a", 100), place("b", 200)], "ramen")
+    assert search.local("ramen", *TOKYO) is None
+    search.remember([place("c", 300)], "ramen")
+    assert ids(search.local("ramen", *TOKYO)) == ["a", "b", "c"]
+    assert (search.catalog.misses, search.catalog.hits) == (1, 1)
+
+def test_fallback_serves_stale_places_when_upstream_fails(search):
+    search.catalog.add([place("a", 100)], "ramen", seen_at=time.time() - 86400)
+    assert search.local("ramen", *TOKYO) is None
+    assert ids(search.fallback("ramen", *TOKYO)) == ["a"]
+    assert search.fallback("sushi", *TOKYO) is None
+    assert search.catalog.fallbacks == 1
+
+def test_disabled_search_answers_nothing():
+    search = CatalogSearch(Catalog(), max_age=0, path="")
+    search.remember([place("a", 100)], "ramen")
+    assert len(search.catalog) == 0
+    assert search.local("ramen", *TOKYO) is None and search.fallback("ramen", *TOKYO) is None
+
+def test_failed_save_leaves_no_temp_file(tmp_path, monkeypatch):
+    catalog = Catalog()
+    catalog.add([place("a", 100)], "ramen")
+    monkeypatch.setattr(np, "savez_compressed", lambda *a, **k: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        catalog.save(str(tmp_path / "catalog.npz"))
+    assert list(tmp_path.iterdir()) == []
+
+def test_periodic_save_runs_off_the_request_path(tmp_path, monkeypatch):
+    search  = CatalogSearch(Catalog(), max_age=3600, path=str(tmp_path / "catalog.npz"), save_interval=0)
+    started, release = threading.Event(), threading.Event()
+    saves = []
+
+    def slow_save(path):
+        started.set()
+        release.wait(5)
+        saves.append(path)
+        return 1
+    monkeypatch.setattr(search.catalog, "save", slow_save)
+
+    start = time.monotonic()
+    search.remember([place("a", 100)], "ramen")
+    assert started.wait(5)
+    search.remember([place("b", 200)], "ramen")  # a save is running: not started again
+    assert time.monotonic() - start < 1.0 and saves == []
+    release.set()
+    search.save()  # waits for the background save, then saves what is left
+    assert saves == [search.path, search.path]
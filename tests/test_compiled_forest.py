@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.inference import CompiledForest, load_compiled_model, load_model, map_npz
+from ml.train_model import export_compiled
+
+DEPLOYED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "deployment")
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 5, size=(2000, 5))
+    y = (X[:, 0] + 0.5 * X[:, 3] - X[:, 4] + rng.normal(0, 0.5, len(X)) > 2).astype(int)
+    return RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+
+@pytest.fixture(scope="module")
+def exported(forest, tmp_path_factory):
+    return export_compiled(forest, str(tmp_path_factory.mktemp("model") / "model.npz"))
+
+def _inputs(model):
+    # A fixed grid plus every split threshold itself, where `<=` vs `<` would differ
+    rng = np.random.default_rng(1)
+    X = rng.uniform(-1, 6, size=(500, model.n_features_in_))
+    t = model.estimators_[0].tree_
+    split = t.children_left != -1
+    on_split = np.tile(X[:1], (split.sum(), 1))
+    on_split[np.arange(split.sum()), t.feature[split]] = t.threshold[split]
+    return np.vstack([X, on_split])
+
+
+def test_compiled_matches_sklearn(forest, exported):
+    X = _inputs(forest)
+    compiled = load_compiled_model(exported)
+    np.testing.assert_allclose(compiled.predict_proba(X), forest.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X), forest.predict(X))
+
+def test_mapped_matches_sklearn(forest, exported):
+    X = _inputs(forest)
+    compiled = load_compiled_model(exported, mmap=True)
+    # Views of the file mapping, not private copies
+    assert not compiled.value.flags.owndata and not compiled.value.flags.writeable
+    np.testing.assert_allclose(compiled.predict_proba(X), forest.predict_proba(X), atol=1e-12)
+
+def test_map_npz_matches_np_load(exported):
+    mapped = map_npz(exported)
+    with np.load(exported) as data:
+        assert sorted(mapped) == sorted(data.files)
+        for name in data.files:
+            np.testing.assert_array_equal(mapped[name], data[name])
+            assert mapped[name].dtype == data[name].dtype
+
+def test_map_npz_rejects_compressed(forest, tmp_path):
+    path = tmp_path / "compressed.npz"
+    with np.load(export_compiled(forest, str(tmp_path / "plain.npz"))) as data:
+        np.savez_compressed(path, **{k: data[k] for k in data.files})
+    with pytest.raises(ValueError, match="compressed"):
+        map_npz(str(path))
+
+def test_deployed_artifacts_agree():
+    # The shipped .npz must score exactly like the pickle it was exported from
+    model = load_model(os.path.join(DEPLOYED, "suggestion_model.pkl"))
+    X = np.array([[r, 1.0] for r in np.arange(0.0, 5.01, 0.1)])
+    for compiled in (load_compiled_model(os.path.join(DEPLOYED, "suggestion_model.npz")),
+                     CompiledForest(map_npz(os.path.join(DEPLOYED, "suggestion_model.npz")))):
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
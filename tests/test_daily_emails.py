@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from jobs import daily_emails
+from jobs.daily_emails import Skipped, build_pipeline, group_by_search_key
+from jobs.runner import JobRunner, runner
+from routes import suggestions
+from routes.jobs import jobs
+
+PLACES = [{"id": f"p{i}", "displayName": {"text": f"Place {i}"}, "rating": 4.0, "userRatingCount": 10,
+           "formattedAddress": "Tokyo", "location": {"latitude": 35.68, "longitude": 139.69}}
+          for i in range(8)]
+
+
+class Store:
+    def __init__(self):
+        self.saved = {}
+
+    def load_histories(self, user_ids):
+        return {}
+
+    def save_history(self, user_id, doc):
+        self.saved[user_id] = doc
+
+
+class Mailer:
+    """send_many stand-in: records batch sizes, fails every message to a 'bad' address."""
+
+    def __init__(self):
+        self.batches = []
+
+    def send_many(self, messages):
+        messages = list(messages)
+        self.batches.append(len(messages))
+        return [RuntimeError("rejected") if m["To"].startswith("bad") else None for m in messages]
+
+
+@pytest.fixture
+def mailer(monkeypatch):
+    mailer = Mailer()
+    monkeypatch.setattr(daily_emails, "get_mailer", lambda: mailer)
+    monkeypatch.setattr(daily_emails, "search_places", lambda *params: (PLACES, 200))
+    monkeypatch.setattr(daily_emails, "score_page", lambda places, origin=None: np.ones(len(places)))
+    monkeypatch.setattr(suggestions, "enrich_suggestions", lambda suggs: None)
+    monkeypatch.setattr(suggestions.pools, "max_age", 0)
+    return mailer
+
+def _users(n, bad=()):
+    return [(f"u{i}", {"email": f"{'bad' if i in bad else 'ok'}{i}@example.com", "cuisine": "Thai",
+                       "location": "35.68,139.69"}) for i in range(n)]
+
+
+def test_sends_in_batches_and_records_history_only_when_sent(mailer, monkeypatch):
+    monkeypatch.setattr(daily_emails, "SEND_BATCH", 10)
+    store, skipped = Store(), Skipped()
+    pipeline = build_pipeline(store=store, skipped=skipped)
+    pipeline.run(group_by_search_key(iter(_users(25, bad={3})), skipped=skipped))
+    assert sum(mailer.batches) == 25 and max(mailer.batches) <= 10
+    assert pipeline.stages[-1].emitted == 24
+    assert sorted(store.saved) == sorted(f"u{i}" for i in range(25) if i != 3)
+
+def test_dry_run_sends_and_records_nothing(mailer):
+    store = Store()
+    pipeline = build_pipeline(dry_run=True, store=store).run(group_by_search_key(iter(_users(5))))
+    assert mailer.batches == [] and store.saved == {}
+    assert pipeline.stages[-1].emitted == 5
+
+def test_users_without_suggestions_are_counted(mailer, monkeypatch):
+    monkeypatch.setattr(daily_emails, "score_page", lambda places, origin=None: np.zeros(len(places)))
+    skipped = Skipped()
+    build_pipeline(store=Store(), skipped=skipped).run(group_by_search_key(iter(_users(3)), skipped=skipped))
+    assert mailer.batches == [] and skipped.counts == {"no suggestions": 3}
+
+
+def test_runner_runs_one_job_at_a_time():
+    release = threading.Event()
+    runner  = JobRunner()
+    run, started = runner.start("job", lambda n: release.wait() and n * 2, n=21)
+    assert started and run["state"] == "running"
+    again, started = runner.start("job", lambda: None)
+    assert not started and again["id"] == run["id"]
+    release.set()
+    done = runner.wait("job", timeout=5)
+    assert done["state"] == "finished" and done["result"] == 42
+
+def test_runner_records_failures():
+    runner = JobRunner()
+    runner.start("job", lambda: 1 / 0)
+    assert runner.wait("job", timeout=5)["state"] == "failed"
+    assert runner.start("job", lambda: "ok")[1]
+
+def test_route_returns_before_the_job_ends(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(daily_emails, "run", lambda dry_run, limit: release.wait(5) and {"sent": limit})
+    app = Flask(__name__)
+    app.register_blueprint(jobs)
+    client = app.test_client()
+
+    start = time.monotonic()
+    resp  = client.post("/jobs/daily_emails", json={"limit": 3})
+    assert resp.status_code == 202 and time.monotonic() - start < 1
+    assert client.post("/jobs/daily_emails", json={}).status_code == 409
+    release.set()
+    runner.wait("daily_emails", timeout=5)
+    resp = client.get("/jobs/daily_emails")
+    assert resp.get_json()["state"] == "finished" and resp.get_json()["result"] == {"sent": 3}
+    assert client.get("/jobs/nope").status_code == 404
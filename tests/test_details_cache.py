@@ -0,0 +1,73 @@
+import threading
+
+import requests
+from services.details_cache import DetailsCache, SQLiteTier, is_definitive
+from services.ttl_cache import MISSING
+
+FALLBACK = (None, None, None)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+def failing(error):
+    calls = []
+    def fetch(place_id):
+        calls.append(place_id)
+        raise error
+    return fetch, calls
+
+
+def test_definitive_errors():
+    assert is_definitive(http_error(404)) and is_definitive(http_error(400))
+    assert not is_definitive(http_error(503))
+    assert not is_definitive(http_error(429))
+    assert not is_definitive(requests.Timeout("slow"))
+
+def test_transient_failure_is_not_cached(tmp_path):
+    shared = SQLiteTier(str(tmp_path / "details.sqlite3"))
+    cache = DetailsCache(shared=shared)
+    fetch, calls = failing(http_error(503))
+    assert cache.get_or_fetch("p1", fetch, FALLBACK) == FALLBACK
+    assert cache.get_or_fetch("p1", fetch, FALLBACK) == FALLBACK
+    assert calls == ["p1", "p1"]
+    assert shared.get("p1") is None
+
+def test_not_found_is_cached_in_memory_only(tmp_path):
+    shared = SQLiteTier(str(tmp_path / "details.sqlite3"))
+    cache = DetailsCache(shared=shared)
+    fetch, calls = failing(http_error(404))
+    assert cache.get_or_fetch("p1", fetch, FALLBACK) == FALLBACK
+    assert cache.get_or_fetch("p1", fetch, FALLBACK) == FALLBACK
+    assert calls == ["p1"] and cache.negative_hits == 1
+    assert shared.get("p1") is None
+
+    # Another instance sharing the tier still asks Places
+    other = DetailsCache(shared=shared)
+    assert other.get("p1") is MISSING
+
+def test_found_details_reach_the_shared_tier(tmp_path):
+    shared = SQLiteTier(str(tmp_path / "details.sqlite3"))
+    DetailsCache(shared=shared).get_or_fetch("p1", lambda pid: ("review", "summary", 2), FALLBACK)
+
+    other = DetailsCache(shared=shared)
+    assert other.get("p1") == ("review", "summary", 2)
+    assert other.get("p1") == ("review", "summary", 2)
+    assert other.shared_hits == 1
+
+def test_counters_are_exact_under_threads():
+    cache = DetailsCache()
+    cache.put("p1", FALLBACK, negative=True)
+
+    def lookups():
+        for _ in range(2000):
+            cache.get("p1")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.negative_hits == 16000
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+
+import pytest
+
+from services.dispatch import Dispatcher, DeadlineExceeded, PermanentError, call_with_retries
+
+
+def _statuses(*statuses):
+    it = iter(statuses)
+    return lambda: next(it)
+
+
+def test_retries_transient_statuses():
+    sleeps = []
+    assert call_with_retries(_statuses(503, 429, 200), retries=3, sleep=sleeps.append) == (200, None)
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0] * 0.3
+
+def test_does_not_retry_client_errors():
+    calls = []
+    fn = lambda: calls.append(1) or 400
+    assert call_with_retries(fn, retries=3, sleep=lambda s: None) == (400, "email status 400")
+    assert len(calls) == 1
+
+def test_gives_up_after_retries():
+    def fail():
+        raise ConnectionError("down")
+    assert call_with_retries(fail, retries=2, sleep=lambda s: None) == (None, "exception down")
+
+def test_permanent_error_is_not_retried():
+    calls = []
+    def fail():
+        calls.append(1)
+        raise PermanentError("bad address")
+    assert call_with_retries(fail, retries=3, sleep=lambda s: None) == (None, "bad address")
+    assert len(calls) == 1
+
+def test_sends_everything_and_records_errors():
+    sent = []
+    def send(item):
+        time.sleep(random.random() / 1000)
+        sent.append(item)
+        return 400 if item == 7 else 200
+    d = Dispatcher(send, max_workers=4, retries=0, backoff=0).run((i, i) for i in range(20))
+    assert sorted(sent) == list(range(20))
+    assert d.processed == 20 and d.cursor == 19
+    assert d.errors == ["7: email status 400"]
+
+def test_checkpoints_are_ordered_prefixes():
+    saved, gaps, lock = [], [], threading.Lock()
+    done = set()
+    def send(item):
+        time.sleep(random.random() / 500)
+        with lock:
+            done.add(item)
+        return 200
+    def on_checkpoint(cursor):
+        # Everything up to the saved cursor has been sent
+        with lock:
+            gaps.extend(set(range(cursor + 1)) - done)
+        saved.append(cursor)
+    d = Dispatcher(send, max_workers=8, on_checkpoint=on_checkpoint, checkpoint_every=3)
+    d.run((i, i) for i in range(200))
+    d.checkpoint()
+    assert not gaps
+    assert saved == sorted(set(saved)) and saved[-1] == 199
+
+def test_resumes_from_cursor_and_stops_at_deadline():
+    d = Dispatcher(lambda item: 200, cursor=41, deadline=time.monotonic() - 1)
+    d.run((i, i) for i in range(42, 50))
+    assert d.timed_out and d.processed == 0 and d.cursor == 41
+
+def test_no_retry_past_the_deadline():
+    def fail():
+        raise ConnectionError("down")
+    with pytest.raises(DeadlineExceeded):
+        call_with_retries(fail, retries=3, backoff=10, deadline=time.monotonic() + 1)
+
+def test_item_cut_by_the_deadline_is_not_checkpointed():
+    def send(item):
+        if item == 2:
+            raise ConnectionError("down")
+        return 200
+    d = Dispatcher(send, max_workers=1, backoff=10, deadline=time.monotonic() + 1)
+    d.run((i, i) for i in range(5))
+    assert d.timed_out and d.cursor == 1
@@ -0,0 +1,38 @@
+import pytest
+
+from services.geo import geohash_bounds, geohash_center, geohash_encode
+
+
+def test_known_cell():
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+    assert geohash_encode(57.64911, 10.40744) == "u4pruy"
+
+@pytest.mark.parametrize("lat, lng", [(35.6812, 139.7671), (-33.8688, 151.2093), (40.7128, -74.0060)])
+def test_bounds_contain_the_point_and_center_maps_back(lat, lng):
+    cell = geohash_encode(lat, lng)
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(cell)
+    assert lat_lo <= lat < lat_hi and lng_lo <= lng < lng_hi
+    assert geohash_encode(*geohash_center(cell)) == cell
+    assert geohash_encode(*geohash_center(cell), precision=7).startswith(cell)
+
+def test_neighbour_cells_share_an_edge():
+    cell = geohash_encode(35.6812, 139.7671)
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(cell)
+    mid_lat, mid_lng = geohash_center(cell)
+
+    # Lower edges belong to the cell, upper edges to the neighbour
+    assert geohash_encode(lat_lo, mid_lng) == cell and geohash_encode(mid_lat, lng_lo) == cell
+    north, east = geohash_encode(lat_hi, mid_lng), geohash_encode(mid_lat, lng_hi)
+    assert cell not in (north, east) and north != east
+    assert geohash_bounds(north)[0] == lat_hi and geohash_bounds(east)[2] == lng_hi
+    assert geohash_encode(lat_hi - 1e-9, mid_lng) == cell
+
+def test_search_key_shares_a_cell_and_normalises_the_query():
+    from routes.suggestions import search_key
+
+    cell = geohash_encode(35.6812, 139.7671)
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(cell)
+    a = search_key("Best  Ramen", "ramen_restaurant", lat_lo + 1e-6, lng_lo + 1e-6)
+    b = search_key("best ramen ", "ramen_restaurant", lat_hi - 1e-6, lng_hi - 1e-6)
+    assert a == b == ("best ramen", "ramen_restaurant", cell)
+    assert search_key("best ramen", "ramen_restaurant", lat_hi, lng_lo)[2] != cell
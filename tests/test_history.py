@@ -0,0 +1,64 @@
+from services.history import BloomFilter, RecentPlaces
+
+
+def test_evicts_oldest_first():
+    recent = RecentPlaces(capacity=3)
+    recent.add(["a", "b", "c"], now=100)
+    recent.add(["d"], now=200)
+    assert recent.ids() == ["b", "c", "d"]
+    assert "a" not in recent and "d" in recent
+
+def test_resending_moves_to_newest():
+    recent = RecentPlaces(capacity=3)
+    recent.add(["a", "b", "c"], now=100)
+    recent.add(["a"], now=200)
+    recent.add(["d"], now=300)
+    assert recent.ids() == ["c", "a", "d"]
+    assert recent.last_sent()["a"] == 200
+
+def test_evicted_ids_stay_in_bloom():
+    recent = RecentPlaces(capacity=2, bloom=BloomFilter(1024))
+    recent.add(["a", "b", "c"], now=100)
+    assert len(recent) == 2
+    assert "a" in recent
+
+def test_bloom_starts_over_when_full():
+    bloom = BloomFilter(1024, max_items=2)
+    bloom.add("a")
+    bloom.add("b")
+    bloom.add("c")
+    assert "c" in bloom and bloom.count == 1
+
+def test_doc_round_trip():
+    recent = RecentPlaces(capacity=5, bloom=BloomFilter(256))
+    recent.add(["a", "b"], now=100)
+    recent.add(["c"], now=200)
+    back = RecentPlaces.from_doc(recent.to_doc(), capacity=5, bloom_bits=256)
+    assert back.ids() == ["a", "b", "c"]
+    assert dict(back.last_sent()) == {"a": 100, "b": 100, "c": 200}
+    assert back.bloom.data == recent.bloom.data
+
+def test_reads_v1_docs_and_applies_capacity():
+    back = RecentPlaces.from_doc({"place_ids": ["a", "b", "c"]}, capacity=2, bloom_bits=0)
+    assert back.ids() == ["b", "c"]
+    assert back.last_sent()["c"] == 0
+
+def test_resized_bloom_starts_fresh():
+    doc = RecentPlaces(capacity=5, bloom=BloomFilter(64)).to_doc()
+    back = RecentPlaces.from_doc(doc, capacity=5, bloom_bits=128)
+    assert len(back.bloom.data) == 16 and back.bloom.count == 0
+
+def test_empty_doc():
+    assert RecentPlaces.from_doc(None, bloom_bits=0).ids() == []
+
+def test_record_sent_keeps_every_suggestion():
+    from routes.suggestions import record_sent
+
+    class Store:
+        def save_history(self, user_id, doc):
+            self.saved = (user_id, doc)
+
+    store, recent = Store(), RecentPlaces(capacity=10)
+    record_sent(store, "u1", recent, [{"place_id": f"p{i}"} for i in range(5)])
+    assert recent.ids() == ["p0", "p1", "p2", "p3", "p4"]
+    assert store.saved == ("u1", recent.to_doc())
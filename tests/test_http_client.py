@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from bench.fakes import FakeUpstream
+from services.http_client import EndpointStats, HttpClient
+
+
+@pytest.fixture
+def upstream():
+    server = FakeUpstream(latency=0.0, jitter=0.0).start()
+    yield server
+    server.stop()
+
+
+def test_retries_stop_at_the_deadline(upstream):
+    upstream.error_rate = 1.0
+    client = HttpClient(retries=5, backoff=2.0)
+    start  = time.monotonic()
+    resp   = client.get(f"{upstream.url}/places/p1", endpoint="places.details",
+                        deadline=time.monotonic() + 0.3)
+    assert resp.status_code == 503
+    assert time.monotonic() - start < 0.5
+    assert upstream.calls["places.details"] <= 2
+
+def test_attempts_are_cut_to_the_deadline(upstream):
+    upstream.latency = 1.0
+    client = HttpClient(retries=2, backoff=0.0)
+    start  = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get(f"{upstream.url}/places/p1", timeout=5.0, deadline=time.monotonic() + 0.3)
+    assert time.monotonic() - start < 0.8
+
+def test_enrich_returns_by_its_deadline(upstream, monkeypatch):
+    from routes import suggestions
+    from services.details_cache import DetailsCache
+    from services.resources import resources
+
+    # Every lookup is retried on a slow 503: without the deadline, 3 attempts each
+    upstream.latency, upstream.error_rate = 0.2, 1.0
+    monkeypatch.setattr(suggestions, "PLACES_BASE_URL", upstream.url)
+    monkeypatch.setattr(suggestions, "details_cache", DetailsCache())
+    monkeypatch.setitem(resources._instances, "http", HttpClient(retries=2, backoff=1.0))
+    suggs = [{"place_id": f"p{i}"} for i in range(4)]
+    start = time.monotonic()
+    suggestions.enrich_suggestions(suggs, max_workers=4, timeout=0.3)
+    assert time.monotonic() - start < 1.0
+    assert all(s["latest_review"] == suggestions.NO_DETAILS[0] for s in suggs)
+
+def test_post_is_retried_only_when_marked_idempotent(upstream):
+    upstream.error_rate = 1.0
+    client = HttpClient(retries=2, backoff=0.0)
+    assert client.post(f"{upstream.url}/places:searchText", json={}).status_code == 503
+    assert upstream.calls["places.searchText"] == 1
+    client.post(f"{upstream.url}/places:searchText", json={}, idempotent=True)
+    assert upstream.calls["places.searchText"] == 4
+    client.get(f"{upstream.url}/places/p1")
+    assert upstream.calls["places.details"] == 3
+
+def test_endpoint_stats_are_exact_under_threads():
+    stats = EndpointStats(name="test")
+    def calls():
+        for _ in range(2000):
+            stats.record(0.001, ok=False)
+            stats.retried()
+    threads = [threading.Thread(target=calls) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = stats.snapshot()
+    assert (snap["count"], snap["errors"], snap["retries"]) == (16000, 16000, 16000)
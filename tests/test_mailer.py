@@ -0,0 +1,65 @@
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+from email_service.mailer import Mailer
+from email_service.smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink(request):
+    sink = SMTPSink(**getattr(request, "param", {})).start()
+    yield sink
+    sink.stop()
+
+def _mailer(sink, user="sender@example.com", password="secret", **kwargs):
+    return Mailer(user, password, host="127.0.0.1", port=sink.port, starttls=False, timeout=5, **kwargs)
+
+def _messages(n):
+    for i in range(n):
+        msg = MIMEText(f"body {i}")
+        msg["From"], msg["To"], msg["Subject"] = "sender@example.com", f"user{i}@example.com", "hi"
+        yield msg
+
+
+def test_one_session_across_batches(sink):
+    mailer = _mailer(sink)
+    assert mailer.send_many(_messages(3)) == [None] * 3
+    mailer.send(next(_messages(1)))
+    assert len(sink.messages) == 4
+    assert sink.connections == 1 and mailer.connections_opened == 1 and sink.logins == 1
+    mailer.close()
+
+@pytest.mark.parametrize("sink", [{"drop_after": 2}], indirect=True)
+def test_reconnects_when_the_server_hangs_up(sink):
+    mailer = _mailer(sink)
+    assert mailer.send_many(_messages(5)) == [None] * 5
+    assert len(sink.messages) == 5
+    assert sink.connections == 3 and mailer.reconnects == 2
+
+def test_recycles_after_max_messages(sink):
+    mailer = _mailer(sink, max_messages=2)
+    assert mailer.send_many(_messages(5)) == [None] * 5
+    mailer.send(next(_messages(1)))
+    assert sink.connections == 3 and mailer.reconnects == 0
+
+def test_recycles_idle_sessions(sink):
+    mailer = _mailer(sink, max_idle=0.05)
+    mailer.send(next(_messages(1)))
+    mailer.send(next(_messages(1)))
+    time.sleep(0.1)
+    mailer.send(next(_messages(1)))
+    assert sink.connections == 2
+
+@pytest.mark.parametrize("sink", [{"credentials": ("sender@example.com", "secret")}], indirect=True)
+def test_rejected_login_fails_the_batch_fast(sink):
+    mailer  = _mailer(sink, password="wrong")
+    results = mailer.send_many(_messages(5))
+    assert len(results) == 5 and all(isinstance(e, smtplib.SMTPAuthenticationError) for e in results)
+    assert sink.connections == 1 and sink.messages == [] and mailer.auth_failures == 1
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        mailer.send(next(_messages(1)))
+
+    assert _mailer(sink).send_many(_messages(2)) == [None, None]
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from jobs.daily_emails import Skipped, group_by_search_key
+from services.pipeline import Pipeline, Stage
+
+
+def test_single_workers_keep_order():
+    out = []
+    Pipeline([
+        Stage("double", lambda x: [x, x]),
+        Stage("collect", lambda x: out.append(x)),
+    ]).run(range(50))
+    assert out == [x for x in range(50) for _ in (0, 1)]
+
+def test_source_is_read_only_as_fast_as_the_sink_drains():
+    read, done, ahead = [0], [0], []
+    lock = threading.Lock()
+
+    def source():
+        for i in range(200):
+            with lock:
+                read[0] += 1
+                ahead.append(read[0] - done[0])
+            yield i
+
+    def slow(x):
+        time.sleep(0.001)
+        with lock:
+            done[0] += 1
+
+    Pipeline([Stage("pass", lambda x: [x]), Stage("slow", slow)], queue_size=5).run(source())
+    # Two queues of 5, plus one item in each worker and one being put
+    assert done[0] == 200 and max(ahead) <= 13
+
+def test_failing_items_are_counted_and_dropped():
+    out = []
+
+    def parse(x):
+        if x % 10 == 0:
+            raise ValueError(f"bad {x}")
+        return [x]
+
+    pipeline = Pipeline([Stage("parse", parse, workers=3), Stage("collect", out.append)]).run(range(1, 51))
+    stats = pipeline.stats()
+    assert sorted(out) == [x for x in range(1, 51) if x % 10]
+    assert stats["errors"] == 5 and stats["stages"]["parse"]["errors"] == 5
+    assert stats["stages"]["parse"]["processed"] == 50 and stats["stages"]["parse"]["emitted"] == 45
+    assert sorted(pipeline.errors) == sorted(f"parse: bad {x}" for x in range(10, 51, 10))
+
+def test_batched_stage_gets_lists():
+    batches = []
+
+    def slow(x):
+        time.sleep(0.002)
+        return [x]
+
+    pipeline = Pipeline([
+        Stage("slow", slow),
+        Stage("batch", lambda items: batches.append(list(items)), batch=4),
+    ]).run(range(10))
+    assert sorted(x for b in batches for x in b) == list(range(10))
+    assert all(1 <= len(b) <= 4 for b in batches)
+    assert pipeline.stats()["stages"]["batch"]["processed"] == 10
+
+def test_batches_fill_up_behind_a_slow_stage():
+    batches = []
+
+    def send(items):
+        time.sleep(0.01)
+        batches.append(len(items))
+
+    Pipeline([Stage("fast", lambda x: [x]), Stage("send", send, batch=8)], queue_size=50).run(range(40))
+    assert sum(batches) == 40 and max(batches) == 8
+
+
+def _prefs(email="u@example.com", cuisine="Thai", location="35.68,139.69"):
+    return {"email": email, "cuisine": cuisine, "location": location}
+
+def test_groups_users_sharing_a_search():
+    users = [("a", _prefs()), ("b", _prefs(location="35.68,139.6901")), ("c", _prefs(cuisine="Pizza"))]
+    groups = list(group_by_search_key(iter(users)))
+    assert [[uid for uid, _ in members] for _, members in groups] == [["a", "b"], ["c"]]
+
+def test_groups_are_flushed_every_window():
+    users = [(f"u{i}", _prefs()) for i in range(5)]
+    groups = list(group_by_search_key(iter(users), window=2))
+    assert [len(members) for _, members in groups] == [2, 2, 1]
+
+def test_skipped_users_are_counted():
+    skipped = Skipped()
+    users = [("a", _prefs()), ("b", _prefs(email=None)), ("c", _prefs(location=None)), ("d", {})]
+    groups = list(group_by_search_key(iter(users), skipped=skipped))
+    assert sum(len(members) for _, members in groups) == 1
+    assert skipped.counts == {"no email": 2, "no cuisine or location": 1}
@@ -0,0 +1,121 @@
+import time
+
+from services.pools import FirestorePoolTier, Pool, PoolRefresher, PoolStore
+
+
+class SharedTier:
+    """In-memory stand-in for FirestorePoolTier, leases included."""
+
+    def __init__(self):
+        self.pools  = {}
+        self.leases = {}
+
+    def get(self, key):
+        return self.pools.get(key)
+
+    def set(self, key, pool):
+        self.pools[key] = pool
+
+    def claim(self, key, ttl):
+        now = time.time()
+        if self.leases.get(key, 0) > now:
+            return False
+        self.leases[key] = now + ttl
+        return True
+
+
+def _pool(age=0.0):
+    return Pool([{"place_id": "p1"}], [0.9], built_at=time.time() - age)
+
+def _key(i):
+    return (f"query {i}", "thai_restaurant", "xn76ur")
+
+
+def test_disabled_by_default():
+    assert not PoolStore().enabled
+
+def test_expired_pools_are_not_served():
+    store = PoolStore(max_age=60)
+    store.put(_key(1), _pool())
+    store.put(_key(2), _pool(age=120))
+    assert store.get(_key(1)) is not None
+    assert store.get(_key(2)) is None
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_least_recently_requested_key_goes_first():
+    store = PoolStore(max_age=60, max_keys=2)
+    store.put(_key(1), _pool())
+    store.put(_key(2), _pool())
+    store.get(_key(1))
+    store.put(_key(3), _pool())
+    assert store.get(_key(2)) is None
+    assert store.get(_key(1)) is not None and store.get(_key(3)) is not None
+    assert store.evictions == 1
+
+def test_idle_keys_are_evicted():
+    store = PoolStore(max_age=60, idle_age=0.05)
+    store.put(_key(1), _pool())
+    store.put(_key(2), _pool())
+    time.sleep(0.1)
+    store.get(_key(2))
+    assert store.evict_idle() == 1
+    assert store.get(_key(1)) is None and store.get(_key(2)) is not None
+
+def test_refresher_rebuilds_stale_pools_only():
+    store = PoolStore(max_age=600)
+    built = []
+
+    def build(key):
+        built.append(key)
+        store.put(key, _pool())
+
+    store.put(_key(1), _pool(age=300))
+    store.put(_key(2), _pool())
+    refresher = PoolRefresher(store, build, interval=0, refresh_age=100)
+    refresher.refresh_once()
+    assert built == [_key(1)] and refresher.refreshed == 1
+    refresher.refresh_once()
+    assert built == [_key(1)]
+
+def test_refresher_drops_idle_keys_instead_of_rebuilding():
+    store = PoolStore(max_age=600, idle_age=0.05)
+    store.put(_key(1), _pool(age=300))
+    time.sleep(0.1)
+    built = []
+    PoolRefresher(store, built.append, interval=0, refresh_age=100).refresh_once()
+    assert built == [] and store.stats()["size"] == 0
+
+def test_one_process_rebuilds_a_shared_key():
+    shared = SharedTier()
+    stores = [PoolStore(max_age=600, shared=shared) for _ in range(3)]
+    built  = []
+    for store in stores:
+        store.put(_key(1), _pool(age=300))
+
+    def builder(store):
+        def build(key):
+            built.append(key)
+            store.put(key, _pool())
+        return build
+
+    refreshers = [PoolRefresher(store, builder(store), interval=0, refresh_age=100) for store in stores]
+    for refresher in refreshers:
+        refresher.refresh_once()
+    assert built == [_key(1)]
+    assert [r.refreshed for r in refreshers] == [1, 0, 0] and [r.adopted for r in refreshers] == [0, 1, 1]
+    assert all(store.get(_key(1)).age() < 100 for store in stores)
+
+def test_leased_key_is_left_to_its_holder():
+    shared = SharedTier()
+    shared.claim(_key(1), ttl=60)
+    store = PoolStore(max_age=600, shared=shared)
+    store.put(_key(1), _pool(age=300))
+    built = []
+    PoolRefresher(store, built.append, interval=0, refresh_age=100).refresh_once()
+    assert built == []
+
+def test_shared_doc_ids_are_always_valid():
+    ids = [FirestorePoolTier.doc_id(key) for key in
+           [("a/b", "..", "x"), ("__name__", "", ""), ("q" * 2000, "t", "c"), (".", "t", "c")]]
+    assert len(set(ids)) == 4
+    assert all(len(i) == 40 and i.isalnum() for i in ids)
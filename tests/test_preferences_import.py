@@ -0,0 +1,67 @@
+import io
+import json
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from bench.fakes import FakeFirestore
+from routes import preferences
+from routes.preferences import ndjson_lines, preferences_bp
+from services.resources import resources
+from services.store import SuggestionStore
+
+PREFS = {"cuisine": "Italian", "location": "35.68,139.69"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeFirestore()
+    monkeypatch.setitem(resources._instances, "store", SuggestionStore(db))
+    return db
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.register_blueprint(preferences_bp)
+    return app.test_client()
+
+def _ndjson(*records):
+    return "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records)
+
+
+def test_lines_split_across_blocks():
+    body = b'{"a": 1}\n{"b": 22}\n\n{"c": 333}'
+    assert list(ndjson_lines(io.BytesIO(body), block=3)) == [b'{"a": 1}', b'{"b": 22}', b"", b'{"c": 333}']
+
+def test_overlong_line_is_rejected(monkeypatch):
+    monkeypatch.setattr(preferences, "MAX_LINE_BYTES", 8)
+    with pytest.raises(RequestEntityTooLarge):
+        list(ndjson_lines(io.BytesIO(b"x" * 20 + b"\n"), block=4))
+
+def test_import_writes_valid_lines_in_batches(client, db, monkeypatch):
+    monkeypatch.setattr(preferences, "PREFS_IMPORT_BATCH", 2)
+    body = _ndjson(*({"user_id": f"u{i}", "preferences": PREFS} for i in range(5)))
+    resp = client.post("/preferences/import", data=body)
+    assert resp.status_code == 200
+    assert resp.get_json()["imported"] == 5 and resp.get_json()["batches"] == 3
+    assert db.count("preferences") == 5 and db.rpcs["commit"] == 3
+
+def test_import_reports_invalid_lines(client, db):
+    body = _ndjson({"user_id": "u1", "preferences": PREFS},
+                   "not json",
+                   {"user_id": "u2", "preferences": {"cuisine": "Thai"}},
+                   {"user_id": "u1", "preferences": dict(PREFS, cuisine="Thai")})
+    resp = client.post("/preferences/import", data=body)
+    out  = resp.get_json()
+    assert resp.status_code == 207 and out["status"] == "partial_success"
+    assert (out["imported"], out["invalid"]) == (1, 2)
+    assert [e["line"] for e in out["errors"]] == [2, 3]
+    # The later line for the same user wins
+    assert db.collection("preferences").document("u1").get().to_dict()["cuisine"] == "Thai"
+
+def test_export_round_trips(client, db):
+    client.post("/preferences/import", data=_ndjson(*({"user_id": u, "preferences": PREFS} for u in "bac")))
+    resp = client.get("/preferences/export?after=a")
+    assert resp.mimetype == "application/x-ndjson"
+    assert [json.loads(line)["user_id"] for line in resp.get_data(as_text=True).splitlines()] == ["b", "c"]
@@ -0,0 +1,95 @@
+import gzip
+import json
+
+import pytest
+
+from services import responses
+from services.responses import encode, etag_matches, negotiate, parse_fields, project
+
+ALLOWED = ("name", "rating", "address")
+BIG     = {"suggestions": [{"name": f"Place {i}", "rating": 4.5} for i in range(100)]}
+
+
+def _headers(headers):
+    return dict(headers)
+
+
+def test_parse_fields():
+    assert parse_fields(None, ALLOWED) is None
+    assert parse_fields(" , ", ALLOWED) is None
+    assert parse_fields("rating, name,rating", ALLOWED) == ("rating", "name")
+    with pytest.raises(ValueError, match="unknown fields: photo"):
+        parse_fields("name,photo", ALLOWED)
+
+def test_project():
+    items = [{"name": "a", "rating": 4.0, "address": "x"}, {"name": "b"}]
+    assert project(items, None) is items
+    assert project(items, ("rating", "name")) == [{"rating": 4.0, "name": "a"}, {"name": "b"}]
+
+@pytest.mark.parametrize("header, expected", [
+    (None, "identity"),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, identity", "identity"),
+    ("*", "gzip"),
+    ("*;q=0", "identity"),
+    ("deflate;q=bad, gzip;q=0.5", "gzip"),
+])
+def test_negotiate_gzip(monkeypatch, header, expected):
+    monkeypatch.setattr(responses, "brotli", None)
+    assert negotiate(header) == expected
+
+def test_negotiate_prefers_brotli_when_available(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", object())
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("gzip, br;q=0") == "gzip"
+
+@pytest.mark.parametrize("header, match", [
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"x", W/"abc"', True),
+    ("*", True),
+    ('W/"abd"', False),
+    ("", False),
+    (None, False),
+])
+def test_etag_matches_weakly(header, match):
+    assert etag_matches(header, 'W/"abc"') is match
+
+def test_encode_compresses_large_bodies(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    status, headers, payload = encode(BIG, accept_encoding="gzip")
+    headers = _headers(headers)
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert headers["Content-Length"] == str(len(payload))
+    assert json.loads(gzip.decompress(payload)) == BIG
+
+def test_encode_leaves_small_bodies_alone():
+    status, headers, payload = encode({"ok": True}, accept_encoding="gzip")
+    assert "Content-Encoding" not in _headers(headers)
+    assert json.loads(payload) == {"ok": True}
+
+def test_encode_returns_304_for_a_matching_etag():
+    _, headers, _ = encode(BIG, accept_encoding="gzip")
+    tag = _headers(headers)["ETag"]
+    status, headers, payload = encode(BIG, accept_encoding="gzip", if_none_match=tag)
+    assert status == 304 and payload == b"" and _headers(headers)["ETag"] == tag
+    # A different body gets a different tag, and the full response
+    status, _, _ = encode(dict(BIG, extra=1), if_none_match=tag)
+    assert status == 200
+
+def test_errors_carry_no_etag():
+    for status, cacheable in ((404, True), (200, False)):
+        _, headers, _ = encode({"error": "x"}, status, cacheable=cacheable)
+        assert "ETag" not in _headers(headers)
+
+def test_numpy_scalars_are_encoded():
+    np = pytest.importorskip("numpy")
+    _, _, payload = encode({"score": np.float32(0.5), "n": np.int64(3)})
+    assert json.loads(payload) == {"score": 0.5, "n": 3}
+
+def test_suggestions_carry_no_etag():
+    # Every GET draws (and records) a new selection: never a 304
+    from routes.suggestions import encode_suggestions
+    status, headers, payload = encode_suggestions(BIG["suggestions"], ("name",), 200, None)
+    assert status == 200 and "ETag" not in _headers(headers)
+    assert json.loads(payload)["suggestions"][0] == {"name": "Place 0"}
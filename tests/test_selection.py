@@ -0,0 +1,27 @@
+import random
+from collections import Counter
+
+from services.selection import weighted_top_k
+
+
+def test_picks_k_distinct_items():
+    chosen = weighted_top_k([1.0] * 10, 4, rng=random.Random(0))
+    assert len(chosen) == 4 and len(set(chosen)) == 4
+
+def test_never_picks_zero_or_negative_weights():
+    weights = [0.0, 1.0, -1.0, 2.0, 0.0]
+    for seed in range(50):
+        assert sorted(weighted_top_k(weights, 5, rng=random.Random(seed))) == [1, 3]
+
+def test_k_of_zero_or_less():
+    assert weighted_top_k([1.0, 2.0], 0) == []
+    assert weighted_top_k([1.0, 2.0], -1) == []
+
+def test_deterministic_for_a_seeded_rng():
+    weights = [0.1, 0.5, 0.9, 0.3, 0.7]
+    assert weighted_top_k(weights, 3, rng=random.Random(7)) == weighted_top_k(weights, 3, rng=random.Random(7))
+
+def test_first_pick_is_proportional_to_weight():
+    rng = random.Random(0)
+    firsts = Counter(weighted_top_k([1.0, 3.0], 1, rng=rng)[0] for _ in range(4000))
+    assert 0.72 < firsts[1] / 4000 < 0.78
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from flask import Flask
+
+from bench.fakes import FakeFirestore
+from routes import suggestions
+from routes.suggestions import dispatch_budget, send_all
+from services.resources import resources
+
+
+class SlowHttp:
+    """Stand-in for the shared HttpClient: every send_email call takes `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent  = []
+
+    def post(self, url, params=None, **kwargs):
+        time.sleep(self.delay)
+        self.sent.append(params["user_id"])
+        return type("Response", (), {"status_code": 200})()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    db = FakeFirestore()
+    db.seed("preferences", {f"u{i:03d}": {"email": f"u{i}@example.com"} for i in range(100)})
+    monkeypatch.setitem(resources._instances, "db", db)
+    monkeypatch.setitem(resources._instances, "http", SlowHttp(0.04))
+    monkeypatch.setenv("SEND_EMAIL_URL", "http://send-email.invalid")
+    monkeypatch.setenv("EMAIL_DISPATCH_WORKERS", "2")
+    monkeypatch.setenv("EMAIL_DISPATCH_RATE", "0")
+    app = Flask(__name__)
+    app.register_blueprint(send_all)
+    return app.test_client()
+
+
+def test_budget_fits_inside_the_worker_timeout():
+    assert dispatch_budget(3000, 60, worker_timeout=0) == (3000, 60)
+    budget, call_timeout = dispatch_budget(3000, 60, worker_timeout=30)
+    assert call_timeout == 10 and budget + call_timeout < 30
+    assert dispatch_budget(3000, 60, worker_timeout=6)[0] == 0.0
+
+def test_returns_within_budget_and_resumes(app, monkeypatch):
+    # A 9 s worker timeout leaves a 1 s budget; 100 users x 0.04 s over 2 threads take 2 s
+    monkeypatch.setattr(suggestions, "WORKER_TIMEOUT", 9.0)
+    start = time.monotonic()
+    resp  = app.post("/send_emails_to_all", json={})
+    assert time.monotonic() - start < 1.5
+    out = resp.get_json()
+    assert resp.status_code == 202 and out["status"] == "incomplete"
+    # Everyone up to the cursor has been sent
+    assert {f"u{i:03d}" for i in range(int(out["cursor"][1:]) + 1)} <= set(resources.http.sent)
+
+    monkeypatch.setattr(suggestions, "WORKER_TIMEOUT", 0.0)
+    resp = app.post("/send_emails_to_all", json={"resume": True})
+    assert resp.status_code == 200
+    assert set(resources.http.sent) == {f"u{i:03d}" for i in range(100)}
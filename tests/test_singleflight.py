@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_concurrent_callers_share_one_call():
+    flight, release = SingleFlight(), threading.Event()
+    calls, results = [], []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    threads = run_concurrently(8, lambda: results.append(flight.do("k", fn)))
+    while flight.stats()["executed"] + flight.stats()["coalesced"] < 8:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and results == ["value"] * 8
+    assert flight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+def test_error_reaches_every_waiter():
+    flight, release = SingleFlight(), threading.Event()
+    errors = []
+
+    def fn():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flight.do("k", fn)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = run_concurrently(4, call)
+    while flight.stats()["executed"] + flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert errors == ["upstream down"] * 4
+
+    # Nothing is kept: the next call runs again
+    assert flight.do("k", lambda: "ok") == "ok"
+
+def test_async_concurrent_callers_share_one_call():
+    flight, calls = AsyncSingleFlight(), []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == [1] and flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+def test_async_error_reaches_every_waiter():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(r) for r in results] == ["upstream down"] * 3
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_async_cancelled_waiter_does_not_cancel_the_call():
+    flight, calls = AsyncSingleFlight(), []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do("k", fn))
+        patient   = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == "value"
+    assert calls == [1]
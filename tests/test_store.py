@@ -0,0 +1,50 @@
+from bench.fakes import FakeFirestore
+from services import store
+from services.store import SuggestionStore
+from services.ttl_cache import TTLCache
+
+
+def make_store(db):
+    return SuggestionStore(db, prefs_cache=TTLCache(maxsize=100, ttl=300))
+
+
+def test_missing_preferences_are_not_cached():
+    db = FakeFirestore()
+    s  = make_store(db)
+    assert s.load_user("u1") == (None, None)
+
+    # Written by another instance: seen on the next request, not after the TTL
+    db.seed("preferences", {"u1": {"cuisine": "ramen"}})
+    assert s.load_user("u1") == ({"cuisine": "ramen"}, None)
+    assert s.load_prefs("u2") is None and len(s.prefs_cache) == 1
+
+def test_missing_preferences_ttl(monkeypatch):
+    monkeypatch.setattr(store, "PREFS_MISSING_TTL", 5.0)
+    db = FakeFirestore()
+    s  = make_store(db)
+    assert s.load_prefs("u1") is None
+    db.seed("preferences", {"u1": {"cuisine": "ramen"}})
+    assert s.load_prefs("u1") is None
+    assert db.rpcs["get"] == 1
+
+def test_load_user_reads_both_documents_in_one_round_trip():
+    db = FakeFirestore()
+    db.seed("preferences", {"u1": {"cuisine": "ramen"}})
+    db.seed("history", {"u1": {"ids": ["p1"]}, "u2": {"ids": ["p2"]}})
+    s  = make_store(db)
+
+    assert s.load_user("u1") == ({"cuisine": "ramen"}, {"ids": ["p1"]})
+    assert db.rpcs == {"get_all": 1}
+    # Preferences now cached: only the history is read
+    assert s.load_user("u1") == ({"cuisine": "ramen"}, {"ids": ["p1"]})
+    assert db.rpcs == {"get_all": 1, "get": 1}
+    # History without preferences is still returned
+    assert s.load_user("u2") == (None, {"ids": ["p2"]})
+
+def test_save_prefs_invalidates_the_cache():
+    db = FakeFirestore()
+    s  = make_store(db)
+    s.save_prefs("u1", {"cuisine": "ramen"})
+    assert s.load_prefs("u1") == {"cuisine": "ramen"}
+    s.save_prefs("u1", {"cuisine": "sushi"})
+    assert s.load_user("u1")[0] == {"cuisine": "sushi"}
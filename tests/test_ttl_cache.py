@@ -0,0 +1,51 @@
+from services.ttl_cache import MISSING, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=10)
+    assert cache.get("a") is MISSING
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b", None) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_entries_expire():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    clock.now = 10
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == 2
+    assert cache.expirations == 1 and len(cache) == 1
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_disabled_cache_stores_nothing():
+    for cache in (TTLCache(maxsize=0), TTLCache(ttl=0)):
+        cache.set("a", 1)
+        assert cache.get("a") is MISSING
+
+def test_invalidate_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.invalidate("a") and not cache.invalidate("a")
+    cache.clear()
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Files the Cloud Functions deploy with their own copy of
+# (refresh with deployment/vendor_shared.sh)
+VENDORED = [
+    (os.path.join("email_service", "mailer.py"), os.path.join(function, "mailer.py"))
+    for function in ("cloud_function_send_email", "email_trigger_function")
+] + [
+    (os.path.join("email_service", "templates", "suggestion_email.html"),
+     os.path.join(function, "templates", "suggestion_email.html"))
+    for function in ("cloud_function_send_email", "email_trigger_function")
+]
+
+
+def _read(path):
+    with open(os.path.join(ROOT, path), "rb") as f:
+        return f.read()
+
+@pytest.mark.parametrize("original, copy", VENDORED, ids=[c for _, c in VENDORED])
+def test_vendored_copy_matches(original, copy):
+    assert _read(copy) == _read(original), f"{copy} drifted from {original}: run deployment/vendor_shared.sh"